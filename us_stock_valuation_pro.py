@@ -1,20 +1,33 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import importlib
+from contextlib import contextmanager
 from datetime import datetime
+from zoneinfo import ZoneInfo
+import os
+import re
+import sys
+import json
+import hashlib
+import heapq
+import logging
 import time
 import random
-from functools import wraps
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter, OrderedDict
+from functools import cached_property, partial, wraps
+from email.utils import parsedate_to_datetime
 from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+SCRIPT_STARTED = time.perf_counter()
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: rate limiter falls back to per-process state
+    fcntl = None
 
 # Suppress warnings
 import warnings
@@ -27,6 +40,96 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ============================================================================
+# LAZY IMPORTS
+# Heavy libraries load on first use so the login page skips their cost.
+# Set USV_PROFILE_IMPORTS=1 to log each module's import time.
+# ============================================================================
+IMPORT_PROFILE = os.environ.get('USV_PROFILE_IMPORTS') == '1'
+
+@st.cache_resource(show_spinner=False)
+def get_import_timings():
+    """First-import cost in seconds per lazily loaded module, for this process"""
+    return {}
+
+@contextmanager
+def timed_import(name):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    timings = get_import_timings()
+    if name not in timings:
+        timings[name] = elapsed
+        if IMPORT_PROFILE:
+            print(f"[import-profile] {name}: {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__['_module']
+        if module is None:
+            with timed_import(self._name):
+                module = importlib.import_module(self._name)
+            self.__dict__['_module'] = module
+        value = getattr(module, attr)
+        self.__dict__[attr] = value
+        return value
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+yf = LazyModule('yfinance')
+go = LazyModule('plotly.graph_objects')
+plotly_subplots = LazyModule('plotly.subplots')
+
+# ============================================================================
+# PASSWORD AUTHENTICATION
+# ============================================================================
+def check_password():
+    def password_entered():
+        username = st.session_state["username"].strip().lower()
+        password = st.session_state["password"]
+        users = {"demo": "demo123", "premium": "premium123", "niyas": "nyztrade123"}
+        if username in users and password == users[username]:
+            st.session_state["password_correct"] = True
+            st.session_state["authenticated_user"] = username
+            del st.session_state["password"]
+            return
+        st.session_state["password_correct"] = False
+    
+    if "password_correct" not in st.session_state:
+        st.markdown("""
+        <div style='background: linear-gradient(135deg, #0d47a1 0%, #1565c0 50%, #1976d2 100%); 
+                    padding: 4rem; border-radius: 24px; text-align: center; margin: 2rem auto; max-width: 500px;
+                    box-shadow: 0 25px 50px rgba(13, 71, 161, 0.4); border-top: 5px solid #ef5350;'>
+            <h1 style='color: white; font-size: 2.5rem; margin-bottom: 0.5rem;'>
+                <span style='background: linear-gradient(90deg, #ffffff, #90caf9); -webkit-background-clip: text; -webkit-text-fill-color: transparent;'>
+                    🇺🇸 US Stock Valuation Pro
+                </span>
+            </h1>
+            <p style='color: rgba(255,255,255,0.8); margin-bottom: 2rem;'>Professional US Market Analysis Platform</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            st.text_input("👤 Username", key="username", placeholder="Enter username")
+            st.text_input("🔒 Password", type="password", key="password", placeholder="Enter password")
+            st.button("🚀 Login", on_click=password_entered, use_container_width=True, type="primary")
+            st.info("💡 Demo: demo/demo123")
+        return False
+    elif not st.session_state["password_correct"]:
+        st.error("❌ Incorrect credentials. Please try again.")
+        return False
+    return True
+
+if not check_password():
+    st.stop()
+
 # ============================================================================
 # PROFESSIONAL CSS STYLING - DARK/LIGHT MODE COMPATIBLE
 # ============================================================================
@@ -463,609 +566,148 @@ section[data-testid="stSidebar"] h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# ============================================================================
-# PASSWORD AUTHENTICATION
-# ============================================================================
-def check_password():
-    def password_entered():
-        username = st.session_state["username"].strip().lower()
-        password = st.session_state["password"]
-        users = {"demo": "demo123", "premium": "premium123", "niyas": "nyztrade123"}
-        if username in users and password == users[username]:
-            st.session_state["password_correct"] = True
-            st.session_state["authenticated_user"] = username
-            del st.session_state["password"]
-            return
-        st.session_state["password_correct"] = False
-    
-    if "password_correct" not in st.session_state:
-        st.markdown("""
-        <div style='background: linear-gradient(135deg, #0d47a1 0%, #1565c0 50%, #1976d2 100%); 
-                    padding: 4rem; border-radius: 24px; text-align: center; margin: 2rem auto; max-width: 500px;
-                    box-shadow: 0 25px 50px rgba(13, 71, 161, 0.4); border-top: 5px solid #ef5350;'>
-            <h1 style='color: white; font-size: 2.5rem; margin-bottom: 0.5rem;'>
-                <span style='background: linear-gradient(90deg, #ffffff, #90caf9); -webkit-background-clip: text; -webkit-text-fill-color: transparent;'>
-                    🇺🇸 US Stock Valuation Pro
-                </span>
-            </h1>
-            <p style='color: rgba(255,255,255,0.8); margin-bottom: 2rem;'>Professional US Market Analysis Platform</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.text_input("👤 Username", key="username", placeholder="Enter username")
-            st.text_input("🔒 Password", type="password", key="password", placeholder="Enter password")
-            st.button("🚀 Login", on_click=password_entered, use_container_width=True, type="primary")
-            st.info("💡 Demo: demo/demo123")
-        return False
-    elif not st.session_state["password_correct"]:
-        st.error("❌ Incorrect credentials. Please try again.")
-        return False
-    return True
-
-if not check_password():
-    st.stop()
-
 # ============================================================================
 # COMPREHENSIVE US STOCKS DATABASE
 # Total Stocks: 1200+ Prominent US Equities
-# Organized by: Sector, Industry, and Market Cap
+# Stored in us_stocks.arrow (Arrow IPC, memory-mapped): one row per ticker
+# with name, sector and market-cap tier columns, plus per-membership lists of
+# categories, positions within each category and the name listed there.
+# Edit via: --dump-universe stocks.csv / --build-universe stocks.csv
 # ============================================================================
-
-US_STOCKS = {
-    # ========================================================================
-    # 🏆 MEGA CAP - TOP 50 (Market Cap > $200B)
-    # ========================================================================
-    "🏆 Mega Cap Top 50": {
-        "AAPL": "Apple Inc", "MSFT": "Microsoft Corp", "GOOGL": "Alphabet Inc A", "GOOG": "Alphabet Inc C",
-        "AMZN": "Amazon.com Inc", "NVDA": "NVIDIA Corp", "META": "Meta Platforms", "TSLA": "Tesla Inc",
-        "BRK-B": "Berkshire Hathaway B", "UNH": "UnitedHealth Group", "JNJ": "Johnson & Johnson", "V": "Visa Inc",
-        "XOM": "Exxon Mobil", "JPM": "JPMorgan Chase", "WMT": "Walmart Inc", "MA": "Mastercard Inc",
-        "PG": "Procter & Gamble", "HD": "Home Depot", "CVX": "Chevron Corp", "LLY": "Eli Lilly",
-        "MRK": "Merck & Co", "ABBV": "AbbVie Inc", "PEP": "PepsiCo Inc", "KO": "Coca-Cola Co",
-        "COST": "Costco Wholesale", "AVGO": "Broadcom Inc", "TMO": "Thermo Fisher", "MCD": "McDonald's Corp",
-        "CSCO": "Cisco Systems", "ACN": "Accenture plc", "ABT": "Abbott Laboratories", "DHR": "Danaher Corp",
-        "WFC": "Wells Fargo", "NKE": "Nike Inc", "ADBE": "Adobe Inc", "TXN": "Texas Instruments",
-        "CRM": "Salesforce Inc", "NEE": "NextEra Energy", "PM": "Philip Morris", "ORCL": "Oracle Corp",
-        "BMY": "Bristol-Myers Squibb", "RTX": "RTX Corp", "UPS": "United Parcel Service", "QCOM": "Qualcomm Inc",
-        "HON": "Honeywell Intl", "INTC": "Intel Corp", "IBM": "IBM Corp", "CAT": "Caterpillar Inc",
-        "AMGN": "Amgen Inc", "SPGI": "S&P Global"
-    },
-
-    # ========================================================================
-    # 💻 TECHNOLOGY - Software & Services
-    # ========================================================================
-    "💻 Tech - Software & Cloud": {
-        "CRM": "Salesforce Inc", "NOW": "ServiceNow Inc", "INTU": "Intuit Inc", "PANW": "Palo Alto Networks",
-        "SNOW": "Snowflake Inc", "CRWD": "CrowdStrike Holdings", "WDAY": "Workday Inc", "ZS": "Zscaler Inc",
-        "DDOG": "Datadog Inc", "NET": "Cloudflare Inc", "MDB": "MongoDB Inc", "TEAM": "Atlassian Corp",
-        "HUBS": "HubSpot Inc", "VEEV": "Veeva Systems", "SPLK": "Splunk Inc", "OKTA": "Okta Inc",
-        "ZM": "Zoom Video", "DOCU": "DocuSign Inc", "TWLO": "Twilio Inc", "SQ": "Block Inc",
-        "SHOP": "Shopify Inc", "U": "Unity Software", "PATH": "UiPath Inc", "CFLT": "Confluent Inc",
-        "ESTC": "Elastic NV", "PD": "PagerDuty Inc", "FIVN": "Five9 Inc", "RNG": "RingCentral Inc",
-        "ZI": "ZoomInfo Technologies", "BILL": "Bill Holdings", "PCTY": "Paylocity Holding", "PAYC": "Paycom Software",
-        "GWRE": "Guidewire Software", "MANH": "Manhattan Associates", "TYL": "Tyler Technologies", "SMAR": "Smartsheet Inc",
-        "JAMF": "Jamf Holding", "TENB": "Tenable Holdings", "RPD": "Rapid7 Inc", "SAIL": "SailPoint Technologies"
-    },
-
-    "💻 Tech - Semiconductors": {
-        "NVDA": "NVIDIA Corp", "AMD": "Advanced Micro Devices", "AVGO": "Broadcom Inc", "QCOM": "Qualcomm Inc",
-        "TXN": "Texas Instruments", "INTC": "Intel Corp", "MU": "Micron Technology", "ADI": "Analog Devices",
-        "LRCX": "Lam Research", "KLAC": "KLA Corp", "AMAT": "Applied Materials", "MRVL": "Marvell Technology",
-        "NXPI": "NXP Semiconductors", "ON": "ON Semiconductor", "MCHP": "Microchip Technology", "SWKS": "Skyworks Solutions",
-        "QRVO": "Qorvo Inc", "MPWR": "Monolithic Power", "ENTG": "Entegris Inc", "TER": "Teradyne Inc",
-        "LSCC": "Lattice Semiconductor", "SLAB": "Silicon Laboratories", "CRUS": "Cirrus Logic", "MKSI": "MKS Instruments",
-        "FORM": "FormFactor Inc", "ACLS": "Axcelis Technologies", "UCTT": "Ultra Clean Holdings", "COHR": "Coherent Corp",
-        "WOLF": "Wolfspeed Inc", "RMBS": "Rambus Inc", "SITM": "SiTime Corp", "ALGM": "Allegro MicroSystems",
-        "POWI": "Power Integrations", "DIOD": "Diodes Inc", "SMTC": "Semtech Corp", "AOSL": "Alpha & Omega Semi"
-    },
-
-    "💻 Tech - Hardware & Equipment": {
-        "AAPL": "Apple Inc", "DELL": "Dell Technologies", "HPQ": "HP Inc", "HPE": "Hewlett Packard Enterprise",
-        "NTAP": "NetApp Inc", "WDC": "Western Digital", "STX": "Seagate Technology", "PSTG": "Pure Storage",
-        "LOGI": "Logitech Intl", "CRSR": "Corsair Gaming", "HEAR": "Turtle Beach Corp", "SMCI": "Super Micro Computer",
-        "IONQ": "IonQ Inc", "RGTI": "Rigetti Computing", "QUBT": "Quantum Computing", "BBAI": "BigBear.ai Holdings",
-        "ASTS": "AST SpaceMobile", "IRDM": "Iridium Communications", "GSAT": "Globalstar Inc", "GILT": "Gilat Satellite",
-        "VIAV": "Viavi Solutions", "LITE": "Lumentum Holdings", "FNSR": "Finisar Corp", "CIEN": "Ciena Corp",
-        "INFN": "Infinera Corp", "COMM": "CommScope Holding", "CALX": "Calix Inc", "ADTN": "Adtran Holdings",
-        "EXTR": "Extreme Networks", "CAMP": "CalAmp Corp", "GILT": "Gilat Satellite", "VIAV": "Viavi Solutions"
-    },
-
-    "💻 Tech - IT Services": {
-        "ACN": "Accenture plc", "IBM": "IBM Corp", "CTSH": "Cognizant Technology", "INFY": "Infosys Ltd",
-        "WIT": "Wipro Ltd", "EPAM": "EPAM Systems", "GLOB": "Globant SA", "DXC": "DXC Technology",
-        "LDOS": "Leidos Holdings", "BAH": "Booz Allen Hamilton", "CACI": "CACI International", "SAIC": "Science Applications",
-        "KBR": "KBR Inc", "MANT": "ManTech International", "ICFI": "ICF International", "PRFT": "Perficient Inc",
-        "EXLS": "ExlService Holdings", "WNS": "WNS Holdings", "TTEC": "TTEC Holdings", "CNXC": "Concentrix Corp",
-        "TASK": "TaskUs Inc", "GDS": "GDS Holdings", "VNT": "Vontier Corp", "BR": "Broadridge Financial"
-    },
-
-    # ========================================================================
-    # 🏦 FINANCIAL SERVICES
-    # ========================================================================
-    "🏦 Banks - Large Cap": {
-        "JPM": "JPMorgan Chase", "BAC": "Bank of America", "WFC": "Wells Fargo", "C": "Citigroup Inc",
-        "GS": "Goldman Sachs", "MS": "Morgan Stanley", "USB": "US Bancorp", "PNC": "PNC Financial",
-        "TFC": "Truist Financial", "SCHW": "Charles Schwab", "BK": "Bank of New York Mellon", "STT": "State Street Corp",
-        "COF": "Capital One Financial", "AXP": "American Express", "DFS": "Discover Financial", "SYF": "Synchrony Financial",
-        "ALLY": "Ally Financial", "CFG": "Citizens Financial", "MTB": "M&T Bank Corp", "FITB": "Fifth Third Bancorp",
-        "HBAN": "Huntington Bancshares", "KEY": "KeyCorp", "RF": "Regions Financial", "ZION": "Zions Bancorp",
-        "CMA": "Comerica Inc", "FRC": "First Republic Bank", "SIVB": "SVB Financial Group", "FHN": "First Horizon",
-        "EWBC": "East West Bancorp", "WBS": "Webster Financial", "BOKF": "BOK Financial", "GBCI": "Glacier Bancorp"
-    },
-
-    "🏦 Banks - Regional": {
-        "FCNCA": "First Citizens BancShares", "PNFP": "Pinnacle Financial", "UMBF": "UMB Financial",
-        "FNB": "FNB Corp", "ONB": "Old National Bancorp", "CBSH": "Commerce Bancshares", "WTFC": "Wintrust Financial",
-        "SBCF": "Seacoast Banking", "FFIN": "First Financial Bankshares", "BANF": "BancFirst Corp", "TCBI": "Texas Capital",
-        "HWC": "Hancock Whitney", "SFBS": "ServisFirst Bancshares", "CADE": "Cadence Bank", "IBOC": "International Bancshares",
-        "WAFD": "WaFd Inc", "NWBI": "Northwest Bancshares", "ABCB": "Ameris Bancorp", "TOWN": "TowneBank",
-        "UCBI": "United Community Banks", "CVBF": "CVB Financial", "WSFS": "WSFS Financial", "PACW": "PacWest Bancorp",
-        "WAL": "Western Alliance", "COLB": "Columbia Banking", "BANR": "Banner Bank", "FIBK": "First Interstate",
-        "TRMK": "Trustmark Corp", "FULT": "Fulton Financial", "BHLB": "Berkshire Hills", "ASB": "Associated Banc-Corp"
-    },
-
-    "🏦 Asset Management & Custody": {
-        "BLK": "BlackRock Inc", "BX": "Blackstone Inc", "KKR": "KKR & Co", "APO": "Apollo Global",
-        "CG": "Carlyle Group", "ARES": "Ares Management", "OWL": "Blue Owl Capital", "TPG": "TPG Inc",
-        "TROW": "T Rowe Price", "IVZ": "Invesco Ltd", "BEN": "Franklin Resources", "NTRS": "Northern Trust",
-        "AMG": "Affiliated Managers", "JHG": "Janus Henderson", "VRTS": "Virtus Investment", "FHI": "Federated Hermes",
-        "VCTR": "Victory Capital", "CNS": "Cohen & Steers", "AB": "AllianceBernstein", "EV": "Eaton Vance",
-        "WDR": "Waddell & Reed", "APAM": "Artisan Partners", "HLNE": "Hamilton Lane", "STEP": "StepStone Group"
-    },
-
-    "🏦 Insurance - Life & Health": {
-        "MET": "MetLife Inc", "PRU": "Prudential Financial", "AFL": "Aflac Inc", "LNC": "Lincoln National",
-        "PFG": "Principal Financial", "VOYA": "Voya Financial", "UNM": "Unum Group", "GL": "Globe Life",
-        "BHF": "Brighthouse Financial", "EQH": "Equitable Holdings", "ATH": "Athene Holding", "RGA": "Reinsurance Group",
-        "CNO": "CNO Financial", "FAF": "First American Financial", "FNF": "Fidelity National Financial"
-    },
-
-    "🏦 Insurance - Property & Casualty": {
-        "BRK-B": "Berkshire Hathaway B", "PGR": "Progressive Corp", "TRV": "Travelers Companies", "CB": "Chubb Ltd",
-        "ALL": "Allstate Corp", "HIG": "Hartford Financial", "CNA": "CNA Financial", "WRB": "WR Berkley",
-        "CINF": "Cincinnati Financial", "L": "Loews Corp", "MKL": "Markel Corp", "AFG": "American Financial",
-        "RE": "Everest Re Group", "RNR": "RenaissanceRe", "ACGL": "Arch Capital", "AXS": "Axis Capital",
-        "ORI": "Old Republic Intl", "THG": "Hanover Insurance", "SIGI": "Selective Insurance", "KMPR": "Kemper Corp",
-        "KNSL": "Kinsale Capital", "PLMR": "Palomar Holdings", "HCI": "HCI Group", "RYAN": "Ryan Specialty"
-    },
-
-    "🏦 Financial Technology": {
-        "V": "Visa Inc", "MA": "Mastercard Inc", "PYPL": "PayPal Holdings", "SQ": "Block Inc",
-        "FIS": "Fidelity National Info", "FISV": "Fiserv Inc", "GPN": "Global Payments", "ADP": "Automatic Data Processing",
-        "PAYX": "Paychex Inc", "FLT": "FleetCor Technologies", "WEX": "WEX Inc", "JKHY": "Jack Henry & Associates",
-        "AFRM": "Affirm Holdings", "UPST": "Upstart Holdings", "SOFI": "SoFi Technologies", "LC": "LendingClub Corp",
-        "TOST": "Toast Inc", "FOUR": "Shift4 Payments", "PAYO": "Payoneer Global", "NUVEI": "Nuvei Corp",
-        "EVTC": "Evertec Inc", "RPAY": "Repay Holdings", "PSFE": "Paysafe Ltd", "OLO": "Olo Inc",
-        "RELY": "Remitly Global", "DLO": "DLocal Ltd", "NU": "Nu Holdings", "COIN": "Coinbase Global",
-        "HOOD": "Robinhood Markets", "MKTX": "MarketAxess Holdings", "TW": "Tradeweb Markets", "NDAQ": "Nasdaq Inc"
-    },
-
-    # ========================================================================
-    # 🏥 HEALTHCARE
-    # ========================================================================
-    "🏥 Healthcare - Pharma Large Cap": {
-        "JNJ": "Johnson & Johnson", "LLY": "Eli Lilly", "PFE": "Pfizer Inc", "MRK": "Merck & Co",
-        "ABBV": "AbbVie Inc", "BMY": "Bristol-Myers Squibb", "AMGN": "Amgen Inc", "GILD": "Gilead Sciences",
-        "REGN": "Regeneron Pharma", "VRTX": "Vertex Pharma", "BIIB": "Biogen Inc", "MRNA": "Moderna Inc",
-        "AZN": "AstraZeneca", "NVS": "Novartis AG", "GSK": "GSK plc", "SNY": "Sanofi SA",
-        "NVO": "Novo Nordisk", "ZTS": "Zoetis Inc", "CTLT": "Catalent Inc", "CRL": "Charles River Labs"
-    },
-
-    "🏥 Healthcare - Biotech": {
-        "VRTX": "Vertex Pharma", "REGN": "Regeneron Pharma", "BIIB": "Biogen Inc", "MRNA": "Moderna Inc",
-        "SGEN": "Seagen Inc", "ALNY": "Alnylam Pharma", "INCY": "Incyte Corp", "BMRN": "BioMarin Pharma",
-        "SRPT": "Sarepta Therapeutics", "IONS": "Ionis Pharma", "NBIX": "Neurocrine Biosciences", "EXEL": "Exelixis Inc",
-        "HZNP": "Horizon Therapeutics", "UTHR": "United Therapeutics", "TECH": "Bio-Techne Corp", "BGNE": "BeiGene Ltd",
-        "RARE": "Ultragenyx Pharma", "FOLD": "Amicus Therapeutics", "BLUE": "Bluebird Bio", "ARCT": "Arcturus Therapeutics",
-        "FATE": "Fate Therapeutics", "CRSP": "CRISPR Therapeutics", "EDIT": "Editas Medicine", "NTLA": "Intellia Therapeutics",
-        "BEAM": "Beam Therapeutics", "VCNX": "Vaccinex Inc", "SANA": "Sana Biotechnology", "VERV": "Verve Therapeutics",
-        "RCKT": "Rocket Pharma", "DCPH": "Deciphera Pharma", "KYMR": "Kymera Therapeutics", "RVMD": "Revolution Medicines"
-    },
-
-    "🏥 Healthcare - Medical Devices": {
-        "ABT": "Abbott Laboratories", "MDT": "Medtronic plc", "SYK": "Stryker Corp", "BSX": "Boston Scientific",
-        "EW": "Edwards Lifesciences", "ISRG": "Intuitive Surgical", "BDX": "Becton Dickinson", "ZBH": "Zimmer Biomet",
-        "DXCM": "DexCom Inc", "PODD": "Insulet Corp", "HOLX": "Hologic Inc", "BAX": "Baxter International",
-        "ALGN": "Align Technology", "IDXX": "IDEXX Laboratories", "TFX": "Teleflex Inc", "INSP": "Inspire Medical",
-        "NVST": "Envista Holdings", "XRAY": "Dentsply Sirona", "RMD": "ResMed Inc", "AMED": "Amedisys Inc",
-        "GMED": "Globus Medical", "MMSI": "Merit Medical", "NUVA": "NuVasive Inc", "LIVN": "LivaNova plc",
-        "NVCR": "NovoCure Ltd", "AXNX": "Axonics Inc", "TNDM": "Tandem Diabetes", "SWAV": "Shockwave Medical",
-        "HSKA": "Heska Corp", "ICUI": "ICU Medical", "PRCT": "Procept BioRobotics", "SILK": "Silk Road Medical"
-    },
-
-    "🏥 Healthcare - Services & Facilities": {
-        "UNH": "UnitedHealth Group", "ELV": "Elevance Health", "CI": "Cigna Group", "HUM": "Humana Inc",
-        "CNC": "Centene Corp", "MOH": "Molina Healthcare", "HCA": "HCA Healthcare", "UHS": "Universal Health Services",
-        "THC": "Tenet Healthcare", "ACHC": "Acadia Healthcare", "EHC": "Encompass Health", "DVA": "DaVita Inc",
-        "ENSG": "Ensign Group", "NHC": "National HealthCare", "SEM": "Select Medical", "SGRY": "Surgery Partners",
-        "ALHC": "Alignment Healthcare", "OSH": "Oak Street Health", "AGL": "agilon health", "OSCR": "Oscar Health",
-        "CLOV": "Clover Health", "TALK": "Talkspace Inc", "HIMS": "Hims & Hers Health", "DOCS": "Doximity Inc",
-        "TDOC": "Teladoc Health", "AMWL": "Amwell Corp", "ONEM": "1Life Healthcare", "ACCD": "Accolade Inc"
-    },
-
-    "🏥 Healthcare - Distributors & Services": {
-        "MCK": "McKesson Corp", "ABC": "AmerisourceBergen", "CAH": "Cardinal Health", "OMI": "Owens & Minor",
-        "HSIC": "Henry Schein", "PDCO": "Patterson Companies", "COO": "Cooper Companies", "TECH": "Bio-Techne",
-        "PKI": "PerkinElmer", "A": "Agilent Technologies", "WAT": "Waters Corp", "MTD": "Mettler-Toledo",
-        "TMO": "Thermo Fisher", "DHR": "Danaher Corp", "IQV": "IQVIA Holdings", "MEDP": "Medpace Holdings",
-        "ICLR": "ICON plc", "PPD": "PPD Inc", "SYNH": "Syneos Health", "PRA": "PRA Health Sciences"
-    },
-
-    # ========================================================================
-    # 🛒 CONSUMER - Discretionary
-    # ========================================================================
-    "🛒 Consumer - Retail": {
-        "AMZN": "Amazon.com Inc", "WMT": "Walmart Inc", "COST": "Costco Wholesale", "TGT": "Target Corp",
-        "HD": "Home Depot", "LOW": "Lowe's Companies", "TJX": "TJX Companies", "ROST": "Ross Stores",
-        "BURL": "Burlington Stores", "DG": "Dollar General", "DLTR": "Dollar Tree", "FIVE": "Five Below",
-        "ULTA": "Ulta Beauty", "BBY": "Best Buy Co", "WSM": "Williams-Sonoma", "RH": "RH Inc",
-        "ETSY": "Etsy Inc", "W": "Wayfair Inc", "CHWY": "Chewy Inc", "CVNA": "Carvana Co",
-        "KMX": "CarMax Inc", "AN": "AutoNation Inc", "PAG": "Penske Automotive", "LAD": "Lithia Motors",
-        "GPC": "Genuine Parts", "AAP": "Advance Auto Parts", "ORLY": "O'Reilly Automotive", "AZO": "AutoZone Inc",
-        "TSCO": "Tractor Supply", "OLLI": "Ollie's Bargain", "BIG": "Big Lots Inc", "PRTY": "Party City"
-    },
-
-    "🛒 Consumer - E-Commerce & Internet": {
-        "AMZN": "Amazon.com Inc", "BABA": "Alibaba Group", "JD": "JD.com Inc", "PDD": "PDD Holdings",
-        "MELI": "MercadoLibre Inc", "SE": "Sea Limited", "CPNG": "Coupang Inc", "EBAY": "eBay Inc",
-        "ETSY": "Etsy Inc", "W": "Wayfair Inc", "CHWY": "Chewy Inc", "WISH": "ContextLogic Inc",
-        "RVLV": "Revolve Group", "REAL": "RealReal Inc", "POSH": "Poshmark Inc", "FTCH": "Farfetch Ltd",
-        "BIGC": "BigCommerce Holdings", "SHOP": "Shopify Inc", "WIX": "Wix.com Ltd", "GDDY": "GoDaddy Inc",
-        "YELP": "Yelp Inc", "TRIP": "TripAdvisor Inc", "BKNG": "Booking Holdings", "EXPE": "Expedia Group",
-        "ABNB": "Airbnb Inc", "DASH": "DoorDash Inc", "UBER": "Uber Technologies", "LYFT": "Lyft Inc"
-    },
-
-    "🛒 Consumer - Restaurants": {
-        "MCD": "McDonald's Corp", "SBUX": "Starbucks Corp", "CMG": "Chipotle Mexican Grill", "YUM": "Yum! Brands",
-        "DPZ": "Domino's Pizza", "QSR": "Restaurant Brands", "DNUT": "Krispy Kreme", "WEN": "Wendy's Co",
-        "DRI": "Darden Restaurants", "TXRH": "Texas Roadhouse", "EAT": "Brinker International", "BLMN": "Bloomin' Brands",
-        "CAKE": "Cheesecake Factory", "BJRI": "BJ's Restaurants", "DIN": "Dine Brands", "JACK": "Jack in the Box",
-        "SHAK": "Shake Shack Inc", "WING": "Wingstop Inc", "PLAY": "Dave & Buster's", "PZZA": "Papa John's",
-        "BROS": "Dutch Bros Inc", "CAVA": "CAVA Group", "SWEETGREEN": "Sweetgreen Inc", "PTLO": "Portillo's Inc",
-        "ARMK": "Aramark", "USFD": "US Foods Holding", "SYY": "Sysco Corp", "PFGC": "Performance Food Group"
-    },
-
-    "🛒 Consumer - Apparel & Luxury": {
-        "NKE": "Nike Inc", "LULU": "Lululemon Athletica", "UAA": "Under Armour A", "UA": "Under Armour C",
-        "VFC": "VF Corp", "PVH": "PVH Corp", "RL": "Ralph Lauren", "TPR": "Tapestry Inc",
-        "CPRI": "Capri Holdings", "GPS": "Gap Inc", "ANF": "Abercrombie & Fitch", "AEO": "American Eagle",
-        "URBN": "Urban Outfitters", "EXPR": "Express Inc", "GOOS": "Canada Goose", "BOOT": "Boot Barn Holdings",
-        "DECK": "Deckers Outdoor", "SKX": "Skechers USA", "CROX": "Crocs Inc", "WWW": "Wolverine World Wide",
-        "FL": "Foot Locker", "HIBB": "Hibbett Inc", "FINL": "Finish Line", "DKS": "Dick's Sporting Goods",
-        "ASO": "Academy Sports", "BGFV": "Big 5 Sporting", "GIII": "G-III Apparel", "OXM": "Oxford Industries"
-    },
-
-    "🛒 Consumer - Entertainment & Leisure": {
-        "DIS": "Walt Disney Co", "NFLX": "Netflix Inc", "CMCSA": "Comcast Corp", "WBD": "Warner Bros Discovery",
-        "PARA": "Paramount Global", "LYV": "Live Nation Entertainment", "MSGS": "Madison Square Garden Sports",
-        "MSGE": "Madison Square Garden Entertainment", "WWE": "World Wrestling Entertainment", "EDR": "Endeavor Group",
-        "SPOT": "Spotify Technology", "TME": "Tencent Music", "SONO": "Sonos Inc", "ROKU": "Roku Inc",
-        "FUBO": "fuboTV Inc", "AMC": "AMC Entertainment", "CNK": "Cinemark Holdings", "IMAX": "IMAX Corp",
-        "SIX": "Six Flags Entertainment", "FUN": "Cedar Fair", "SEAS": "SeaWorld Entertainment", "MTN": "Vail Resorts",
-        "SKI": "Boyne Resorts", "HLT": "Hilton Worldwide", "MAR": "Marriott International", "H": "Hyatt Hotels",
-        "WH": "Wyndham Hotels", "CHH": "Choice Hotels", "IHG": "InterContinental Hotels", "ABNB": "Airbnb Inc"
-    },
-
-    "🛒 Consumer - Automotive": {
-        "TSLA": "Tesla Inc", "F": "Ford Motor Co", "GM": "General Motors", "STLA": "Stellantis NV",
-        "RIVN": "Rivian Automotive", "LCID": "Lucid Group", "FSR": "Fisker Inc", "NIO": "NIO Inc",
-        "XPEV": "XPeng Inc", "LI": "Li Auto Inc", "GOEV": "Canoo Inc", "WKHS": "Workhorse Group",
-        "RIDE": "Lordstown Motors", "NKLA": "Nikola Corp", "HYLN": "Hyliion Holdings", "PTRA": "Proterra Inc",
-        "LEA": "Lear Corp", "BWA": "BorgWarner Inc", "APTV": "Aptiv plc", "ALV": "Autoliv Inc",
-        "MGA": "Magna International", "VC": "Visteon Corp", "DAN": "Dana Inc", "ADNT": "Adient plc",
-        "AXL": "American Axle", "GNTX": "Gentex Corp", "MOD": "Modine Manufacturing", "SMP": "Standard Motor Products"
-    },
-
-    # ========================================================================
-    # 🍔 CONSUMER STAPLES
-    # ========================================================================
-    "🍔 Consumer Staples - Food & Beverage": {
-        "PEP": "PepsiCo Inc", "KO": "Coca-Cola Co", "MDLZ": "Mondelez International", "GIS": "General Mills",
-        "K": "Kellogg Co", "CPB": "Campbell Soup", "SJM": "JM Smucker", "CAG": "Conagra Brands",
-        "HSY": "Hershey Co", "MKC": "McCormick & Co", "HRL": "Hormel Foods", "TSN": "Tyson Foods",
-        "BG": "Bunge Ltd", "ADM": "Archer-Daniels-Midland", "INGR": "Ingredion Inc", "DAR": "Darling Ingredients",
-        "KHC": "Kraft Heinz Co", "LANC": "Lancaster Colony", "POST": "Post Holdings", "THS": "TreeHouse Foods",
-        "BGS": "B&G Foods", "LNDC": "Landec Corp", "JJSF": "J&J Snack Foods", "FRPT": "Freshpet Inc",
-        "BYND": "Beyond Meat", "OTLY": "Oatly Group", "TTCF": "Tattooed Chef", "BRCC": "BRC Inc"
-    },
-
-    "🍔 Consumer Staples - Beverages": {
-        "KO": "Coca-Cola Co", "PEP": "PepsiCo Inc", "KDP": "Keurig Dr Pepper", "MNST": "Monster Beverage",
-        "CELH": "Celsius Holdings", "STZ": "Constellation Brands", "BF-B": "Brown-Forman B", "BF-A": "Brown-Forman A",
-        "DEO": "Diageo plc", "SAM": "Boston Beer Co", "TAP": "Molson Coors B", "CCU": "Compania Cervecerias",
-        "FIZZ": "National Beverage", "COKE": "Coca-Cola Consolidated", "PRMW": "Primo Water", "WVVI": "Willamette Valley"
-    },
-
-    "🍔 Consumer Staples - Household & Personal": {
-        "PG": "Procter & Gamble", "CL": "Colgate-Palmolive", "KMB": "Kimberly-Clark", "CHD": "Church & Dwight",
-        "CLX": "Clorox Co", "SPB": "Spectrum Brands", "EL": "Estee Lauder", "COTY": "Coty Inc",
-        "ELF": "e.l.f. Beauty", "ULTA": "Ulta Beauty", "REV": "Revlon Inc", "SBH": "Sally Beauty",
-        "IPAR": "Inter Parfums", "NUS": "Nu Skin Enterprises", "USNA": "USANA Health", "PRGO": "Perrigo Co",
-        "HELE": "Helen of Troy", "ENR": "Energizer Holdings", "HNST": "Honest Company", "BJ": "BJ's Wholesale"
-    },
-
-    "🍔 Consumer Staples - Retail & Tobacco": {
-        "WMT": "Walmart Inc", "COST": "Costco Wholesale", "KR": "Kroger Co", "WBA": "Walgreens Boots Alliance",
-        "CVS": "CVS Health Corp", "TGT": "Target Corp", "SYY": "Sysco Corp", "ACI": "Albertsons Cos",
-        "GO": "Grocery Outlet", "SFM": "Sprouts Farmers Market", "NGVC": "Natural Grocers", "UNFI": "United Natural Foods",
-        "PM": "Philip Morris", "MO": "Altria Group", "BTI": "British American Tobacco", "IMBBY": "Imperial Brands",
-        "TPB": "Turning Point Brands", "NJDCY": "Japan Tobacco", "VGR": "Vector Group", "CSWI": "CSW Industrials"
-    },
-
-    # ========================================================================
-    # ⚡ ENERGY
-    # ========================================================================
-    "⚡ Energy - Oil & Gas Majors": {
-        "XOM": "Exxon Mobil", "CVX": "Chevron Corp", "COP": "ConocoPhillips", "EOG": "EOG Resources",
-        "SLB": "Schlumberger Ltd", "PXD": "Pioneer Natural Resources", "MPC": "Marathon Petroleum", "PSX": "Phillips 66",
-        "VLO": "Valero Energy", "OXY": "Occidental Petroleum", "DVN": "Devon Energy", "HES": "Hess Corp",
-        "FANG": "Diamondback Energy", "MRO": "Marathon Oil", "APA": "APA Corp", "OVV": "Ovintiv Inc",
-        "CTRA": "Coterra Energy", "EQT": "EQT Corp", "AR": "Antero Resources", "RRC": "Range Resources",
-        "SWN": "Southwestern Energy", "CNX": "CNX Resources", "CHK": "Chesapeake Energy", "MTDR": "Matador Resources"
-    },
-
-    "⚡ Energy - Oil Services & Equipment": {
-        "SLB": "Schlumberger Ltd", "HAL": "Halliburton Co", "BKR": "Baker Hughes Co", "NOV": "NOV Inc",
-        "FTI": "TechnipFMC plc", "CHX": "ChampionX Corp", "WFRD": "Weatherford Intl", "HP": "Helmerich & Payne",
-        "PTEN": "Patterson-UTI Energy", "NBR": "Nabors Industries", "RIG": "Transocean Ltd", "VAL": "Valaris Ltd",
-        "NE": "Noble Corp", "DO": "Diamond Offshore", "BORR": "Borr Drilling", "PDS": "Precision Drilling",
-        "DRQ": "Dril-Quip Inc", "OII": "Oceaneering Intl", "LBRT": "Liberty Energy", "PUMP": "ProPetro Holding",
-        "NINE": "Nine Energy Service", "WTTR": "Select Water Solutions", "TUSK": "Mammoth Energy", "USAC": "USA Compression"
-    },
-
-    "⚡ Energy - Midstream & MLPs": {
-        "WMB": "Williams Companies", "KMI": "Kinder Morgan", "OKE": "ONEOK Inc", "EPD": "Enterprise Products",
-        "ET": "Energy Transfer LP", "MPLX": "MPLX LP", "PAA": "Plains All American", "TRGP": "Targa Resources",
-        "LNG": "Cheniere Energy", "DTM": "DT Midstream", "AM": "Antero Midstream", "ENLC": "EnLink Midstream",
-        "WES": "Western Midstream", "HESM": "Hess Midstream", "CTRA": "Coterra Energy", "NFG": "National Fuel Gas",
-        "DCP": "DCP Midstream", "CEQP": "Crestwood Equity", "SMLP": "Summit Midstream", "USAC": "USA Compression"
-    },
-
-    "⚡ Energy - Renewable & Clean": {
-        "NEE": "NextEra Energy", "ENPH": "Enphase Energy", "SEDG": "SolarEdge Technologies", "FSLR": "First Solar",
-        "RUN": "Sunrun Inc", "NOVA": "Sunnova Energy", "SPWR": "SunPower Corp", "JKS": "JinkoSolar Holding",
-        "CSIQ": "Canadian Solar", "DQ": "Daqo New Energy", "MAXN": "Maxeon Solar", "ARRY": "Array Technologies",
-        "SHLS": "Shoals Technologies", "STEM": "Stem Inc", "BE": "Bloom Energy", "PLUG": "Plug Power",
-        "BLDP": "Ballard Power", "FCEL": "FuelCell Energy", "CLNE": "Clean Energy Fuels", "CHPT": "ChargePoint Holdings",
-        "BLNK": "Blink Charging", "EVGO": "EVgo Inc", "DCFC": "Tritium DCFC", "PTRA": "Proterra Inc"
-    },
-
-    # ========================================================================
-    # 🏭 INDUSTRIALS
-    # ========================================================================
-    "🏭 Industrials - Aerospace & Defense": {
-        "BA": "Boeing Co", "LMT": "Lockheed Martin", "RTX": "RTX Corp", "NOC": "Northrop Grumman",
-        "GD": "General Dynamics", "LHX": "L3Harris Technologies", "TDG": "TransDigm Group", "HWM": "Howmet Aerospace",
-        "TXT": "Textron Inc", "HII": "Huntington Ingalls", "AXON": "Axon Enterprise", "KTOS": "Kratos Defense",
-        "MRCY": "Mercury Systems", "AVAV": "AeroVironment Inc", "RKLB": "Rocket Lab USA", "SPCE": "Virgin Galactic",
-        "ASTR": "Astra Space", "RDW": "Redwire Corp", "MNTS": "Momentus Inc", "ASTS": "AST SpaceMobile",
-        "HEI": "HEICO Corp", "HEI-A": "HEICO Corp A", "AIR": "AAR Corp", "CW": "Curtiss-Wright",
-        "MOG-A": "Moog Inc A", "SPR": "Spirit AeroSystems", "WWD": "Woodward Inc", "DCO": "Ducommun Inc"
-    },
-
-    "🏭 Industrials - Machinery & Equipment": {
-        "CAT": "Caterpillar Inc", "DE": "Deere & Co", "CNHI": "CNH Industrial", "AGCO": "AGCO Corp",
-        "CMI": "Cummins Inc", "PH": "Parker-Hannifin", "EMR": "Emerson Electric", "ROK": "Rockwell Automation",
-        "ETN": "Eaton Corp", "DOV": "Dover Corp", "ITW": "Illinois Tool Works", "SWK": "Stanley Black & Decker",
-        "FAST": "Fastenal Co", "GWW": "WW Grainger", "WSO": "Watsco Inc", "TTC": "Toro Co",
-        "OSK": "Oshkosh Corp", "TEX": "Terex Corp", "GNRC": "Generac Holdings", "XYL": "Xylem Inc",
-        "IEX": "IDEX Corp", "NDSN": "Nordson Corp", "GGG": "Graco Inc", "FLS": "Flowserve Corp",
-        "AME": "AMETEK Inc", "RBC": "RBC Bearings", "ROLL": "RBC Bearings", "TRS": "TriMas Corp"
-    },
-
-    "🏭 Industrials - Transportation": {
-        "UNP": "Union Pacific Corp", "CSX": "CSX Corp", "NSC": "Norfolk Southern", "CNI": "Canadian National Railway",
-        "CP": "Canadian Pacific Kansas City", "KSU": "Kansas City Southern", "JBHT": "JB Hunt Transport",
-        "XPO": "XPO Inc", "ODFL": "Old Dominion Freight", "SAIA": "Saia Inc", "CHRW": "CH Robinson Worldwide",
-        "EXPD": "Expeditors International", "UPS": "United Parcel Service", "FDX": "FedEx Corp", "UBER": "Uber Technologies",
-        "LYFT": "Lyft Inc", "DAL": "Delta Air Lines", "UAL": "United Airlines Holdings", "AAL": "American Airlines",
-        "LUV": "Southwest Airlines", "ALK": "Alaska Air Group", "JBLU": "JetBlue Airways", "SAVE": "Spirit Airlines",
-        "HA": "Hawaiian Holdings", "SKYW": "SkyWest Inc", "MESA": "Mesa Air Group", "ATSG": "Air Transport Services"
-    },
-
-    "🏭 Industrials - Building & Construction": {
-        "SHW": "Sherwin-Williams", "PPG": "PPG Industries", "APD": "Air Products & Chemicals", "ECL": "Ecolab Inc",
-        "VMC": "Vulcan Materials", "MLM": "Martin Marietta", "EXP": "Eagle Materials", "SUM": "Summit Materials",
-        "USCR": "US Concrete", "CRH": "CRH plc", "CX": "CEMEX SAB", "MAS": "Masco Corp",
-        "OC": "Owens Corning", "BLDR": "Builders FirstSource", "BLD": "TopBuild Corp", "AZEK": "AZEK Co",
-        "TREX": "Trex Co", "AWI": "Armstrong World Industries", "DOOR": "Masonite International", "JELD": "JELD-WEN Holding",
-        "LPX": "Louisiana-Pacific", "BECN": "Beacon Roofing", "GMS": "GMS Inc", "TILE": "Interface Inc",
-        "FBK": "FB Financial", "APOG": "Apogee Enterprises", "ROCK": "Gibraltar Industries", "PRIM": "Primoris Services"
-    },
-
-    "🏭 Industrials - Conglomerates & Diversified": {
-        "HON": "Honeywell Intl", "MMM": "3M Co", "GE": "GE Aerospace", "JCI": "Johnson Controls",
-        "IR": "Ingersoll Rand", "ROP": "Roper Technologies", "ITT": "ITT Inc", "PNR": "Pentair plc",
-        "AOS": "AO Smith Corp", "WTS": "Watts Water Technologies", "CFX": "Colfax Corp", "FTV": "Fortive Corp",
-        "DHR": "Danaher Corp", "CARR": "Carrier Global", "OTIS": "Otis Worldwide", "TT": "Trane Technologies",
-        "LII": "Lennox International", "WCC": "WESCO International", "RXN": "Rexnord Corp", "ALLE": "Allegion plc"
-    },
-
-    # ========================================================================
-    # 🏠 REAL ESTATE
-    # ========================================================================
-    "🏠 REITs - Diversified & Office": {
-        "PLD": "Prologis Inc", "AMT": "American Tower Corp", "CCI": "Crown Castle Intl", "EQIX": "Equinix Inc",
-        "DLR": "Digital Realty Trust", "PSA": "Public Storage", "SPG": "Simon Property Group", "WELL": "Welltower Inc",
-        "AVB": "AvalonBay Communities", "EQR": "Equity Residential", "VTR": "Ventas Inc", "O": "Realty Income Corp",
-        "BXP": "Boston Properties", "ARE": "Alexandria Real Estate", "SLG": "SL Green Realty", "VNO": "Vornado Realty",
-        "KIM": "Kimco Realty", "REG": "Regency Centers", "FRT": "Federal Realty Investment", "HST": "Host Hotels & Resorts",
-        "RHP": "Ryman Hospitality", "PK": "Park Hotels & Resorts", "SHO": "Sunstone Hotel", "DRH": "DiamondRock Hospitality"
-    },
-
-    "🏠 REITs - Residential": {
-        "EQR": "Equity Residential", "AVB": "AvalonBay Communities", "ESS": "Essex Property Trust", "UDR": "UDR Inc",
-        "MAA": "Mid-America Apartment", "CPT": "Camden Property Trust", "AIV": "Apartment Investment", "NXRT": "NexPoint Residential",
-        "IRT": "Independence Realty", "ELME": "Elme Communities", "VRE": "Veris Residential", "CSR": "Centerspace",
-        "INVH": "Invitation Homes", "AMH": "American Homes 4 Rent", "SUI": "Sun Communities", "ELS": "Equity LifeStyle",
-        "UMH": "UMH Properties", "NNN": "NNN REIT", "ADC": "Agree Realty", "STOR": "STORE Capital"
-    },
-
-    "🏠 REITs - Industrial & Data Centers": {
-        "PLD": "Prologis Inc", "DRE": "Duke Realty", "REXR": "Rexford Industrial", "FR": "First Industrial Realty",
-        "EGP": "EastGroup Properties", "STAG": "STAG Industrial", "TRNO": "Terreno Realty", "COLD": "Americold Realty",
-        "DLR": "Digital Realty Trust", "EQIX": "Equinix Inc", "AMT": "American Tower Corp", "CCI": "Crown Castle Intl",
-        "SBAC": "SBA Communications", "UNIT": "Uniti Group", "CONE": "CyrusOne Inc", "QTS": "QTS Realty Trust",
-        "VNET": "VNET Group", "GDS": "GDS Holdings", "CORZ": "Core Scientific", "MARA": "Marathon Digital"
-    },
-
-    "🏠 REITs - Retail & Specialty": {
-        "SPG": "Simon Property Group", "MAC": "Macerich Co", "SKT": "Tanger Factory Outlet", "PEI": "Pennsylvania REIT",
-        "CBL": "CBL & Associates", "WPG": "Washington Prime", "KIM": "Kimco Realty", "REG": "Regency Centers",
-        "FRT": "Federal Realty Investment", "BRX": "Brixmor Property", "ROIC": "Retail Opportunity", "SITC": "SITE Centers",
-        "RPT": "RPT Realty", "AKR": "Acadia Realty", "UE": "Urban Edge Properties", "RPAI": "Retail Properties",
-        "WRI": "Weingarten Realty", "KRG": "Kite Realty Group", "PINE": "Alpine Income Property", "GTY": "Getty Realty"
-    },
-
-    # ========================================================================
-    # 📡 COMMUNICATION SERVICES
-    # ========================================================================
-    "📡 Communication - Telecom": {
-        "T": "AT&T Inc", "VZ": "Verizon Communications", "TMUS": "T-Mobile US", "CHTR": "Charter Communications",
-        "CMCSA": "Comcast Corp", "LUMN": "Lumen Technologies", "FYBR": "Frontier Communications", "USM": "US Cellular",
-        "TDS": "Telephone & Data Systems", "SHEN": "Shenandoah Telecom", "LILA": "Liberty Latin America A",
-        "LILAK": "Liberty Latin America K", "CABO": "Cable One", "CCOI": "Cogent Communications", "BAND": "Bandwidth Inc",
-        "IRDM": "Iridium Communications", "GSAT": "Globalstar Inc", "VSAT": "Viasat Inc", "SATS": "EchoStar Corp"
-    },
-
-    "📡 Communication - Media & Entertainment": {
-        "DIS": "Walt Disney Co", "NFLX": "Netflix Inc", "WBD": "Warner Bros Discovery", "PARA": "Paramount Global",
-        "FOXA": "Fox Corp A", "FOX": "Fox Corp B", "VIAC": "ViacomCBS", "DISCA": "Discovery A", "DISCB": "Discovery B",
-        "DISCK": "Discovery C", "AMCX": "AMC Networks", "CNXC": "Concentrix Corp", "IPG": "Interpublic Group",
-        "OMC": "Omnicom Group", "WPP": "WPP plc", "PUBM": "PubMatic Inc", "MGNI": "Magnite Inc",
-        "TTD": "Trade Desk", "APPS": "Digital Turbine", "ZNGA": "Zynga Inc", "EA": "Electronic Arts",
-        "TTWO": "Take-Two Interactive", "ATVI": "Activision Blizzard", "RBLX": "Roblox Corp", "U": "Unity Software"
-    },
-
-    "📡 Communication - Internet & Social Media": {
-        "GOOGL": "Alphabet Inc A", "GOOG": "Alphabet Inc C", "META": "Meta Platforms", "SNAP": "Snap Inc",
-        "PINS": "Pinterest Inc", "TWTR": "Twitter Inc", "MTCH": "Match Group", "BMBL": "Bumble Inc",
-        "ZG": "Zillow Group C", "Z": "Zillow Group A", "RDFN": "Redfin Corp", "OPEN": "Opendoor Technologies",
-        "COUR": "Coursera Inc", "DUOL": "Duolingo Inc", "CHGG": "Chegg Inc", "UDMY": "Udemy Inc",
-        "SKIL": "Skillsoft Corp", "LRN": "Stride Inc", "PRDO": "Perdoceo Education", "STRA": "Strategic Education"
-    },
-
-    # ========================================================================
-    # 🔧 MATERIALS
-    # ========================================================================
-    "🔧 Materials - Chemicals": {
-        "LIN": "Linde plc", "APD": "Air Products & Chemicals", "SHW": "Sherwin-Williams", "ECL": "Ecolab Inc",
-        "DD": "DuPont de Nemours", "DOW": "Dow Inc", "LYB": "LyondellBasell", "PPG": "PPG Industries",
-        "NUE": "Nucor Corp", "ALB": "Albemarle Corp", "EMN": "Eastman Chemical", "CE": "Celanese Corp",
-        "FMC": "FMC Corp", "IFF": "International Flavors", "CTVA": "Corteva Inc", "CF": "CF Industries",
-        "MOS": "Mosaic Co", "NTR": "Nutrien Ltd", "SMG": "Scotts Miracle-Gro", "ICL": "ICL Group",
-        "CC": "Chemours Co", "AXTA": "Axalta Coating", "RPM": "RPM International", "ASH": "Ashland Global",
-        "HUN": "Huntsman Corp", "OLN": "Olin Corp", "WLK": "Westlake Corp", "TROX": "Tronox Holdings"
-    },
-
-    "🔧 Materials - Metals & Mining": {
-        "NUE": "Nucor Corp", "STLD": "Steel Dynamics", "CLF": "Cleveland-Cliffs", "X": "United States Steel",
-        "CMC": "Commercial Metals", "RS": "Reliance Steel", "ATI": "ATI Inc", "HAYN": "Haynes International",
-        "CRS": "Carpenter Technology", "ZEUS": "Olympic Steel", "SCHN": "Schnitzer Steel", "AA": "Alcoa Corp",
-        "CENX": "Century Aluminum", "KALU": "Kaiser Aluminum", "ARNC": "Arconic Corp", "HCC": "Warrior Met Coal",
-        "ARCH": "Arch Resources", "AMR": "Alpha Metallurgical", "CEIX": "CONSOL Energy", "BTU": "Peabody Energy",
-        "FCX": "Freeport-McMoRan", "SCCO": "Southern Copper", "TECK": "Teck Resources", "RIO": "Rio Tinto",
-        "BHP": "BHP Group", "VALE": "Vale SA", "NEM": "Newmont Corp", "GOLD": "Barrick Gold",
-        "AEM": "Agnico Eagle Mines", "KGC": "Kinross Gold", "AU": "AngloGold Ashanti", "HMY": "Harmony Gold"
-    },
-
-    "🔧 Materials - Paper & Packaging": {
-        "IP": "International Paper", "PKG": "Packaging Corp of America", "WRK": "WestRock Co", "GPK": "Graphic Packaging",
-        "SLGN": "Silgan Holdings", "SON": "Sonoco Products", "SEE": "Sealed Air Corp", "BLL": "Ball Corp",
-        "CCK": "Crown Holdings", "ATR": "AptarGroup Inc", "BERY": "Berry Global", "AMCR": "Amcor plc",
-        "PTVE": "Pactiv Evergreen", "GEF": "Greif Inc", "CLW": "Clearwater Paper", "MERC": "Mercer International",
-        "RYAM": "Rayonier Advanced", "KS": "Kapstone Paper", "UFS": "Domtar Corp", "RYN": "Rayonier Inc"
-    },
-
-    # ========================================================================
-    # ⚙️ UTILITIES
-    # ========================================================================
-    "⚙️ Utilities - Electric": {
-        "NEE": "NextEra Energy", "DUK": "Duke Energy", "SO": "Southern Co", "D": "Dominion Energy",
-        "AEP": "American Electric Power", "SRE": "Sempra Energy", "EXC": "Exelon Corp", "XEL": "Xcel Energy",
-        "ED": "Consolidated Edison", "PEG": "Public Service Enterprise", "WEC": "WEC Energy Group", "ES": "Eversource Energy",
-        "EIX": "Edison International", "AWK": "American Water Works", "ETR": "Entergy Corp", "FE": "FirstEnergy Corp",
-        "DTE": "DTE Energy", "AEE": "Ameren Corp", "CMS": "CMS Energy", "CNP": "CenterPoint Energy",
-        "PPL": "PPL Corp", "EVRG": "Evergy Inc", "AES": "AES Corp", "NI": "NiSource Inc",
-        "LNT": "Alliant Energy", "OGE": "OGE Energy", "PNW": "Pinnacle West Capital", "NRG": "NRG Energy"
-    },
-
-    "⚙️ Utilities - Gas & Water": {
-        "SRE": "Sempra Energy", "NI": "NiSource Inc", "ATO": "Atmos Energy", "OGS": "ONE Gas Inc",
-        "NJR": "New Jersey Resources", "NFG": "National Fuel Gas", "SWX": "Southwest Gas", "RGCO": "RGC Resources",
-        "AWK": "American Water Works", "WTRG": "Essential Utilities", "AWR": "American States Water", "CWT": "California Water",
-        "SJW": "SJW Group", "YORW": "York Water Co", "MSEX": "Middlesex Water", "ARTNA": "Artesian Resources"
-    },
-
-    # ========================================================================
-    # 🎰 GAMING & CANNABIS
-    # ========================================================================
-    "🎰 Gaming & Casinos": {
-        "LVS": "Las Vegas Sands", "WYNN": "Wynn Resorts", "MGM": "MGM Resorts", "CZR": "Caesars Entertainment",
-        "MLCO": "Melco Resorts", "PENN": "Penn Entertainment", "BYD": "Boyd Gaming", "RRR": "Red Rock Resorts",
-        "GDEN": "Golden Entertainment", "CHDN": "Churchill Downs", "DKNG": "DraftKings Inc", "FLUT": "Flutter Entertainment",
-        "RSI": "Rush Street Interactive", "BALY": "Bally's Corp", "GNOG": "Golden Nugget Online", "AGS": "PlayAGS",
-        "IGT": "International Game Technology", "SGMS": "Scientific Games", "EVRI": "Everi Holdings", "ACEL": "Accel Entertainment"
-    },
-
-    "🌿 Cannabis & CBD": {
-        "TLRY": "Tilray Brands", "CGC": "Canopy Growth", "ACB": "Aurora Cannabis", "CRON": "Cronos Group",
-        "HEXO": "HEXO Corp", "OGI": "Organigram Holdings", "SNDL": "SNDL Inc", "VFF": "Village Farms",
-        "GRWG": "GrowGeneration Corp", "HYFM": "Hydrofarm Holdings", "SMG": "Scotts Miracle-Gro", "IIPR": "Innovative Industrial",
-        "CURLF": "Curaleaf Holdings", "GTBIF": "Green Thumb Industries", "TCNNF": "Trulieve Cannabis", "CRLBF": "Cresco Labs"
-    },
-
-    # ========================================================================
-    # 🔬 EMERGING TECH & INNOVATION
-    # ========================================================================
-    "🔬 AI & Machine Learning": {
-        "NVDA": "NVIDIA Corp", "GOOGL": "Alphabet Inc A", "MSFT": "Microsoft Corp", "META": "Meta Platforms",
-        "AMZN": "Amazon.com Inc", "IBM": "IBM Corp", "PLTR": "Palantir Technologies", "AI": "C3.ai Inc",
-        "UPST": "Upstart Holdings", "PATH": "UiPath Inc", "BBAI": "BigBear.ai Holdings", "SOUN": "SoundHound AI",
-        "GFAI": "Guardforce AI", "AITX": "Artificial Intelligence Technology", "VCNX": "Vaccinex Inc"
-    },
-
-    "🔬 Cybersecurity": {
-        "PANW": "Palo Alto Networks", "CRWD": "CrowdStrike Holdings", "ZS": "Zscaler Inc", "FTNT": "Fortinet Inc",
-        "OKTA": "Okta Inc", "NET": "Cloudflare Inc", "S": "SentinelOne Inc", "TENB": "Tenable Holdings",
-        "RPD": "Rapid7 Inc", "CYBR": "CyberArk Software", "VRNS": "Varonis Systems", "SAIL": "SailPoint Technologies",
-        "QLYS": "Qualys Inc", "PFPT": "Proofpoint Inc", "FEYE": "FireEye Inc", "MIME": "Mimecast Ltd",
-        "RDWR": "Radware Ltd", "CHKP": "Check Point Software", "NLOK": "NortonLifeLock", "AVGO": "Broadcom Inc"
-    },
-
-    "🔬 Blockchain & Crypto": {
-        "COIN": "Coinbase Global", "MARA": "Marathon Digital", "RIOT": "Riot Platforms", "HUT": "Hut 8 Mining",
-        "BITF": "Bitfarms Ltd", "CLSK": "CleanSpark Inc", "BTBT": "Bit Digital", "CORZ": "Core Scientific",
-        "CIFR": "Cipher Mining", "IREN": "Iris Energy", "SQ": "Block Inc", "PYPL": "PayPal Holdings",
-        "MSTR": "MicroStrategy Inc", "GBTC": "Grayscale Bitcoin Trust", "ETHE": "Grayscale Ethereum Trust",
-        "SI": "Silvergate Capital", "SBNY": "Signature Bank", "HOOD": "Robinhood Markets"
-    },
-
-    "🔬 Space & Aerospace Tech": {
-        "RKLB": "Rocket Lab USA", "SPCE": "Virgin Galactic", "ASTR": "Astra Space", "RDW": "Redwire Corp",
-        "MNTS": "Momentus Inc", "ASTS": "AST SpaceMobile", "BKSY": "BlackSky Technology", "PL": "Planet Labs",
-        "LLAP": "Terran Orbital", "VORB": "Virgin Orbit", "SATX": "SatixFy Communications", "IRDM": "Iridium Communications",
-        "GSAT": "Globalstar Inc", "VSAT": "Viasat Inc", "SATS": "EchoStar Corp"
-    },
-
-    # ========================================================================
-    # 📊 ETFs & INDEX TRACKING (Popular for Reference)
-    # ========================================================================
-    "📊 Major ETFs": {
-        "SPY": "SPDR S&P 500 ETF", "QQQ": "Invesco QQQ Trust", "IWM": "iShares Russell 2000", "DIA": "SPDR Dow Jones",
-        "VOO": "Vanguard S&P 500", "VTI": "Vanguard Total Stock Market", "IVV": "iShares Core S&P 500", "VEA": "Vanguard FTSE Developed",
-        "EFA": "iShares MSCI EAFE", "VWO": "Vanguard FTSE Emerging Markets", "EEM": "iShares MSCI Emerging Markets",
-        "GLD": "SPDR Gold Shares", "SLV": "iShares Silver Trust", "TLT": "iShares 20+ Year Treasury", "HYG": "iShares High Yield Corporate",
-        "LQD": "iShares Investment Grade Corporate", "XLF": "Financial Select Sector SPDR", "XLK": "Technology Select Sector SPDR",
-        "XLE": "Energy Select Sector SPDR", "XLV": "Health Care Select Sector SPDR", "XLI": "Industrial Select Sector SPDR",
-        "XLY": "Consumer Discretionary Select Sector SPDR", "XLP": "Consumer Staples Select Sector SPDR", "XLRE": "Real Estate Select Sector SPDR",
-        "XLB": "Materials Select Sector SPDR", "XLU": "Utilities Select Sector SPDR", "XLC": "Communication Services Select Sector SPDR",
-        "ARKK": "ARK Innovation ETF", "ARKG": "ARK Genomic Revolution ETF", "ARKW": "ARK Next Generation Internet ETF"
-    }
+UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'us_stocks.arrow')
+
+pa = LazyModule('pyarrow')
+
+SECTOR_CATEGORY_KEYWORDS = {
+    'technology': ['Tech', 'Software', 'Semiconductor', 'Hardware', 'IT Services', 'AI', 'Cybersecurity'],
+    'healthcare': ['Healthcare', 'Pharma', 'Biotech', 'Medical'],
+    'financial': ['Bank', 'Insurance', 'Asset Management', 'Financial'],
+    'consumer': ['Consumer', 'Retail', 'Restaurant', 'Apparel', 'Entertainment'],
+    'industrial': ['Industrial', 'Aerospace', 'Machinery', 'Transportation', 'Building'],
+    'energy': ['Energy', 'Oil', 'Renewable'],
+    'materials': ['Materials', 'Chemical', 'Metal', 'Mining', 'Paper'],
+    'realestate': ['REIT', 'Real Estate'],
+    'communication': ['Communication', 'Telecom', 'Media', 'Internet'],
+    'utilities': ['Utilities', 'Electric', 'Gas', 'Water']
 }
 
+def classify_categories(categories):
+    """Primary sector key and market-cap tier implied by a ticker's categories"""
+    sector = next((s for c in categories for s, keywords in SECTOR_CATEGORY_KEYWORDS.items()
+                   if any(k.lower() in c.lower() for k in keywords)), None)
+    tier = next((t for t in ('Mega Cap', 'Large Cap', 'Mid Cap', 'Small Cap')
+                 if any(t.lower() in c.lower() for c in categories)), None)
+    return sector, tier
+
+def write_universe_file(universe, path=UNIVERSE_PATH):
+    """Write a {category: {ticker: name}} mapping as an Arrow IPC universe file.
+
+    Each membership keeps its position and name within the category, so
+    StockUniverse.by_category reproduces the mapping exactly.
+    """
+    names, memberships = {}, {}
+    for category, stocks in universe.items():
+        for position, (t, n) in enumerate(stocks.items()):
+            names[t] = n
+            memberships.setdefault(t, []).append((category, position, n))
+    tickers = list(names)
+    classified = [classify_categories([m[0] for m in memberships[t]]) for t in tickers]
+
+    def membership_column(field, value_type):
+        return pa.array([[m[field] for m in memberships[t]] for t in tickers], type=pa.list_(value_type))
+
+    table = pa.table({
+        'ticker': tickers,
+        'name': [names[t] for t in tickers],
+        'categories': membership_column(0, pa.string()),
+        'positions': membership_column(1, pa.int32()),
+        'category_names': membership_column(2, pa.string()),
+        'sector': [c[0] for c in classified],
+        'cap_tier': [c[1] for c in classified],
+    }).replace_schema_metadata({'categories': json.dumps(list(universe))})
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+class StockUniverse:
+    """Memory-mapped universe table with dict views built on first use"""
+
+    def __init__(self, path=UNIVERSE_PATH):
+        self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        self.category_order = json.loads(self.table.schema.metadata[b'categories'])
+
+    @cached_property
+    def names(self):
+        """{ticker: name}"""
+        return dict(zip(self.table.column('ticker').to_pylist(), self.table.column('name').to_pylist()))
+
+    @cached_property
+    def memberships(self):
+        """{ticker: [category, ...]}"""
+        return dict(zip(self.table.column('ticker').to_pylist(), self.table.column('categories').to_pylist()))
+
+    @cached_property
+    def by_category(self):
+        """{category: {ticker: name}} in the original category and within-category order"""
+        views = {category: [] for category in self.category_order}
+        columns = [self.table.column(c).to_pylist() for c in ('ticker', 'categories', 'positions', 'category_names')]
+        for t, categories, positions, names in zip(*columns):
+            for category, position, name in zip(categories, positions, names):
+                views[category].append((position, t, name))
+        return {category: {t: name for _, t, name in sorted(members)} for category, members in views.items()}
+
+    @cached_property
+    def sectors(self):
+        """{ticker: primary sector key}"""
+        return dict(zip(self.table.column('ticker').to_pylist(), self.table.column('sector').to_pylist()))
+
+    @cached_property
+    def cap_tiers(self):
+        """{ticker: market-cap tier or None}"""
+        return dict(zip(self.table.column('ticker').to_pylist(), self.table.column('cap_tier').to_pylist()))
+
+def read_universe_csv(path, category_order=()):
+    """{category: {ticker: name}} from a CSV with ticker, name and '|'-separated categories.
+
+    Categories listed in category_order keep that order; new ones follow. Optional
+    '|'-separated positions and category_names columns (as dumped) order each category
+    and name its members; rows without them follow in file order under their name.
+    """
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    members = {category: [] for category in category_order}
+    for i, row in enumerate(frame.itertuples(index=False)):
+        categories = row.categories.split('|')
+        positions = getattr(row, 'positions', '').split('|')
+        names = getattr(row, 'category_names', '').split('|')
+        for j, category in enumerate(categories):
+            position = int(positions[j]) if len(positions) == len(categories) and positions[j] else float('inf')
+            name = names[j] if len(names) == len(categories) and names[j] else row.name
+            members.setdefault(category, []).append((position, i, row.ticker, name))
+    return {category: {t: name for _, _, t, name in sorted(entries)}
+            for category, entries in members.items() if entries}
+
+def dump_universe_csv(universe, path):
+    """Write the universe as an editable CSV"""
+    frame = universe.table.to_pandas()
+    for column in ('categories', 'positions', 'category_names'):
+        frame[column] = frame[column].map(lambda values: '|'.join(map(str, values)))
+    frame.to_csv(path, index=False)
+
+@st.cache_resource(show_spinner=False)
+def get_universe():
+    """Universe loaded once per server process"""
+    return StockUniverse(UNIVERSE_PATH)
+
+# Universe maintenance: python us_stock_valuation_pro.py --build-universe/--dump-universe stocks.csv
+if __name__ == "__main__" and "--build-universe" in sys.argv:
+    current_order = StockUniverse().category_order if os.path.exists(UNIVERSE_PATH) else ()
+    write_universe_file(read_universe_csv(sys.argv[sys.argv.index("--build-universe") + 1], current_order))
+    sys.exit(0)
+if __name__ == "__main__" and "--dump-universe" in sys.argv:
+    dump_universe_csv(get_universe(), sys.argv[sys.argv.index("--dump-universe") + 1])
+    sys.exit(0)
+
+US_STOCKS = get_universe().by_category
+
 # ============================================================================
 # INDUSTRY BENCHMARKS - US MARKETS
 # ============================================================================
@@ -1103,28 +745,21 @@ GROWTH_BENCHMARKS = {
 
 def get_all_stocks():
     """Returns a flat dictionary of all stocks with their names"""
-    all_stocks = {}
-    for category, stocks in US_STOCKS.items():
-        all_stocks.update(stocks)
-    return all_stocks
+    return dict(get_search_index().stocks)
 
 def get_stock_count():
     """Returns total count of unique stocks"""
-    return len(get_all_stocks())
+    return len(get_search_index().stocks)
 
 def get_categories():
     """Returns list of all categories"""
     return list(US_STOCKS.keys())
 
-def search_stock(query):
-    """Search for stocks by ticker or name"""
-    query = query.upper()
-    results = {}
-    for category, stocks in US_STOCKS.items():
-        for ticker, name in stocks.items():
-            if query in ticker.upper() or query in name.upper():
-                results[ticker] = {'name': name, 'category': category}
-    return results
+def search_stock(query, limit=None):
+    """Search for stocks by ticker or name, best matches first (top SEARCH_TOP_K by default)"""
+    index = get_search_index()
+    return {t: {'name': index.stocks[t], 'category': index.categories[t][-1]}
+            for t in index.ranked_search(query, limit or SEARCH_TOP_K)}
 
 def get_stocks_by_category(category_keyword):
     """Get stocks from categories matching keyword"""
@@ -1136,32 +771,272 @@ def get_stocks_by_category(category_keyword):
 
 def get_stocks_by_sector(sector):
     """Get all stocks in a specific sector"""
-    sector_mapping = {
-        'technology': ['Tech', 'Software', 'Semiconductor', 'Hardware', 'IT Services', 'AI', 'Cybersecurity'],
-        'healthcare': ['Healthcare', 'Pharma', 'Biotech', 'Medical'],
-        'financial': ['Bank', 'Insurance', 'Asset Management', 'Financial'],
-        'consumer': ['Consumer', 'Retail', 'Restaurant', 'Apparel', 'Entertainment'],
-        'industrial': ['Industrial', 'Aerospace', 'Machinery', 'Transportation', 'Building'],
-        'energy': ['Energy', 'Oil', 'Renewable'],
-        'materials': ['Materials', 'Chemical', 'Metal', 'Mining', 'Paper'],
-        'realestate': ['REIT', 'Real Estate'],
-        'communication': ['Communication', 'Telecom', 'Media', 'Internet'],
-        'utilities': ['Utilities', 'Electric', 'Gas', 'Water']
-    }
-    
-    keywords = sector_mapping.get(sector.lower(), [])
-    results = {}
-    for category, stocks in US_STOCKS.items():
-        for keyword in keywords:
-            if keyword.lower() in category.lower():
-                results.update(stocks)
-                break
-    return results
+    return dict(get_search_index().sectors.get(sector.lower(), {}))
 
 def get_benchmark(sector):
     """Get benchmark PE and EV/EBITDA for a sector"""
     return INDUSTRY_BENCHMARKS.get(sector, INDUSTRY_BENCHMARKS.get('Default'))
 
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+SEARCH_NGRAM = 3
+SEARCH_TOP_K = 50
+SEARCH_MIN_FUZZY = 3  # shortest query/word considered for typo matching
+
+def single_deletes(word):
+    """All strings one deletion away from word"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def edit_distance(a, b, limit=1):
+    """Optimal string alignment distance, short-circuiting above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+class StockSearchIndex:
+    """Precomputed lookups over US_STOCKS for the sidebar and search helpers.
+
+    Holds upper-cased search keys, an n-gram index (n <= 3) for substring
+    search, ticker and name-word prefix indexes, a deletion index for typo
+    matching, category and sector inverted indexes and pre-sorted option lists.
+    """
+
+    def __init__(self, universe):
+        self.stocks = {}
+        self.categories = {}
+        for category, stocks in universe.items():
+            for t, n in stocks.items():
+                self.stocks[t] = n
+                self.categories.setdefault(t, []).append(category)
+        
+        self.keys = {t: (t.upper(), n.upper()) for t, n in self.stocks.items()}
+        self.grams = {}
+        for t, keys in self.keys.items():
+            for key in keys:
+                for size in range(1, SEARCH_NGRAM + 1):
+                    for i in range(len(key) - size + 1):
+                        self.grams.setdefault(key[i:i + size], set()).add(t)
+        
+        # Prefix and typo indexes for ranked search
+        self.ticker_prefixes = {}
+        self.word_prefixes = {}
+        self.word_tickers = {}
+        for t, (ticker_key, name_key) in self.keys.items():
+            for i in range(1, len(ticker_key) + 1):
+                self.ticker_prefixes.setdefault(ticker_key[:i], set()).add(t)
+            self.word_tickers.setdefault(ticker_key, set()).add(t)
+            for word in re.findall(r"[A-Z0-9]+", name_key):
+                for i in range(1, len(word) + 1):
+                    self.word_prefixes.setdefault(word[:i], set()).add(t)
+                self.word_tickers.setdefault(word, set()).add(t)
+        self.deletes = {}
+        for word in self.word_tickers:
+            if len(word) >= SEARCH_MIN_FUZZY:
+                for variant in single_deletes(word) | {word}:
+                    self.deletes.setdefault(variant, set()).add(word)
+        
+        # Pre-sorted option labels; rank preserves the sorted order for subsets
+        self.option_label = {t: f"{n} ({t})" for t, n in self.stocks.items()}
+        self.all_options = sorted(self.option_label.values())
+        self.option_ticker = {label: t for t, label in self.option_label.items()}
+        self.rank = {self.option_ticker[label]: i for i, label in enumerate(self.all_options)}
+        self.category_options = {
+            category: sorted(f"{n} ({t})" for t, n in stocks.items())
+            for category, stocks in universe.items()
+        }
+        for category, stocks in universe.items():
+            for t, n in stocks.items():
+                self.option_ticker.setdefault(f"{n} ({t})", t)
+        
+        self.sectors = {}
+        for sector, keywords in SECTOR_CATEGORY_KEYWORDS.items():
+            members = {}
+            for category, stocks in universe.items():
+                if any(k.lower() in category.lower() for k in keywords):
+                    members.update(stocks)
+            self.sectors[sector] = members
+
+    def search(self, query):
+        """Tickers whose symbol or name contains query (case-insensitive)"""
+        query = query.upper()
+        if not query:
+            return list(self.stocks)
+        if len(query) <= SEARCH_NGRAM:
+            return list(self.grams.get(query, ()))
+        postings = [self.grams.get(query[i:i + SEARCH_NGRAM], set())
+                    for i in range(len(query) - SEARCH_NGRAM + 1)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return [t for t in candidates if any(query in key for key in self.keys[t])]
+
+    def fuzzy(self, query):
+        """Tickers whose symbol or a name word is one edit away from query"""
+        words = set()
+        for variant in single_deletes(query) | {query}:
+            words |= self.deletes.get(variant, set())
+        matches = set()
+        for word in words:
+            if edit_distance(query, word) <= 1:
+                matches |= self.word_tickers[word]
+        return matches
+
+    def ranked_search(self, query, limit=SEARCH_TOP_K):
+        """Top tickers for query: exact ticker, ticker prefix, name-word prefix,
+        substring, then one-edit typo matches; alphabetical within each tier"""
+        query = query.strip().upper()
+        if not query:
+            return []
+        tiers = [
+            lambda: [v for v in dict.fromkeys([query, query.replace('.', '-')]) if v in self.stocks],
+            lambda: sorted(self.ticker_prefixes.get(query, ()), key=lambda t: (len(t), self.rank[t])),
+            lambda: self.word_prefixes.get(query, ()),
+            lambda: self.search(query),
+            lambda: self.fuzzy(query) if len(query) >= SEARCH_MIN_FUZZY and ' ' not in query else (),
+        ]
+        results = {}
+        for i, tier in enumerate(tiers):
+            fresh = [t for t in tier() if t not in results]
+            if i > 1:
+                fresh = heapq.nsmallest(limit - len(results), fresh, key=self.rank.get)
+            results.update(dict.fromkeys(fresh[:limit - len(results)]))
+            if len(results) >= limit:
+                break
+        return list(results)
+
+    def search_options(self, query, limit=SEARCH_TOP_K):
+        """Option labels for a search query, best matches first"""
+        return [self.option_label[t] for t in self.ranked_search(query, limit)]
+
+@st.cache_resource(show_spinner=False)
+def get_search_index():
+    """Search index built once per server process"""
+    return StockSearchIndex(US_STOCKS)
+
+def benchmark_search(index=None, rounds=3):
+    """Print search latency percentiles over tickers, prefixes, names and typos"""
+    index = index or StockSearchIndex(US_STOCKS)
+    rng = random.Random(42)
+    queries = []
+    for t, n in index.stocks.items():
+        word = n.split()[0]
+        typo = list(word)
+        if len(typo) > 3:
+            i = rng.randrange(len(typo) - 1)
+            typo[i], typo[i + 1] = typo[i + 1], typo[i]
+        queries += [t, t[:2], word.lower(), ''.join(typo), n[:8]]
+    timings = []
+    for _ in range(rounds):
+        for q in queries:
+            start = time.perf_counter_ns()
+            index.ranked_search(q)
+            timings.append(time.perf_counter_ns() - start)
+    p50, p99 = np.percentile(timings, [50, 99]) / 1000
+    print(f"{len(queries):,} queries x {rounds}: p50 {p50:.1f} us | p99 {p99:.1f} us | max {max(timings) / 1000:.1f} us")
+    return p99
+
+# Search latency benchmark: python us_stock_valuation_pro.py --bench-search
+if __name__ == "__main__" and "--bench-search" in sys.argv:
+    benchmark_search()
+    sys.exit(0)
+
+def bench_info(ticker):
+    """Deterministic synthetic yfinance info for a ticker, for offline benchmarks"""
+    rng = random.Random(ticker)
+    price = rng.uniform(20, 400)
+    shares = rng.uniform(1e8, 5e9)
+    return {
+        'longName': f"{ticker} Inc", 'sector': 'Technology', 'industry': 'Software',
+        'currentPrice': price, 'regularMarketPrice': price, 'previousClose': price * 0.99,
+        'trailingPE': rng.uniform(10, 40), 'forwardPE': rng.uniform(10, 35), 'trailingEps': price / rng.uniform(10, 40),
+        'marketCap': price * shares, 'enterpriseValue': price * shares * 1.05, 'sharesOutstanding': shares,
+        'ebitda': price * shares / rng.uniform(8, 25), 'totalRevenue': price * shares / rng.uniform(2, 8),
+        'freeCashflow': price * shares / rng.uniform(20, 40), 'totalDebt': rng.uniform(0, 2e10),
+        'totalCash': rng.uniform(0, 2e10), 'bookValue': rng.uniform(5, 60), 'beta': rng.uniform(0.6, 1.8),
+        'revenueGrowth': rng.uniform(0, 0.2), 'earningsGrowth': rng.uniform(0, 0.25),
+        'profitMargins': rng.uniform(0.05, 0.35), 'returnOnEquity': rng.uniform(0.05, 0.4),
+        'dividendYield': 0.01, 'fiftyTwoWeekHigh': price * 1.25, 'fiftyTwoWeekLow': price * 0.75,
+    }
+
+def bench_download(tickers, period='1y', start=None, **kwargs):
+    """Synthetic daily OHLCV shaped like yf.download, for offline benchmarks"""
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    end = pd.Timestamp(datetime.now().date())
+    days = pd.bdate_range(pd.Timestamp(start) if start else end - pd.DateOffset(years=1), end)
+    frames = {}
+    for ticker in tickers:
+        close = bench_info(ticker)['currentPrice'] * np.exp(
+            np.cumsum(np.random.default_rng(len(ticker)).normal(0, 0.015, len(days))))
+        frames[ticker] = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                                       'Adj Close': close, 'Volume': np.full(len(days), 1e6)}, index=days)
+    if len(tickers) == 1:
+        return frames[tickers[0]]
+    return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+
+class BenchTicker:
+    """yf.Ticker stand-in serving bench_info and empty statements"""
+
+    def __init__(self, ticker):
+        self.info = bench_info(ticker)
+        self.quarterly_income_stmt = self.income_stmt = self.quarterly_balance_sheet = pd.DataFrame()
+
+def benchmark_reruns(ticker='AAPL', rounds=20):
+    """Print what a sidebar interaction costs on an analyzed stock's page, before and after fragments.
+
+    Before fragment isolation every sidebar widget reran the full results page; now
+    it reruns only the sidebar. The page is driven headless through Streamlit's AppTest
+    with yfinance stubbed by synthetic data, throwaway caches and no rate limit.
+    AppTest reruns the whole script on every interaction, so the sidebar-only cost is
+    the sidebar's in-script time; the full cost is the in-script time of the page.
+    """
+    import tempfile
+    from streamlit.testing.v1 import AppTest
+    
+    scratch = tempfile.mkdtemp(prefix='usv-bench-')
+    os.environ.update({
+        'USV_CACHE_WARMER': '0', 'USV_RATE_LIMIT': '1000', 'USV_RATE_LOCK_FILE': '',
+        'USV_FUNDAMENTALS_DB': os.path.join(scratch, 'fundamentals.sqlite'),
+        'USV_HISTORY_DIR': os.path.join(scratch, 'history'),
+    })
+    yfinance = importlib.import_module('yfinance')
+    yfinance.Ticker, yfinance.download = BenchTicker, bench_download
+    
+    app = AppTest.from_file(os.path.abspath(__file__), default_timeout=120)
+    app.session_state['password_correct'] = True
+    app.run()
+    [w for w in app.sidebar.text_input if w.label == "✏️ Custom Ticker"][0].input(ticker)
+    [b for b in app.sidebar.button if b.label == "🚀 ANALYZE STOCK"][0].click().run()
+    if app.exception or app.session_state['analyze'] != ticker:
+        raise RuntimeError(f"Could not analyze {ticker}: {app.exception}")
+    
+    queries = ['m', 'mi', 'mic', 'micr', 'micro', 'a', 'ap', 'app', 'appl', 'apple']
+    full, sidebar = [], []
+    for i in range(rounds):
+        search = [w for w in app.sidebar.text_input if w.label == "🔍 Search"][0]
+        search.input(queries[i % len(queries)]).run()
+        full.append(app.session_state['full_run_ms'])
+        sidebar.append(app.session_state['sidebar_render_ms'])
+    print(f"{ticker} results page, {rounds} search keystrokes:")
+    print(f"  before (full page rerun): p50 {np.median(full):.1f} ms")
+    print(f"  after (sidebar-only rerun): p50 {np.median(sidebar):.1f} ms")
+    return np.median(full), np.median(sidebar)
+
+# Rerun cost benchmark: python us_stock_valuation_pro.py --bench-rerun
+if __name__ == "__main__" and "--bench-rerun" in sys.argv:
+    sys.argv.remove("--bench-rerun")   # AppTest runs this file as __main__ again
+    benchmark_reruns()
+    sys.exit(0)
+
 # ============================================================================
 # MARKET CAP CLASSIFICATION
 # ============================================================================
@@ -1193,46 +1068,236 @@ if __name__ == "__main__":
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
-def retry_with_backoff(retries=5, backoff_in_seconds=3):
+def classify_fetch_error(e, ticker):
+    """Map an upstream exception to the error string shown in the UI"""
+    error_msg = str(e).lower()
+    if "429" in str(e) or "rate" in error_msg or "too many" in error_msg or "limited" in error_msg:
+        return "RATE_LIMIT"
+    if "expecting value" in error_msg or "jsondecodeerror" in error_msg:
+        return "RATE_LIMIT"
+    if "no data" in error_msg or "not found" in error_msg or "404" in str(e):
+        return f"Ticker '{ticker}' not found"
+    if "connection" in error_msg or "timeout" in error_msg:
+        return "Connection error - please try again"
+    return f"Error: {str(e)[:60]}"
+
+def fetch_error_kind(e):
+    """'throttle', 'transient' or 'fatal' retry class for an upstream exception"""
+    error = classify_fetch_error(e, '')
+    if error == "RATE_LIMIT":
+        return 'throttle'
+    if error.startswith("Connection error"):
+        return 'transient'
+    return 'fatal'
+
+def get_retry_after(e):
+    """Seconds from a Retry-After header on the exception's HTTP response, if any"""
+    headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stop calling upstream after repeated throttling until a cool-down passes.
+
+    After each cool-down one probe request is let through (half-open); success
+    closes the circuit, another throttle re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=120):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_until = 0.0
+
+    def allow(self):
+        """True if a request may go upstream now"""
+        with self.lock:
+            if self.failures < self.failure_threshold:
+                return True
+            if time.time() < self.opened_until:
+                return False
+            # Half-open: one probe per cool-down window
+            self.opened_until = time.time() + self.reset_timeout
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_until = time.time() + max(self.reset_timeout, retry_after or 0)
+
+    def remaining(self):
+        """Seconds until the circuit lets a probe through (0 when closed)"""
+        with self.lock:
+            if self.failures < self.failure_threshold:
+                return 0.0
+            return max(0.0, self.opened_until - time.time())
+
+@st.cache_resource(show_spinner=False)
+def get_upstream_breaker():
+    """Process-wide circuit breaker for Yahoo Finance throttling"""
+    return CircuitBreaker()
+
+def retry_with_backoff(retries=5, backoff_in_seconds=3, max_backoff=30, max_total_delay=60,
+                       classify=None, breaker=None):
+    """Retry with full-jitter exponential backoff.
+
+    classify(e) returns 'throttle', 'transient' or 'fatal' (default: every
+    error is transient); fatal errors are raised immediately. Retry-After
+    headers override the computed delay, and no retry is attempted once the
+    total sleep would exceed max_total_delay. breaker is a callable returning
+    a CircuitBreaker fed by throttle errors; while it is open calls fail fast
+    with CircuitOpenError.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            circuit = breaker() if breaker else None
             x = 0
+            slept = 0.0
             while True:
+                if circuit and not circuit.allow():
+                    raise CircuitOpenError(f"Upstream throttled, retry in {circuit.remaining():.0f}s")
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except Exception as e:
-                    if x == retries:
+                    kind = classify(e) if classify else 'transient'
+                    retry_after = get_retry_after(e)
+                    if circuit and kind == 'throttle':
+                        circuit.record_failure(retry_after)
+                    if kind == 'fatal' or x == retries or (circuit and circuit.remaining() > 0):
+                        raise
+                    delay = retry_after
+                    if delay is None:
+                        delay = random.uniform(0, min(max_backoff, backoff_in_seconds * 2 ** x))
+                    if slept + delay > max_total_delay:
                         raise
-                    time.sleep(backoff_in_seconds * 2 ** x)
+                    time.sleep(delay)
+                    slept += delay
                     x += 1
+                else:
+                    if circuit:
+                        circuit.record_success()
+                    return result
         return wrapper
     return decorator
 
+# ============================================================================
+# SHARED RATE LIMITER
+# ============================================================================
+RATE_LIMIT_PER_SECOND = float(os.environ.get('USV_RATE_LIMIT', 0.25))  # ~1 request every 4s
+RATE_LIMIT_BURST = int(os.environ.get('USV_RATE_BURST', 2))
+# The server and a standalone --warm process share the budget through this file by
+# default; set USV_RATE_LOCK_FILE to an empty string to keep the bucket in-process.
+RATE_LIMIT_LOCK_FILE = os.environ.get(
+    'USV_RATE_LOCK_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'rate_limit.lock')
+) or None
+
+class TokenBucketLimiter:
+    """Token bucket shared by every session; callers are served in arrival order.
+
+    Each acquire reserves the next free slot under a lock, so waiting threads
+    never race for tokens. With lock_path set, the bucket state lives in a
+    file guarded by flock and is shared by every process on the host that
+    uses the same path, including the standalone warmer.
+    """
+
+    def __init__(self, rate, burst=1, lock_path=None):
+        self.interval = 1.0 / rate
+        self.tolerance = (max(burst, 1) - 1) * self.interval
+        self.lock_path = lock_path if fcntl is not None else None
+        if self.lock_path:
+            os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+        self.waiting = 0
+        self.last_wait = 0.0
+
+    def _reserve(self, now, next_slot):
+        start = max(now, next_slot - self.tolerance)
+        return start, max(next_slot, start) + self.interval
+
+    def _reserve_shared(self, now):
+        with open(self.lock_path, 'a+') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                raw = fh.read().strip()
+                start, next_slot = self._reserve(now, float(raw) if raw else 0.0)
+                fh.seek(0)
+                fh.truncate()
+                fh.write(repr(next_slot))
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return start, next_slot
+
+    def acquire(self):
+        """Block until a request slot is available; returns seconds waited"""
+        with self.lock:
+            now = time.time()
+            if self.lock_path:
+                start, self.next_slot = self._reserve_shared(now)
+            else:
+                start, self.next_slot = self._reserve(now, self.next_slot)
+            wait = start - now
+            self.waiting += 1
+        try:
+            if wait > 0:
+                time.sleep(wait)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+                self.last_wait = wait
+        return wait
+
+    def stats(self):
+        """Current queue depth and the wait a new request would see"""
+        with self.lock:
+            expected = max(0.0, self.next_slot - self.tolerance - time.time())
+            return {'queue_depth': self.waiting, 'expected_wait': expected, 'last_wait': self.last_wait}
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    """Process-wide limiter that every Yahoo Finance request queues on"""
+    return TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_LOCK_FILE)
+
 # Session-level cache to avoid repeated calls
 if 'stock_cache' not in st.session_state:
     st.session_state.stock_cache = {}
-if 'last_request_time' not in st.session_state:
-    st.session_state.last_request_time = 0
+
+@retry_with_backoff(retries=3, backoff_in_seconds=2, max_backoff=8, max_total_delay=15,
+                    classify=fetch_error_kind, breaker=get_upstream_breaker)
+def fetch_info_upstream(ticker):
+    """Single rate-limited yfinance info request"""
+    # Wait for a slot on the process-wide rate limiter
+    get_rate_limiter().acquire()
+    
+    # Create ticker - use default session (no custom session)
+    return yf.Ticker(ticker).info
 
 def fetch_stock_data_direct(ticker):
     """Fetch stock data using yfinance with rate limit handling"""
     try:
-        # Ensure minimum delay between requests (3-6 seconds random)
-        current_time = time.time()
-        time_since_last = current_time - st.session_state.last_request_time
-        min_delay = 3 + random.random() * 3  # 3-6 seconds
-        
-        if time_since_last < min_delay:
-            time.sleep(min_delay - time_since_last)
-        
-        st.session_state.last_request_time = time.time()
-        
-        # Create ticker - use default session (no custom session)
-        stock = yf.Ticker(ticker)
-        
-        # Try to get info
-        info = stock.info
+        info = fetch_info_upstream(ticker)
             
         if not info or len(info) < 5:
             return None, "Unable to fetch data - ticker may be invalid"
@@ -1244,43 +1309,884 @@ def fetch_stock_data_direct(ticker):
             
         return info, None
         
+    except CircuitOpenError:
+        return None, "RATE_LIMIT"
     except Exception as e:
-        error_msg = str(e).lower()
-        if "429" in str(e) or "rate" in error_msg or "too many" in error_msg or "limited" in error_msg:
-            return None, "RATE_LIMIT"
-        if "expecting value" in error_msg or "jsondecodeerror" in error_msg:
-            return None, "RATE_LIMIT"
-        if "no data" in error_msg or "not found" in error_msg or "404" in str(e):
-            return None, f"Ticker '{ticker}' not found"
-        if "connection" in error_msg or "timeout" in error_msg:
-            return None, "Connection error - please try again"
-        return None, f"Error: {str(e)[:60]}"
-
-@st.cache_data(ttl=21600, show_spinner=False)  # 6-hour cache
+        return None, classify_fetch_error(e, ticker)
+
+# ============================================================================
+# PERSISTENT FUNDAMENTALS STORE
+# ============================================================================
+FUNDAMENTALS_DB_PATH = os.environ.get(
+    'USV_FUNDAMENTALS_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'fundamentals.sqlite')
+)
+FUNDAMENTALS_TTL = 86400  # fundamentals move quarterly; prices refresh separately
+FUNDAMENTALS_MAX_ENTRIES = 5000
+
+class FundamentalsStore:
+    """SQLite store of yfinance info dicts keyed by (ticker, fetched_at) with LRU eviction"""
+
+    def __init__(self, path, ttl=FUNDAMENTALS_TTL, max_entries=FUNDAMENTALS_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    ticker TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    info TEXT NOT NULL,
+                    PRIMARY KEY (ticker, fetched_at)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fundamentals_access ON fundamentals (last_access)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS benchmark_snapshots (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+
+    def get(self, ticker, max_age=None):
+        """Latest (info, fetched_at) for a ticker, or None if missing or older than max_age"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT fetched_at, info FROM fundamentals WHERE ticker = ? ORDER BY fetched_at DESC LIMIT 1",
+                (ticker,)
+            ).fetchone()
+            if row is None:
+                return None
+            fetched_at, payload = row
+            if max_age is not None and time.time() - fetched_at > max_age:
+                return None
+            self.conn.execute(
+                "UPDATE fundamentals SET last_access = ? WHERE ticker = ? AND fetched_at = ?",
+                (time.time(), ticker, fetched_at)
+            )
+        return json.loads(payload), fetched_at
+
+    def get_fresh(self, ticker):
+        """Latest info for a ticker if it is still within the store TTL"""
+        return self.get(ticker, max_age=self.ttl)
+
+    def put(self, ticker, info, fetched_at=None):
+        """Write a snapshot and evict least recently used rows above the size cap"""
+        now = time.time()
+        fetched_at = now if fetched_at is None else fetched_at
+        payload = json.dumps(info, default=str)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fundamentals (ticker, fetched_at, last_access, info) VALUES (?, ?, ?, ?)",
+                (ticker, fetched_at, now, payload)
+            )
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM fundamentals").fetchone()
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM fundamentals WHERE rowid IN "
+                    "(SELECT rowid FROM fundamentals ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def latest_since(self, since=0):
+        """[(ticker, info, fetched_at)] for the newest snapshot of each ticker fetched after since"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT ticker, info, MAX(fetched_at) FROM fundamentals WHERE fetched_at > ? GROUP BY ticker",
+                (since,)
+            ).fetchall()
+        return [(ticker, json.loads(payload), fetched_at) for ticker, payload, fetched_at in rows]
+
+    def put_snapshot(self, payload, keep=None):
+        """Save a benchmark snapshot and return its version, keeping the newest `keep`"""
+        with self.lock, self.conn:
+            version = self.conn.execute(
+                "INSERT INTO benchmark_snapshots (created_at, payload) VALUES (?, ?)",
+                (time.time(), json.dumps(payload))
+            ).lastrowid
+            if keep:
+                self.conn.execute("DELETE FROM benchmark_snapshots WHERE version <= ?", (version - keep,))
+        return version
+
+    def get_snapshot(self, version=None):
+        """(version, created_at, payload) for a benchmark snapshot (default latest), or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT version, created_at, payload FROM benchmark_snapshots "
+                "WHERE version = COALESCE(?, (SELECT MAX(version) FROM benchmark_snapshots))",
+                (version,)
+            ).fetchone()
+        return None if row is None else (row[0], row[1], json.loads(row[2]))
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM fundamentals").fetchone()[0]
+
+@st.cache_resource(show_spinner=False)
+def get_fundamentals_store():
+    """Process-wide fundamentals store shared by every session"""
+    return FundamentalsStore(FUNDAMENTALS_DB_PATH)
+
+# ============================================================================
+# REQUEST COALESCING
+# ============================================================================
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func, *args):
+        """Run func(*args) once per key; concurrent callers share its result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        
+        try:
+            call['result'] = func(*args)
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+
+@st.cache_resource(show_spinner=False)
+def get_fetch_flight():
+    """Process-wide single-flight group for upstream ticker fetches"""
+    return SingleFlight()
+
+def stamp_info(info, fetched_at):
+    """Copy of info carrying the time it was fetched upstream"""
+    return dict(info, _fetched_at=fetched_at)
+
+def fetch_and_store(ticker, max_age=None):
+    """Fetch a ticker upstream unless a snapshot younger than max_age (default TTL) is stored"""
+    store = get_fundamentals_store()
+    cached = store.get(ticker, max_age=store.ttl if max_age is None else max_age)
+    if cached is not None:
+        return stamp_info(*cached), None
+    
+    info, error = fetch_stock_data_direct(ticker)
+    if info is not None:
+        fetched_at = time.time()
+        store.put(ticker, info, fetched_at)
+        get_price_cache().seed(ticker, info, fetched_at)
+        return stamp_info(info, fetched_at), None
+    if error == "RATE_LIMIT":
+        # Serve the last good snapshot while upstream is throttling us
+        stale = store.get(ticker)
+        if stale is not None:
+            return stamp_info(*stale), None
+    return info, error
+
+# ============================================================================
+# STALE-WHILE-REVALIDATE
+# ============================================================================
+FUNDAMENTALS_MAX_STALE = 7 * 86400  # older snapshots block on a fresh fetch
+
+class BackgroundRefresher:
+    """Refresh expired tickers on a small worker pool, at most once at a time each"""
+
+    def __init__(self, max_workers=2):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="swr")
+        self.lock = threading.Lock()
+        self.pending = set()
+
+    def submit(self, ticker):
+        """Queue a background refresh unless one is already pending"""
+        with self.lock:
+            if ticker in self.pending:
+                return False
+            self.pending.add(ticker)
+        self.pool.submit(self.refresh, ticker)
+        return True
+
+    def refresh(self, ticker):
+        try:
+            get_fetch_flight().do(ticker, fetch_and_store, ticker)
+        finally:
+            with self.lock:
+                self.pending.discard(ticker)
+
+@st.cache_resource(show_spinner=False)
+def get_background_refresher():
+    """Process-wide pool that revalidates expired fundamentals"""
+    return BackgroundRefresher()
+
 def fetch_stock_cached(ticker):
-    """Cached version of stock fetch"""
-    return fetch_stock_data_direct(ticker)
+    """Read-through/write-through fetch backed by the on-disk fundamentals store.
+
+    Expired snapshots are served immediately and refreshed in the background.
+    """
+    store = get_fundamentals_store()
+    cached = store.get(ticker)
+    if cached is not None:
+        age = time.time() - cached[1]
+        if age <= store.ttl:
+            return stamp_info(*cached), None
+        if age <= FUNDAMENTALS_MAX_STALE:
+            get_background_refresher().submit(ticker)
+            return stamp_info(*cached), None
+    # Concurrent misses for the same ticker share one upstream request
+    return get_fetch_flight().do(ticker, fetch_and_store, ticker)
+
+def get_data_age(info):
+    """Seconds since info was fetched upstream, or None if unknown"""
+    fetched_at = info.get('_fetched_at') if info else None
+    return time.time() - fetched_at if fetched_at else None
 
 def fetch_with_session_cache(ticker):
-    """Wrapper that uses session cache first, then disk cache"""
+    """Wrapper that uses session cache first, then disk cache; prices come from the price layer"""
     # Check session cache first (valid for current session)
     cache_key = f"{ticker}_{datetime.now().strftime('%Y%m%d')}"
+    result = None
     
     if cache_key in st.session_state.stock_cache:
         cached_data = st.session_state.stock_cache[cache_key]
-        if cached_data[0] is not None:  # Only return if we have valid data
-            return cached_data
+        age = get_data_age(cached_data[0])
+        # Only return valid data that has not expired since it was cached
+        if cached_data[0] is not None and (age is None or age <= FUNDAMENTALS_TTL):
+            result = cached_data
     
-    # Try cached fetch
-    result = fetch_stock_cached(ticker)
+    if result is None:
+        # Try cached fetch
+        result = fetch_stock_cached(ticker)
+        
+        # Store in session cache if successful
+        if result[0] is not None:
+            st.session_state.stock_cache[cache_key] = result
     
-    # Store in session cache if successful
-    if result[0] is not None:
-        st.session_state.stock_cache[cache_key] = result
+    info, error = result
+    if info is None:
+        return result
+    info = with_bands(info, get_band_store().get_bands(ticker))
+    return with_prices(info, get_prices([ticker]).get(ticker)), error
+
+# ============================================================================
+# BATCHED PRICE FETCH
+# ============================================================================
+PRICE_BATCH_SIZE = 50
+
+@retry_with_backoff(retries=2, backoff_in_seconds=2, max_backoff=8, max_total_delay=15,
+                    classify=fetch_error_kind, breaker=get_upstream_breaker)
+def download_symbol_history(ticker, period='1y', start=None):
+    """One yf.download request for one symbol, taking its limiter slot right before it is sent"""
+    get_rate_limiter().acquire()
+    return yf.download(ticker, period=None if start else period, start=start, interval='1d',
+                       auto_adjust=False, progress=False, threads=False)
+
+def download_price_history(tickers, period='1y', start=None):
+    """OHLCV for a chunk of tickers (from start, else for period) in yf.download's multi-ticker layout.
+
+    yfinance sends one HTTP request per symbol anyway; requesting symbols one at a
+    time keeps each on the limiter's spacing. Symbols that fail are left out, and
+    an open circuit ends the chunk.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    frames = {}
+    for ticker in tickers:
+        try:
+            data = download_symbol_history(ticker, period, start)
+        except CircuitOpenError:
+            logger.warning("Upstream circuit open, price download stopped before %s", ticker)
+            break
+        except Exception:
+            logger.warning("Price download for %s failed", ticker, exc_info=True)
+            continue
+        if data is not None and not data.empty:
+            frames[ticker] = data
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+
+def price_fields_from_history(data, tickers):
+    """Vectorized price-type info fields from a yf.download OHLCV frame"""
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        data = pd.concat({tickers[0]: data}, axis=1).swaplevel(0, 1, axis=1)
+    close = data['Close'].ffill()
+    fields = pd.DataFrame({
+        'currentPrice': close.iloc[-1],
+        'regularMarketPrice': close.iloc[-1],
+        'previousClose': close.iloc[-2] if len(close) > 1 else close.iloc[-1],
+        'fiftyTwoWeekHigh': data['High'].max(),
+        'fiftyTwoWeekLow': data['Low'].min(),
+        'regularMarketVolume': data['Volume'].ffill().iloc[-1],
+    }).dropna(subset=['currentPrice'])
+    return {t: {k: float(v) for k, v in row.items() if pd.notna(v)} for t, row in fields.iterrows()}
+
+def fetch_prices_batch(tickers, batch_size=PRICE_BATCH_SIZE):
+    """{ticker: price fields} for many tickers, batch_size symbols per upstream call"""
+    tickers = list(dict.fromkeys(tickers))
+    prices = {}
+    for i in range(0, len(tickers), batch_size):
+        chunk = tickers[i:i + batch_size]
+        try:
+            data = download_price_history(chunk)
+            prices.update(price_fields_from_history(data, chunk))
+            # The year of bars also extends already-backfilled histories for free
+            get_history_store().ingest(data, chunk, existing_only=True)
+        except Exception:
+            # A failed chunk leaves those tickers on their stored/per-ticker prices
+            logger.warning("Price batch of %d tickers failed", len(chunk), exc_info=True)
+            continue
+    return prices
+
+def with_prices(info, price_fields):
+    """Copy of info with fresher batched price fields applied"""
+    if info is None or not price_fields:
+        return info
+    return dict(info, **price_fields)
+
+# ============================================================================
+# PRICE LAYER (short TTL, batched) - fundamentals live in the store above
+# ============================================================================
+PRICE_TTL = 300  # 5 minutes
+PRICE_FIELDS = ('currentPrice', 'regularMarketPrice', 'previousClose',
+                'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'regularMarketVolume')
+
+class PriceCache:
+    """In-memory price fields per ticker with their own TTL, refreshed in batches"""
+
+    def __init__(self, ttl=PRICE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = {}
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prices")
+        self.pending = set()
+
+    def seed(self, ticker, info, fetched_at):
+        """Record the price fields that came with a fundamentals fetch"""
+        fields = {k: info[k] for k in PRICE_FIELDS if info.get(k) is not None}
+        with self.lock:
+            self.data[ticker] = (dict(fields, _price_at=fetched_at), fetched_at)
+
+    def peek(self, tickers):
+        """{ticker: price fields} already cached, without fetching"""
+        with self.lock:
+            return {t: self.data[t][0] for t in tickers if t in self.data and self.data[t][0]}
+
+    def get_many(self, tickers):
+        """{ticker: price fields}; expired or missing tickers are refreshed in one batch"""
+        now = time.time()
+        with self.lock:
+            cached = {t: self.data[t] for t in tickers if t in self.data and now - self.data[t][1] <= self.ttl}
+        stale = [t for t in tickers if t not in cached]
+        if stale:
+            fetched = fetch_prices_batch(stale)
+            stamp = time.time()
+            with self.lock:
+                for t in stale:
+                    # Failed tickers are remembered too, so they are not retried until the TTL passes
+                    fields = fetched.get(t)
+                    self.data[t] = (dict(fields, _price_at=stamp) if fields else None, stamp)
+                    cached[t] = self.data[t]
+        return {t: fields for t, (fields, _) in cached.items() if fields}
+
+    def revalidate(self, tickers):
+        """Queue a background refresh of expired or missing tickers; returns how many were queued"""
+        now = time.time()
+        with self.lock:
+            stale = [t for t in dict.fromkeys(tickers) if t not in self.pending
+                     and (t not in self.data or now - self.data[t][1] > self.ttl)]
+            self.pending.update(stale)
+        if stale:
+            self.pool.submit(self.refresh, stale)
+        return len(stale)
+
+    def refresh(self, tickers):
+        try:
+            self.get_many(tickers)
+        finally:
+            with self.lock:
+                self.pending.difference_update(tickers)
+
+@st.cache_resource(show_spinner=False)
+def get_price_cache():
+    """Process-wide price layer"""
+    return PriceCache()
+
+def get_prices(tickers):
+    """Current price fields for tickers from the short-TTL price layer"""
+    return get_price_cache().get_many(list(tickers))
+
+# ============================================================================
+# PRICE HISTORY STORE
+# Daily OHLCV per ticker in memory-mapped Arrow files, one file per calendar year:
+#   <USV_HISTORY_DIR>/<TICKER>/<YEAR>.arrow
+# Past years never change; updates append only the days after the last stored one,
+# and only completed sessions are stored, so an intraday bar never becomes a close.
+# ============================================================================
+HISTORY_DIR = os.environ.get(
+    'USV_HISTORY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'history')
+)
+HISTORY_BACKFILL = '5y'   # First download for a ticker with no stored history
+HISTORY_COLUMNS = ('open', 'high', 'low', 'close', 'adj_close', 'volume')
+HISTORY_YF_COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close',
+                      'Adj Close': 'adj_close', 'Volume': 'volume'}
+TRADING_DAYS = 252
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+MARKET_CLOSE_HOUR = 16
+
+def last_completed_session(now=None):
+    """Latest weekday whose regular US session has closed, as datetime64[D]"""
+    now = now or datetime.now(MARKET_TIMEZONE)
+    day = np.datetime64(now.date(), 'D')
+    if now.hour < MARKET_CLOSE_HOUR:
+        day -= 1
+    return np.busday_offset(day, 0, roll='backward')
+
+class HistoryStore:
+    """Append-only daily OHLCV store with zero-copy, year-partitioned range reads"""
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.tables = LRUCache(maxsize=2048)   # (ticker, year, mtime) -> mapped table
+
+    def ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker.replace('/', '_'))
+
+    def years(self, ticker):
+        """Stored years for a ticker, oldest first"""
+        try:
+            names = os.listdir(self.ticker_dir(ticker))
+        except FileNotFoundError:
+            return []
+        return sorted(int(n[:-6]) for n in names if n.endswith('.arrow') and n[:-6].isdigit())
+
+    def table(self, ticker, year):
+        """Memory-mapped Arrow table for one ticker-year, reopened only when the file changes"""
+        path = os.path.join(self.ticker_dir(ticker), f"{year}.arrow")
+        key = (ticker, year, os.stat(path).st_mtime_ns)
+        table = self.tables.get(key)
+        if table is None:
+            table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            self.tables.put(key, table)
+        return table
+
+    @staticmethod
+    def column(table, name):
+        """Column as a numpy array - a zero-copy view of the mapped file for single-chunk tables"""
+        column = table.column(name)
+        return column.chunk(0).to_numpy() if column.num_chunks == 1 else column.to_numpy()
+
+    def last_date(self, ticker):
+        """Last stored trading day as numpy datetime64[D], or None"""
+        years = self.years(ticker)
+        if not years:
+            return None
+        days = self.table(ticker, years[-1]).column('day')
+        return np.datetime64(days[len(days) - 1].as_py(), 'D') if len(days) else None
+
+    def read(self, ticker, start=None, end=None):
+        """{'date': datetime64[D], column: float64 array} for start <= date <= end.
+
+        Only the year files overlapping the range are touched. Slices of a single
+        year are zero-copy views of the mapped file.
+        """
+        start = None if start is None else np.datetime64(start, 'D')
+        end = None if end is None else np.datetime64(end, 'D')
+        first = None if start is None else start.astype(object).year
+        last = None if end is None else end.astype(object).year
+        parts = []
+        for year in self.years(ticker):
+            if (first is not None and year < first) or (last is not None and year > last):
+                continue
+            table = self.table(ticker, year)
+            days = self.column(table, 'day')
+            lo = 0 if start is None else np.searchsorted(days, start.astype('int64'), 'left')
+            hi = len(days) if end is None else np.searchsorted(days, end.astype('int64'), 'right')
+            if hi > lo:
+                parts.append({name: self.column(table, name)[lo:hi] for name in ('day',) + HISTORY_COLUMNS})
+        if not parts:
+            return {'date': np.array([], dtype='datetime64[D]'), **{c: np.array([]) for c in HISTORY_COLUMNS}}
+        merged = parts[0] if len(parts) == 1 else {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        merged['date'] = merged.pop('day').astype('datetime64[D]')
+        return merged
+
+    def write_year(self, ticker, year, days, columns):
+        """Atomically replace one ticker-year file"""
+        directory = self.ticker_dir(ticker)
+        os.makedirs(directory, exist_ok=True)
+        table = pa.table({'day': pa.array(days.astype('int32')),
+                          **{c: pa.array(columns[c].astype('float64')) for c in HISTORY_COLUMNS}})
+        path = os.path.join(directory, f"{year}.arrow")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+    def append(self, ticker, frame):
+        """Append rows of an OHLCV frame dated after the last stored day; returns rows added.
+
+        Bars after the last completed session are still forming and are not stored.
+        """
+        with self.lock:
+            last = self.last_date(ticker)
+            dates = frame.index.values.astype('datetime64[D]')
+            keep = dates <= last_completed_session()
+            if last is not None:
+                keep &= dates > last
+            if not keep.any():
+                return 0
+            dates = dates[keep]
+            new = {c: frame[c].to_numpy(dtype='float64')[keep] for c in HISTORY_COLUMNS}
+            years = dates.astype('datetime64[Y]').astype(int) + 1970
+            stored = set(self.years(ticker))
+            for year in np.unique(years):
+                in_year = years == year
+                days = dates[in_year].astype('int64')
+                columns = {c: new[c][in_year] for c in HISTORY_COLUMNS}
+                if year in stored:
+                    old = self.table(ticker, int(year))
+                    days = np.concatenate([self.column(old, 'day'), days])
+                    columns = {c: np.concatenate([self.column(old, c), columns[c]]) for c in HISTORY_COLUMNS}
+                self.write_year(ticker, int(year), days, columns)
+            return int(keep.sum())
+
+    def ingest(self, data, tickers, existing_only=False):
+        """Append a yf.download OHLCV frame for tickers; existing_only skips tickers never backfilled"""
+        if data is None or data.empty:
+            return 0
+        if not isinstance(data.columns, pd.MultiIndex):
+            data = pd.concat({tickers[0]: data}, axis=1).swaplevel(0, 1, axis=1)
+        added = 0
+        for ticker in tickers:
+            if existing_only and not self.years(ticker):
+                continue
+            try:
+                frame = data.xs(ticker, axis=1, level=1)
+            except KeyError:
+                continue
+            frame = frame.rename(columns=HISTORY_YF_COLUMNS).dropna(subset=['close'])
+            if 'adj_close' not in frame:
+                frame['adj_close'] = frame['close']
+            added += self.append(ticker, frame.reindex(columns=list(HISTORY_COLUMNS)))
+        return added
+
+    def update(self, tickers, batch_size=PRICE_BATCH_SIZE):
+        """Fetch only the missing completed sessions for each ticker, one batched download per start date"""
+        session = last_completed_session()
+        by_start = {}
+        for ticker in dict.fromkeys(tickers):
+            last = self.last_date(ticker)
+            if last is None:
+                by_start.setdefault(None, []).append(ticker)
+            elif last < session:
+                by_start.setdefault(str(last + 1), []).append(ticker)
+        added = 0
+        for start, group in by_start.items():
+            for i in range(0, len(group), batch_size):
+                chunk = group[i:i + batch_size]
+                try:
+                    data = download_price_history(chunk, period=HISTORY_BACKFILL, start=start)
+                except Exception:
+                    continue
+                added += self.ingest(data, chunk)
+        return added
+
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    """Process-wide price history store"""
+    return HistoryStore(HISTORY_DIR)
+
+def history_stats(ticker, store=None):
+    """52-week range and annualized volatility computed from stored history, or None"""
+    store = store or get_history_store()
+    last = store.last_date(ticker)
+    if last is None:
+        return None
+    year = store.read(ticker, start=last - 365)
+    if len(year['close']) < 2:
+        return None
+    returns = np.diff(np.log(year['adj_close']))
+    return {
+        'fiftyTwoWeekHigh': float(np.nanmax(year['high'])),
+        'fiftyTwoWeekLow': float(np.nanmin(year['low'])),
+        'volatility': float(np.nanstd(returns, ddof=1) * np.sqrt(TRADING_DAYS)),
+        'as_of': str(last),
+        'days': len(year['close']),
+    }
+
+# ============================================================================
+# HISTORICAL VALUATION BANDS
+# Daily PE and EV/EBITDA from stored price history and reported TTM earnings,
+# with rolling percentile bands computed in bulk and persisted per ticker.
+# ============================================================================
+EARNINGS_TTL = 7 * 86400         # Statements change quarterly
+REPORT_LAG_DAYS = 45             # A period's numbers are public ~45 days after it ends
+BAND_WINDOW = TRADING_DAYS * 3   # Rolling window for the percentile bands
+BAND_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+BAND_METRICS = ('pe', 'ev_ebitda')
+
+@retry_with_backoff(retries=2, backoff_in_seconds=2, max_backoff=8, max_total_delay=15,
+                    classify=fetch_error_kind, breaker=get_upstream_breaker)
+def fetch_statements_upstream(ticker):
+    """Quarterly and annual income statements plus the quarterly balance sheet, each rate limited"""
+    stock = yf.Ticker(ticker)
+    statements = []
+    for name in ('quarterly_income_stmt', 'income_stmt', 'quarterly_balance_sheet'):
+        get_rate_limiter().acquire()
+        statements.append(getattr(stock, name))
+    return statements
+
+def statement_row(statement, names):
+    """First available row among names as a float Series by period end, oldest first"""
+    if statement is None or statement.empty:
+        return pd.Series(dtype=float)
+    for name in names:
+        if name in statement.index:
+            row = pd.to_numeric(statement.loc[name], errors='coerce')
+            row.index = pd.to_datetime(row.index)
+            return row.sort_index()
+    return pd.Series(dtype=float)
+
+def earnings_series(quarterly, annual, balance):
+    """TTM EPS, EBITDA, diluted shares and net debt by period end.
+
+    Four consecutive quarters give a TTM value; older periods fall back to annual figures.
+    """
+    def ttm(names):
+        quarters = statement_row(quarterly, names)
+        rolled = quarters.rolling(4, min_periods=4).sum().dropna()
+        return rolled.combine_first(statement_row(annual, names))
     
-    return result
+    shares = statement_row(quarterly, ['Diluted Average Shares', 'Basic Average Shares']).combine_first(
+        statement_row(annual, ['Diluted Average Shares', 'Basic Average Shares']))
+    debt = statement_row(balance, ['Total Debt'])
+    cash = statement_row(balance, ['Cash And Cash Equivalents', 'Cash Cash Equivalents And Short Term Investments'])
+    frame = pd.DataFrame({
+        'eps': ttm(['Diluted EPS', 'Basic EPS']),
+        'ebitda': ttm(['EBITDA', 'Normalized EBITDA']),
+        'shares': shares,
+        'net_debt': debt.sub(cash, fill_value=0),
+    }).sort_index()
+    frame[['shares', 'net_debt']] = frame[['shares', 'net_debt']].ffill()
+    return frame.dropna(how='all', subset=['eps', 'ebitda'])
+
+class BandStore:
+    """SQLite store of TTM earnings series and computed valuation bands per ticker"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS earnings (
+                    ticker TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS valuation_bands (
+                    ticker TEXT PRIMARY KEY,
+                    computed_at REAL NOT NULL,
+                    inputs TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+
+    def get_earnings(self, ticker):
+        """(TTM earnings DataFrame, fetched_at) or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload, fetched_at FROM earnings WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        frame = pd.read_json(BytesIO(row[0].encode()), orient='split')
+        return frame, row[1]
+
+    def put_earnings(self, ticker, frame, fetched_at=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO earnings (ticker, fetched_at, payload) VALUES (?, ?, ?)",
+                (ticker, time.time() if fetched_at is None else fetched_at, frame.to_json(orient='split', date_format='iso'))
+            )
 
-def calculate_valuations(info):
+    def get_bands(self, ticker):
+        """Stored bands payload for a ticker, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT payload FROM valuation_bands WHERE ticker = ?", (ticker,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def band_inputs(self, tickers):
+        """{ticker: inputs key} the stored bands were computed from"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT ticker, inputs FROM valuation_bands WHERE ticker IN ({','.join('?' * len(tickers))})",
+                list(tickers)
+            ).fetchall()
+        return dict(rows)
+
+    def put_bands(self, ticker, inputs, payload):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO valuation_bands (ticker, computed_at, inputs, payload) VALUES (?, ?, ?, ?)",
+                (ticker, time.time(), inputs, json.dumps(payload))
+            )
+
+@st.cache_resource(show_spinner=False)
+def get_band_store():
+    """Process-wide band store, in the fundamentals database file"""
+    return BandStore(FUNDAMENTALS_DB_PATH)
+
+def load_earnings(ticker, fetch=True):
+    """Stored TTM earnings for a ticker, refreshed upstream once older than EARNINGS_TTL"""
+    store = get_band_store()
+    stored = store.get_earnings(ticker)
+    if fetch and (stored is None or time.time() - stored[1] > EARNINGS_TTL):
+        try:
+            frame = earnings_series(*fetch_statements_upstream(ticker))
+            store.put_earnings(ticker, frame)
+            return frame, time.time()
+        except Exception:
+            # Keep serving the stored series; the next call retries upstream
+            logger.warning("Earnings refresh for %s failed", ticker, exc_info=True)
+    return stored
+
+def daily_multiples(prices, earnings):
+    """Daily PE and EV/EBITDA, as-of joined to the latest earnings public on each day"""
+    dates = prices['date']
+    known = (earnings.index + pd.Timedelta(days=REPORT_LAG_DAYS)).values.astype('datetime64[D]')
+    pos = np.searchsorted(known, dates, side='right') - 1
+    has = pos >= 0
+    pos = np.where(has, pos, 0)
+
+    def asof(column):
+        return np.where(has, earnings[column].to_numpy(dtype=float)[pos], np.nan)
+
+    close = prices['close']
+    eps, ebitda = asof('eps'), asof('ebitda')
+    ev = close * asof('shares') + np.nan_to_num(asof('net_debt'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pe = np.where(eps > 0, close / eps, np.nan)
+        ev_ebitda = np.where(ebitda > 0, ev / ebitda, np.nan)
+    index = pd.DatetimeIndex(dates)
+    return (pd.Series(np.where((pe > 0) & (pe < 300), pe, np.nan), index=index),
+            pd.Series(np.where((ev_ebitda > 0) & (ev_ebitda < 100), ev_ebitda, np.nan), index=index))
+
+def compute_bands(series_by_ticker, window=BAND_WINDOW):
+    """{ticker: bands payload} from {ticker: {metric: daily Series}}.
+
+    Every metric is laid out as one dates x tickers frame so each rolling quantile
+    is a single vectorized pass over the whole batch.
+    """
+    wide = {
+        metric: pd.DataFrame({t: s[metric] for t, s in series_by_ticker.items()}).sort_index()
+        for metric in BAND_METRICS
+    }
+    rolling = {
+        metric: {q: frame.rolling(window, min_periods=window // 4).quantile(q) for q in BAND_QUANTILES}
+        for metric, frame in wide.items()
+    }
+    monthly = {metric: frame.resample('ME').last() for metric, frame in wide.items()}
+    monthly_bands = {
+        metric: {q: band.resample('ME').last() for q, band in bands.items()} for metric, bands in rolling.items()
+    }
+    payloads = {}
+    for ticker in series_by_ticker:
+        payload = {'as_of': None, 'months': None}
+        for metric in BAND_METRICS:
+            values = wide[metric][ticker]
+            valid = values.dropna()
+            latest = {f"p{int(q * 100)}": rolling[metric][q][ticker].iloc[-1] for q in BAND_QUANTILES}
+            if valid.empty or pd.isna(latest['p50']):
+                payload[metric] = None
+                continue
+            recent = valid.iloc[-window:]
+            current = valid.iloc[-1]
+            payload['as_of'] = str(valid.index[-1].date())
+            payload[metric] = dict(
+                {k: float(v) for k, v in latest.items()},
+                current=float(current), rank=float((recent < current).mean() * 100), n=int(len(recent))
+            )
+            months = monthly[metric][ticker]
+            payload['months'] = [str(d.date()) for d in months.index]
+            payload[f'{metric}_monthly'] = {
+                'value': months.round(2).where(months.notna(), None).tolist(),
+                **{f"p{int(q * 100)}": b[ticker].round(2).where(b[ticker].notna(), None).tolist()
+                   for q, b in monthly_bands[metric].items()}
+            }
+        payloads[ticker] = payload
+    return payloads
+
+def update_bands(tickers, fetch=True, history=None, pause=None):
+    """Recompute bands only for tickers whose price history or earnings changed; returns count.
+
+    pause, if given, is called before each ticker so background callers can yield upstream.
+    """
+    history = history or get_history_store()
+    store = get_band_store()
+    tickers = list(dict.fromkeys(tickers))
+    stored_inputs = store.band_inputs(tickers) if tickers else {}
+    series, inputs = {}, {}
+    for ticker in tickers:
+        last = history.last_date(ticker)
+        if last is None:
+            continue
+        if pause is not None:
+            pause()
+        earnings = load_earnings(ticker, fetch=fetch)
+        if earnings is None or earnings[0].empty:
+            continue
+        key = f"{last}|{earnings[1]:.0f}|{BAND_WINDOW}"
+        if stored_inputs.get(ticker) == key:
+            continue
+        prices = history.read(ticker, start=last - int(BAND_WINDOW * 365 / TRADING_DAYS) * 2)
+        pe, ev_ebitda = daily_multiples(prices, earnings[0])
+        series[ticker] = {'pe': pe, 'ev_ebitda': ev_ebitda}
+        inputs[ticker] = key
+    if not series:
+        return 0
+    for ticker, payload in compute_bands(series).items():
+        store.put_bands(ticker, inputs[ticker], payload)
+    return len(series)
+
+def with_bands(info, bands):
+    """Copy of info carrying historical median multiples and their log spread from precomputed bands"""
+    if info is None or not bands:
+        return info
+    extra = {}
+    for m in BAND_METRICS:
+        band = bands.get(m)
+        if band:
+            extra[f'_hist_{m}'] = band['p50']
+            # p10-p90 spans 2 x 1.2816 standard deviations of a normal log multiple
+            extra[f'_hist_{m}_sd'] = float(np.log(band['p90'] / band['p10']) / 2.5631)
+    return dict(info, **extra) if extra else info
+
+def calculate_valuations(info, benchmarks=None):
+    benchmarks = benchmarks or INDUSTRY_BENCHMARKS
     try:
         price = info.get('currentPrice', 0) or info.get('regularMarketPrice', 0)
         trailing_pe = info.get('trailingPE', 0)
@@ -1294,19 +2200,30 @@ def calculate_valuations(info):
         book_value = info.get('bookValue', 0)
         revenue = info.get('totalRevenue', 0)
         
-        benchmark = INDUSTRY_BENCHMARKS.get(sector, INDUSTRY_BENCHMARKS['Default'])
+        _, benchmark = resolve_benchmark(sector, benchmarks, info.get('industry'))
         industry_pe = benchmark['pe']
         industry_ev_ebitda = benchmark['ev_ebitda']
         
-        # PE-based valuation
-        historical_pe = trailing_pe * 0.9 if trailing_pe and trailing_pe > 0 else industry_pe
+        # PE-based valuation: historical median PE from stored bands, else a discount to today's
+        hist_pe = info.get('_hist_pe')
+        if hist_pe and hist_pe > 0:
+            historical_pe = hist_pe
+        else:
+            historical_pe = trailing_pe * 0.9 if trailing_pe and trailing_pe > 0 else industry_pe
         blended_pe = (industry_pe + historical_pe) / 2
         fair_value_pe = trailing_eps * blended_pe if trailing_eps else None
         upside_pe = ((fair_value_pe - price) / price * 100) if fair_value_pe and price else None
         
         # EV/EBITDA-based valuation
         current_ev_ebitda = enterprise_value / ebitda if ebitda and ebitda > 0 else None
-        target_ev_ebitda = (industry_ev_ebitda + current_ev_ebitda * 0.9) / 2 if current_ev_ebitda and 0 < current_ev_ebitda < 50 else industry_ev_ebitda
+        hist_ev_ebitda = info.get('_hist_ev_ebitda')
+        if hist_ev_ebitda and hist_ev_ebitda > 0:
+            historical_ev_ebitda = hist_ev_ebitda
+        elif current_ev_ebitda and 0 < current_ev_ebitda < 50:
+            historical_ev_ebitda = current_ev_ebitda * 0.9
+        else:
+            historical_ev_ebitda = None
+        target_ev_ebitda = (industry_ev_ebitda + historical_ev_ebitda) / 2 if historical_ev_ebitda else industry_ev_ebitda
         
         if ebitda and ebitda > 0:
             fair_ev = ebitda * target_ev_ebitda
@@ -1327,10 +2244,11 @@ def calculate_valuations(info):
         return {
             'price': price, 'trailing_pe': trailing_pe, 'forward_pe': forward_pe,
             'trailing_eps': trailing_eps, 'industry_pe': industry_pe,
+            'historical_pe': historical_pe,
             'fair_value_pe': fair_value_pe, 'upside_pe': upside_pe,
             'enterprise_value': enterprise_value, 'ebitda': ebitda,
             'market_cap': market_cap, 'current_ev_ebitda': current_ev_ebitda,
-            'industry_ev_ebitda': industry_ev_ebitda,
+            'industry_ev_ebitda': industry_ev_ebitda, 'historical_ev_ebitda': historical_ev_ebitda,
             'fair_value_ev': fair_value_ev, 'upside_ev': upside_ev,
             'pb_ratio': pb_ratio, 'ps_ratio': ps_ratio,
             'book_value': book_value, 'revenue': revenue,
@@ -1345,12 +2263,1091 @@ def calculate_valuations(info):
     except:
         return None
 
+def reprice_valuations(vals, info, benchmarks=None):
+    """Update the price-dependent fields of vals for the price in info.
+
+    Fair values depend only on fundamentals, so a price move needs no full recompute.
+    Market cap moves with the price at the snapshot's share count.
+    """
+    price = info.get('currentPrice', 0) or info.get('regularMarketPrice', 0)
+    if not price:
+        return calculate_valuations(info, benchmarks)
+    book_value, revenue = vals['book_value'], vals['revenue']
+    fair_value_pe, fair_value_ev = vals['fair_value_pe'], vals['fair_value_ev']
+    market_cap = vals['market_cap'] * price / vals['price'] if vals['market_cap'] and vals['price'] else vals['market_cap']
+    return dict(
+        vals, price=price, market_cap=market_cap,
+        upside_pe=((fair_value_pe - price) / price * 100) if fair_value_pe else None,
+        upside_ev=((fair_value_ev - price) / price * 100) if fair_value_ev else None,
+        pb_ratio=price / book_value if book_value and book_value > 0 else None,
+        ps_ratio=market_cap / revenue if revenue and revenue > 0 else None,
+        **{'52w_high': info.get('fiftyTwoWeekHigh', 0), '52w_low': info.get('fiftyTwoWeekLow', 0)}
+    )
+
+def info_frame(infos):
+    """Build a one-row-per-ticker DataFrame from a {ticker: info} mapping"""
+    return pd.DataFrame.from_dict({t: i for t, i in infos.items() if i}, orient='index')
+
+def calculate_valuations_frame(df, benchmarks=None):
+    """Vectorized calculate_valuations over a DataFrame of yfinance info fields.
+
+    One row per ticker; returns the same keys as calculate_valuations as columns.
+    None results and missing pass-through fields become NaN; other missing inputs
+    count as 0, except shares, whose absence leaves the EV/EBITDA value undefined.
+    """
+    n = len(df)
+
+    def col(name, default=0):
+        if name not in df:
+            return np.full(n, float(default))
+        return pd.to_numeric(df[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+    def raw(name):
+        return col(name, np.nan)
+
+    current_price = col('currentPrice')
+    price = np.where(current_price != 0, current_price, raw('regularMarketPrice'))
+    trailing_pe = col('trailingPE')
+    trailing_eps = col('trailingEps')
+    enterprise_value = col('enterpriseValue')
+    ebitda = col('ebitda')
+    market_cap = col('marketCap')
+    shares = raw('sharesOutstanding')
+    book_value = col('bookValue')
+    revenue = col('totalRevenue')
+    net_debt = col('totalDebt') - col('totalCash')
+
+    benchmarks = pd.DataFrame.from_dict(benchmarks or INDUSTRY_BENCHMARKS, orient='index')
+    sector = df['sector'] if 'sector' in df else pd.Series('Default', index=df.index)
+    industry = INDUSTRY_KEY_PREFIX + (df['industry'] if 'industry' in df else pd.Series('', index=df.index)).fillna('')
+    key = industry.where(industry.isin(benchmarks.index), sector.where(sector.isin(benchmarks.index), 'Default'))
+    industry_pe = benchmarks['pe'].reindex(key).to_numpy(dtype=float)
+    industry_ev_ebitda = benchmarks['ev_ebitda'].reindex(key).to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # PE-based valuation
+        hist_pe = col('_hist_pe')
+        historical_pe = np.where(hist_pe > 0, hist_pe, np.where(trailing_pe > 0, trailing_pe * 0.9, industry_pe))
+        blended_pe = (industry_pe + historical_pe) / 2
+        fair_value_pe = np.where(trailing_eps != 0, trailing_eps * blended_pe, np.nan)
+        has_pe = (fair_value_pe != 0) & ~np.isnan(fair_value_pe) & (price != 0)
+        upside_pe = np.where(has_pe, (fair_value_pe - price) / price * 100, np.nan)
+
+        # EV/EBITDA-based valuation
+        has_ebitda = ebitda > 0
+        current_ev_ebitda = np.where(has_ebitda, enterprise_value / ebitda, np.nan)
+        in_range = (current_ev_ebitda > 0) & (current_ev_ebitda < 50)
+        hist_ev_ebitda = col('_hist_ev_ebitda')
+        historical_ev_ebitda = np.where(hist_ev_ebitda > 0, hist_ev_ebitda,
+                                        np.where(in_range, current_ev_ebitda * 0.9, np.nan))
+        target_ev_ebitda = np.where(np.isnan(historical_ev_ebitda), industry_ev_ebitda,
+                                    (industry_ev_ebitda + historical_ev_ebitda) / 2)
+        fair_mcap = ebitda * target_ev_ebitda - net_debt
+        fair_value_ev = np.where(has_ebitda & (shares != 0) & ~np.isnan(shares), fair_mcap / shares, np.nan)
+        has_ev = (fair_value_ev != 0) & ~np.isnan(fair_value_ev) & (price != 0)
+        upside_ev = np.where(has_ev, (fair_value_ev - price) / price * 100, np.nan)
+
+        # Price to Book / Price to Sales
+        pb_ratio = np.where(book_value > 0, price / book_value, np.nan)
+        ps_ratio = np.where(revenue > 0, market_cap / revenue, np.nan)
+
+    return pd.DataFrame({
+        'price': price, 'trailing_pe': raw('trailingPE'), 'forward_pe': raw('forwardPE'),
+        'trailing_eps': raw('trailingEps'), 'industry_pe': industry_pe,
+        'historical_pe': historical_pe,
+        'fair_value_pe': fair_value_pe, 'upside_pe': upside_pe,
+        'enterprise_value': raw('enterpriseValue'), 'ebitda': raw('ebitda'),
+        'market_cap': raw('marketCap'), 'current_ev_ebitda': current_ev_ebitda,
+        'industry_ev_ebitda': industry_ev_ebitda, 'historical_ev_ebitda': historical_ev_ebitda,
+        'fair_value_ev': fair_value_ev, 'upside_ev': upside_ev,
+        'pb_ratio': pb_ratio, 'ps_ratio': ps_ratio,
+        'book_value': raw('bookValue'), 'revenue': raw('totalRevenue'),
+        'net_debt': net_debt,
+        'dividend_yield': raw('dividendYield'),
+        'beta': raw('beta'),
+        'roe': raw('returnOnEquity'),
+        'profit_margin': raw('profitMargins'),
+        '52w_high': raw('fiftyTwoWeekHigh'),
+        '52w_low': raw('fiftyTwoWeekLow'),
+    }, index=df.index)
+
+def summarize_valuation(vals):
+    """Average upside and fair value across the PE and EV/EBITDA methods"""
+    ups = [v for v in [vals['upside_pe'], vals['upside_ev']] if v is not None]
+    avg_up = np.mean(ups) if ups else 0
+    fairs = [v for v in [vals['fair_value_pe'], vals['fair_value_ev']] if v is not None]
+    avg_fair = np.mean(fairs) if fairs else vals['price']
+    return avg_up, avg_fair
+
+def summarize_valuation_frame(vals):
+    """summarize_valuation for every row of a calculate_valuations_frame result"""
+    avg_up = vals[['upside_pe', 'upside_ev']].mean(axis=1).fillna(0)
+    avg_fair = vals[['fair_value_pe', 'fair_value_ev']].mean(axis=1).fillna(vals['price'])
+    return avg_up, avg_fair
+
+SENSITIVITY_STEPS = 9
+
+def target_multiples(vals):
+    """(target PE, target EV/EBITDA) the point estimates value against"""
+    target_pe = (vals['industry_pe'] + vals['historical_pe']) / 2
+    historical_ev = vals['historical_ev_ebitda']
+    target_ev = (vals['industry_ev_ebitda'] + historical_ev) / 2 if historical_ev else vals['industry_ev_ebitda']
+    return target_pe, target_ev
+
+def sensitivity_axis(center, spread, steps=SENSITIVITY_STEPS):
+    """Evenly spaced values from center x (1 - spread) to center x (1 + spread)"""
+    return center * np.linspace(1 - spread, 1 + spread, steps)
+
+def multiple_slider_range(target, upper, step=0.5):
+    """(min, max) slider bounds from about 1x to upper with target exactly on a step"""
+    low = target - step * np.floor(max(target - 1.0, 0.0) / step)
+    return float(low), float(low + step * np.ceil((upper - low) / step))
+
+def valuation_sensitivity(vals, shares, pe_multiples, ev_multiples, changes):
+    """PE and EV/EBITDA fair values per share over (earnings change x target multiple) grids.
+
+    Rows follow changes (fractional EPS / EBITDA moves), columns the target multiples.
+    Either grid is None when its method does not apply.
+    """
+    earnings = 1 + np.asarray(changes, dtype=float)[:, None]
+    fair_pe = fair_ev = None
+    if vals['trailing_eps']:
+        fair_pe = vals['trailing_eps'] * earnings * np.asarray(pe_multiples, dtype=float)
+    if vals['ebitda'] and vals['ebitda'] > 0 and shares:
+        fair_ev = (vals['ebitda'] * earnings * np.asarray(ev_multiples, dtype=float) - vals['net_debt']) / shares
+    return fair_pe, fair_ev
+
+def get_recommendation(avg_up):
+    """Map average upside to (css class, label, icon)"""
+    if avg_up > 25:
+        return "rec-strong-buy", "STRONG BUY", "🚀"
+    elif avg_up > 15:
+        return "rec-buy", "BUY", "✅"
+    elif avg_up > 0:
+        return "rec-buy", "ACCUMULATE", "📥"
+    elif avg_up > -10:
+        return "rec-hold", "HOLD", "⏸️"
+    return "rec-avoid", "AVOID", "⚠️"
+
+def financial_summary(vals):
+    """[(metric, formatted value)] rows of the complete financial summary"""
+    metrics = [
+        'Current Price', 'Market Cap', 'Enterprise Value', 
+        'PE Ratio (TTM)', 'Forward PE', 'EV/EBITDA',
+        'P/B Ratio', 'P/S Ratio', 'EPS (TTM)',
+        'EBITDA', 'Book Value', 'Net Debt',
+        '52W High', '52W Low', 'Beta',
+        'Dividend Yield', 'ROE', 'Profit Margin'
+    ]
+    values = [
+        f"${vals['price']:,.2f}",
+        f"${vals['market_cap']/1000000000:,.2f}B",
+        f"${vals['enterprise_value']/1000000000:,.2f}B" if vals['enterprise_value'] else 'N/A',
+        f"{vals['trailing_pe']:.2f}x" if vals['trailing_pe'] else 'N/A',
+        f"{vals['forward_pe']:.2f}x" if vals['forward_pe'] else 'N/A',
+        f"{vals['current_ev_ebitda']:.2f}x" if vals['current_ev_ebitda'] else 'N/A',
+        f"{vals['pb_ratio']:.2f}x" if vals['pb_ratio'] else 'N/A',
+        f"{vals['ps_ratio']:.2f}x" if vals['ps_ratio'] else 'N/A',
+        f"${vals['trailing_eps']:.2f}" if vals['trailing_eps'] else 'N/A',
+        f"${vals['ebitda']/1000000000:,.2f}B" if vals['ebitda'] else 'N/A',
+        f"${vals['book_value']:.2f}" if vals['book_value'] else 'N/A',
+        f"${vals['net_debt']/1000000000:,.2f}B",
+        f"${vals['52w_high']:,.2f}" if vals['52w_high'] else 'N/A',
+        f"${vals['52w_low']:,.2f}" if vals['52w_low'] else 'N/A',
+        f"{vals['beta']:.2f}" if vals['beta'] else 'N/A',
+        f"{vals['dividend_yield']*100:.2f}%" if vals['dividend_yield'] else 'N/A',
+        f"{vals['roe']*100:.2f}%" if vals['roe'] else 'N/A',
+        f"{vals['profit_margin']*100:.2f}%" if vals['profit_margin'] else 'N/A'
+    ]
+    return list(zip(metrics, values))
+
+# ============================================================================
+# MONTE CARLO VALUATION
+# Fair-value distributions from sampled target multiples, one-year EPS/EBITDA
+# growth and net debt, drawn for many tickers at once as (tickers x draws) arrays.
+# ============================================================================
+MC_DRAWS = 100_000
+MC_BATCH_DRAWS = 20_000      # Per ticker when simulating a whole category
+MC_BATCH_TICKERS = 25        # Tickers per broadcast block - bounds memory to block x draws floats
+MC_MULTIPLE_SD = 0.25        # Log-sd of a target multiple without historical bands
+MC_MULTIPLE_SD_RANGE = (0.05, 0.6)
+MC_GROWTH_SD = 0.15          # One-year EPS / EBITDA growth uncertainty
+MC_GROWTH_CORR = 0.7         # EPS and EBITDA growth move together
+MC_NET_DEBT_SD = 0.1         # Relative uncertainty of net debt
+MC_PERCENTILES = (5, 25, 50, 75, 95)
+MC_HIST_BINS = 60
+
+def monte_carlo_inputs(vals, pe_sd=None, ev_sd=None):
+    """Simulation parameters as {name: float array} from calculate_valuations output.
+
+    vals is either one calculate_valuations dict or a calculate_valuations_frame;
+    pe_sd / ev_sd are log-sds of the target multiples, defaulting to MC_MULTIPLE_SD.
+    """
+    def arr(value):
+        return np.atleast_1d(np.asarray(value, dtype=float))
+    
+    def spread(value):
+        return np.clip(np.nan_to_num(arr(value), nan=MC_MULTIPLE_SD), *MC_MULTIPLE_SD_RANGE)
+    
+    industry_ev, historical_ev = arr(vals['industry_ev_ebitda']), arr(vals['historical_ev_ebitda'])
+    params = {
+        'price': arr(vals['price']),
+        'eps': np.nan_to_num(arr(vals['trailing_eps'])),
+        'pe': (arr(vals['industry_pe']) + arr(vals['historical_pe'])) / 2,
+        'pe_sd': spread(MC_MULTIPLE_SD if pe_sd is None else pe_sd),
+        'ebitda': np.nan_to_num(arr(vals['ebitda'])),
+        'ev_ebitda': np.where(np.isnan(historical_ev), industry_ev, (industry_ev + historical_ev) / 2),
+        'ev_sd': spread(MC_MULTIPLE_SD if ev_sd is None else ev_sd),
+        'net_debt': np.nan_to_num(arr(vals['net_debt'])),
+        'shares': arr(vals.get('shares', np.nan)),
+    }
+    shape = params['price'].shape
+    return {name: np.broadcast_to(values, shape) for name, values in params.items()}
+
+def simulate_fair_values(params, draws=MC_DRAWS, rng=None):
+    """(tickers x draws) float32 fair values per share; rows are NaN where neither method applies.
+
+    Each draw averages the PE and EV/EBITDA fair values like summarize_valuation.
+    Multiples are lognormal around their targets, so the median draw sits near the
+    point estimate. Antithetic pairs halve the normals drawn and the sampling noise.
+    """
+    rng = rng or np.random.default_rng()
+    p = {name: values.astype(np.float32)[:, None] for name, values in params.items()}
+    half = rng.standard_normal((5, len(p['price']), (draws + 1) // 2), dtype=np.float32)
+    z = np.concatenate([half, -half], axis=2)[:, :, :draws]
+    
+    eps_growth = MC_GROWTH_SD * z[0]
+    ebitda_growth = MC_GROWTH_SD * (MC_GROWTH_CORR * z[0] + (1 - MC_GROWTH_CORR ** 2) ** 0.5 * z[1])
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        fair_pe = p['eps'] * (1 + eps_growth) * p['pe'] * np.exp(p['pe_sd'] * z[2])
+        fair_mcap = (p['ebitda'] * (1 + ebitda_growth) * p['ev_ebitda'] * np.exp(p['ev_sd'] * z[3])
+                     - p['net_debt'] * (1 + MC_NET_DEBT_SD * z[4]))
+        fair_ev = fair_mcap / p['shares']
+    
+    has_pe = (p['eps'] != 0) & (p['price'] != 0)
+    has_ev = (p['ebitda'] > 0) & (p['shares'] != 0) & ~np.isnan(p['shares']) & (p['price'] != 0)
+    return np.where(has_pe & has_ev, (fair_pe + fair_ev) / 2,
+                    np.where(has_pe, fair_pe, np.where(has_ev, fair_ev, np.float32(np.nan))))
+
+def summarize_fair_values(fair, price):
+    """Percentiles, mean and probability of upside per row of simulated fair values"""
+    valid = ~np.isnan(fair[:, 0])
+    quantiles = np.percentile(fair, MC_PERCENTILES, axis=1).astype(float)
+    summary = {f'p{q}': values for q, values in zip(MC_PERCENTILES, quantiles)}
+    summary['mean'] = fair.mean(axis=1, dtype=float)
+    summary['prob_upside'] = np.where(valid, (fair > price[:, None]).mean(axis=1) * 100, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['upside_p50'] = (summary['p50'] - price) / price * 100
+    return summary
+
+def monte_carlo_seed(ticker):
+    """Stable per-ticker seed so reruns show the same distribution"""
+    return int(hashlib.sha1(ticker.encode()).hexdigest()[:8], 16)
+
+def monte_carlo_valuation(ticker, info, vals, draws=MC_DRAWS):
+    """Summary dict for one stock, with a histogram of its central 98% of fair-value draws"""
+    params = monte_carlo_inputs(dict(vals, shares=info.get('sharesOutstanding')),
+                                info.get('_hist_pe_sd'), info.get('_hist_ev_ebitda_sd'))
+    fair = simulate_fair_values(params, draws, np.random.default_rng(monte_carlo_seed(ticker)))
+    summary = {name: float(values[0]) for name, values in summarize_fair_values(fair, params['price']).items()}
+    if np.isnan(summary['p50']):
+        return None
+    low, high = np.percentile(fair[0], [1, 99])
+    counts, edges = np.histogram(fair[0], bins=MC_HIST_BINS, range=(low, high))
+    return dict(summary, price=float(params['price'][0]), draws=draws,
+                counts=counts.tolist(), edges=edges.tolist())
+
+def simulate_tickers(infos, benchmarks=None, draws=MC_BATCH_DRAWS, block=MC_BATCH_TICKERS):
+    """Monte Carlo summary per ticker for a {ticker: info} batch, indexed by ticker.
+
+    Valuation inputs are vectorized over the whole batch; draws are simulated block
+    tickers at a time so memory stays at block x draws samples per array.
+    """
+    frame = info_frame(infos)
+    if frame.empty:
+        return pd.DataFrame()
+    vals = calculate_valuations_frame(frame, benchmarks)
+    shares = pd.to_numeric(frame.get('sharesOutstanding', pd.Series(np.nan, index=frame.index)), errors='coerce')
+    params = monte_carlo_inputs(vals.assign(shares=shares),
+                                frame.get('_hist_pe_sd'), frame.get('_hist_ev_ebitda_sd'))
+    rng = np.random.default_rng(monte_carlo_seed('|'.join(sorted(frame.index))))
+    parts = []
+    for i in range(0, len(frame), block):
+        chunk = {name: values[i:i + block] for name, values in params.items()}
+        parts.append(pd.DataFrame(summarize_fair_values(simulate_fair_values(chunk, draws, rng), chunk['price'])))
+    return pd.concat(parts, ignore_index=True).set_index(frame.index).assign(price=params['price'])
+
+# ============================================================================
+# DCF VALUATION
+# Two-stage discounted unlevered free cash flow with a beta-derived WACC, evaluated
+# over a WACC x terminal growth grid for many tickers in one broadcast.
+# ============================================================================
+RISK_FREE_RATE = 0.043
+EQUITY_RISK_PREMIUM = 0.055
+PRE_TAX_COST_OF_DEBT = 0.06
+TAX_RATE = 0.21
+WACC_RANGE = (0.06, 0.16)
+DCF_STAGE1_YEARS = 5         # Years at the starting growth rate
+DCF_STAGE2_YEARS = 5         # Years fading linearly to terminal growth
+DCF_GROWTH_RANGE = (-0.05, 0.25)
+DCF_DEFAULT_GROWTH = 0.05
+TERMINAL_GROWTH = 0.025
+DCF_WACC_OFFSETS = (-0.02, -0.01, 0.0, 0.01, 0.02)
+DCF_TERMINAL_RATES = (0.015, 0.02, 0.025, 0.03, 0.035)
+DCF_CACHE_SIZE = 2048
+
+def dcf_inputs(source):
+    """DCF inputs as {name: float array} from one info dict or an info frame.
+
+    Growth averages reported revenue and earnings growth; WACC blends a CAPM cost of
+    equity (from beta) with after-tax debt at market-cap / total-debt weights.
+    Reported free cash flow is after interest, so after-tax interest at the pre-tax
+    cost of debt is added back to discount firm-level cash flow at the WACC.
+    """
+    def field(name, default=np.nan):
+        value = source.get(name)
+        if value is None:
+            return np.array([default])
+        values = np.atleast_1d(pd.to_numeric(value, errors='coerce')).astype(float)
+        return np.where(np.isnan(values), default, values)
+    
+    revenue_growth, earnings_growth = field('revenueGrowth'), field('earningsGrowth')
+    growth = np.where(np.isnan(revenue_growth), earnings_growth,
+                      np.where(np.isnan(earnings_growth), revenue_growth, (revenue_growth + earnings_growth) / 2))
+    beta = field('beta', 1.0)
+    cost_of_equity = RISK_FREE_RATE + np.where(beta > 0, beta, 1.0) * EQUITY_RISK_PREMIUM
+    equity, debt = field('marketCap', 0.0), field('totalDebt', 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        debt_weight = np.where(equity + debt > 0, debt / (equity + debt), 0.0)
+    wacc = (1 - debt_weight) * cost_of_equity + debt_weight * PRE_TAX_COST_OF_DEBT * (1 - TAX_RATE)
+    current_price = field('currentPrice', 0.0)
+    unlevered_fcf = field('freeCashflow', 0.0) + debt * PRE_TAX_COST_OF_DEBT * (1 - TAX_RATE)
+    
+    params = {
+        'fcf': unlevered_fcf,
+        'growth': np.clip(np.nan_to_num(growth, nan=DCF_DEFAULT_GROWTH), *DCF_GROWTH_RANGE),
+        'wacc': np.clip(wacc, *WACC_RANGE),
+        'net_debt': debt - field('totalCash', 0.0),
+        'shares': field('sharesOutstanding', 0.0),
+        'price': np.where(current_price != 0, current_price, field('regularMarketPrice', 0.0)),
+    }
+    shape = np.broadcast_shapes(*(values.shape for values in params.values()))
+    return {name: np.broadcast_to(values, shape) for name, values in params.items()}
+
+@st.cache_resource(show_spinner=False)
+def get_dcf_cache():
+    """Process-wide DCF grids keyed by a digest of their inputs"""
+    return LRUCache(maxsize=DCF_CACHE_SIZE)
+
+def dcf_grid(params, wacc_offsets=DCF_WACC_OFFSETS, terminal_rates=DCF_TERMINAL_RATES):
+    """(tickers x WACC offsets x terminal rates) equity value per share, read-only.
+
+    NaN where free cash flow or shares are not positive. Price is not an input,
+    so cached grids survive price moves.
+    """
+    stacked = np.stack([np.asarray(params[name], dtype=float)
+                        for name in ('fcf', 'growth', 'wacc', 'net_debt', 'shares')])
+    key = (hashlib.sha1(stacked.tobytes()).hexdigest(), tuple(wacc_offsets), tuple(terminal_rates))
+    cache = get_dcf_cache()
+    values = cache.get(key)
+    if values is not None:
+        return values
+    
+    fcf, growth, wacc, net_debt, shares = (row[:, None, None] for row in stacked)
+    wacc = wacc + np.asarray(wacc_offsets)[None, :, None]
+    terminal = np.asarray(terminal_rates)[None, None, :]
+    years = np.arange(1, DCF_STAGE1_YEARS + DCF_STAGE2_YEARS + 1)
+    fade = np.clip((years - DCF_STAGE1_YEARS) / DCF_STAGE2_YEARS, 0, 1)
+    
+    # Growth path and cash flows: (tickers, 1, terminal rates, years)
+    path = growth[..., None] + (terminal - growth)[..., None] * fade
+    cash_flows = fcf[..., None] * np.cumprod(1 + path, axis=-1)
+    # Discount factors: (tickers, WACCs, 1, years)
+    discount = (1 + wacc[..., None]) ** -years
+    with np.errstate(divide='ignore', invalid='ignore'):
+        explicit = np.einsum('ity,iwy->iwt', cash_flows[:, 0], discount[:, :, 0])
+        terminal_value = cash_flows[..., -1] * (1 + terminal) / (wacc - terminal)
+        per_share = (explicit + terminal_value * discount[..., -1] - net_debt) / shares
+    values = np.where((fcf > 0) & (shares > 0) & (wacc > terminal), per_share, np.nan)
+    values.flags.writeable = False
+    cache.put(key, values)
+    return values
+
+def dcf_base(grid):
+    """Base-case cell (no WACC offset, default terminal growth) of a DCF grid"""
+    return grid[..., DCF_WACC_OFFSETS.index(0.0), DCF_TERMINAL_RATES.index(TERMINAL_GROWTH)]
+
+def dcf_valuation(info):
+    """Base-case DCF and its WACC x terminal growth grid for one stock, or None"""
+    params = dcf_inputs(info)
+    grid = dcf_grid(params)[0]
+    fair_value = dcf_base(grid)
+    if np.isnan(fair_value):
+        return None
+    price = float(params['price'][0])
+    return {
+        'fair_value_dcf': float(fair_value),
+        'upside_dcf': float((fair_value - price) / price * 100) if price else None,
+        'fcf': float(params['fcf'][0]), 'growth': float(params['growth'][0]),
+        'wacc': float(params['wacc'][0]), 'terminal_growth': TERMINAL_GROWTH,
+        'grid': grid,
+    }
+
+def dcf_frame(df):
+    """Vectorized base-case DCF value, upside and grid range per row of an info frame"""
+    params = dcf_inputs(df)
+    grid = dcf_grid(params)
+    base, price = dcf_base(grid), params['price']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upside = np.where(price != 0, (base - price) / price * 100, np.nan)
+    return pd.DataFrame({
+        'fair_value_dcf': base, 'upside_dcf': upside,
+        'dcf_low': grid.min(axis=(1, 2)), 'dcf_high': grid.max(axis=(1, 2)),
+        'wacc': params['wacc'], 'growth': params['growth'],
+    }, index=df.index)
+
+# ============================================================================
+# UNIVERSE SCREENER
+# ============================================================================
+SCREENER_MAX_WORKERS = 4
+
+def get_screen_universe(category):
+    """Tickers and names to screen for a sidebar category"""
+    if category == "📋 All Stocks":
+        return get_all_stocks()
+    return dict(US_STOCKS.get(category, {}))
+
+def screen_row(ticker, name, info, error, benchmarks=None):
+    """Build one screener row from a fetch result"""
+    row = {
+        'Ticker': ticker, 'Company': name, 'Sector': None, 'Price': None,
+        'Fair Value': None, 'Upside PE %': None, 'Upside EV %': None,
+        'Avg Upside %': None, 'DCF Value': None, 'DCF Upside %': None,
+        'Recommendation': None, 'Status': error or 'OK'
+    }
+    vals = get_valuations(ticker, info, benchmarks) if info else None
+    if info and not vals:
+        row['Status'] = 'Valuation failed'
+    if vals:
+        avg_up, avg_fair = summarize_valuation(vals)
+        row.update({
+            'Company': info.get('longName', name), 'Sector': info.get('sector'), 'Industry': info.get('industry'),
+            'Price': vals['price'], 'Fair Value': float(avg_fair),
+            'Upside PE %': vals['upside_pe'], 'Upside EV %': vals['upside_ev'],
+            'Avg Upside %': float(avg_up), 'Recommendation': get_recommendation(avg_up)[1]
+        })
+        dcf = dcf_valuation(info)
+        if dcf:
+            row.update({'DCF Value': dcf['fair_value_dcf'], 'DCF Upside %': dcf['upside_dcf']})
+    return row
+
+def fetch_universe(stocks, max_workers=SCREENER_MAX_WORKERS):
+    """Fetch many tickers with bounded concurrency, yielding (ticker, info, error) as they finish.
+
+    Fundamentals are fetched per ticker, cache first. Prices come from the price layer
+    in the same worker, so nothing is fetched up front: an upstream fetch seeds them,
+    and only tickers served from the store take a price request of their own.
+    """
+    ctx = get_script_run_ctx()
+
+    def work(ticker):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        info, error = fetch_stock_cached(ticker)
+        if info is None:
+            return info, error
+        info = with_bands(info, get_band_store().get_bands(ticker))
+        return with_prices(info, get_prices([ticker]).get(ticker)), error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(work, t): t for t in stocks}
+        try:
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    info, error = future.result()
+                except Exception as e:
+                    info, error = None, f"Error: {str(e)[:60]}"
+                yield ticker, info, error
+        finally:
+            for future in futures:
+                future.cancel()
+
+def screen_universe(stocks, max_workers=SCREENER_MAX_WORKERS, benchmarks=None):
+    """Value many tickers with bounded concurrency, yielding rows as they finish"""
+    for ticker, info, error in fetch_universe(stocks, max_workers):
+        yield screen_row(ticker, stocks[ticker], info, error, benchmarks)
+
+def rescore_screen_rows(rows, sector_key, benchmarks):
+    """Recompute screener rows that depend on one sector benchmark; returns how many changed"""
+    affected = {r['Ticker']: r for r in rows
+                if r['Avg Upside %'] is not None
+                and resolve_benchmark(r['Sector'], benchmarks, r.get('Industry'))[0] == sector_key}
+    if not affected:
+        return 0
+    vals = revalue_tickers(list(affected), benchmarks)
+    if vals.empty:
+        return 0
+    avg_up, avg_fair = summarize_valuation_frame(vals)
+    for t in vals.index:
+        up = float(avg_up[t])
+        affected[t].update({
+            'Price': float(vals.at[t, 'price']), 'Fair Value': float(avg_fair[t]),
+            'Upside PE %': None if pd.isna(vals.at[t, 'upside_pe']) else float(vals.at[t, 'upside_pe']),
+            'Upside EV %': None if pd.isna(vals.at[t, 'upside_ev']) else float(vals.at[t, 'upside_ev']),
+            'Avg Upside %': up, 'Recommendation': get_recommendation(up)[1]
+        })
+        dcf_value, price = affected[t].get('DCF Value'), affected[t]['Price']
+        if dcf_value is not None and price:
+            affected[t]['DCF Upside %'] = (dcf_value - price) / price * 100
+    return len(vals)
+
+def screen_results_frame(rows):
+    """Screener rows as a DataFrame sorted by average upside"""
+    df = pd.DataFrame(rows, columns=[
+        'Ticker', 'Company', 'Sector', 'Price', 'Fair Value', 'Upside PE %',
+        'Upside EV %', 'Avg Upside %', 'DCF Value', 'DCF Upside %', 'Recommendation', 'Status'
+    ])
+    return df.sort_values('Avg Upside %', ascending=False, na_position='last').reset_index(drop=True)
+
+# ============================================================================
+# SECTOR BENCHMARK ENGINE
+# Peer multiples computed from the stored fundamentals of the universe.
+# ============================================================================
+BENCHMARK_METRICS = ['pe', 'ev_ebitda', 'ps', 'revenue_growth', 'earnings_growth']
+BENCHMARK_MIN_PEERS = 5      # Groups with fewer valid values fall back to the static tables
+BENCHMARK_TRIM = 0.1         # Trimmed mean drops the top and bottom 10% of each group
+BENCHMARK_KEEP_SNAPSHOTS = 30
+INDUSTRY_KEY_PREFIX = 'Industry: '   # Benchmark keys for industries with enough peers
+
+def peer_metrics_frame(infos):
+    """Per-ticker sector, industry and peer multiples from a {ticker: info} mapping.
+
+    Loss makers and outliers are NaN so they do not skew group statistics.
+    """
+    df = info_frame(infos)
+    out = pd.DataFrame(index=df.index)
+    if df.empty:
+        return out.assign(sector=[], industry=[], market_cap=[], **{m: [] for m in BENCHMARK_METRICS})
+
+    def col(name):
+        if name not in df:
+            return pd.Series(np.nan, index=df.index)
+        return pd.to_numeric(df[name], errors='coerce')
+
+    def within(values, low, high):
+        return values.where((values > low) & (values < high))
+
+    out['sector'] = df['sector'].fillna('Default') if 'sector' in df else 'Default'
+    out['industry'] = df['industry'].fillna('Unknown') if 'industry' in df else 'Unknown'
+    out['pe'] = within(col('trailingPE'), 0, 200)
+    ebitda = col('ebitda')
+    out['ev_ebitda'] = within(col('enterpriseValue') / ebitda.where(ebitda > 0), 0, 100)
+    revenue = col('totalRevenue')
+    out['ps'] = within(col('marketCap') / revenue.where(revenue > 0), 0, 100)
+    out['revenue_growth'] = within(col('revenueGrowth') * 100, -100, 500)
+    out['earnings_growth'] = within(col('earningsGrowth') * 100, -100, 500)
+    out['market_cap'] = within(col('marketCap'), 0, np.inf)
+    return out
+
+def group_stats(metrics, key, trim=BENCHMARK_TRIM):
+    """Median, trimmed mean and count of every metric, grouped by key"""
+    values = metrics[BENCHMARK_METRICS]
+    groups = metrics[key]
+    grouped = values.groupby(groups)
+    low = grouped.quantile(trim).reindex(groups).to_numpy()
+    high = grouped.quantile(1 - trim).reindex(groups).to_numpy()
+    trimmed = values.where((values >= low) & (values <= high)).groupby(groups).mean()
+    return pd.concat(
+        {'median': grouped.median(), 'trimmed_mean': trimmed, 'n': grouped.count()}, axis=1
+    )
+
+class SectorBenchmarkEngine:
+    """Peer benchmarks per sector and industry, refreshed from the fundamentals store.
+
+    Only tickers fetched since the last refresh are read back, and only the
+    sectors and industries they touch are re-aggregated. Each refresh that
+    changes anything is saved as a new versioned snapshot.
+    """
+
+    def __init__(self, store, universe=None):
+        self.store = store
+        self.universe = set(universe) if universe is not None else None
+        self.lock = threading.Lock()
+        self.watermark = 0
+        self.metrics = peer_metrics_frame({})
+        self.stats = {'sector': None, 'industry': None}
+        latest = store.get_snapshot()
+        self.version, self.created_at, self.snapshot = latest if latest else (None, None, None)
+        self.load()
+
+    def load(self):
+        """Seed peer metrics from every stored ticker; snapshot only if the stored one is older"""
+        rows = [r for r in self.store.latest_since(0) if self.universe is None or r[0] in self.universe]
+        if not rows:
+            return
+        self.watermark = max(fetched_at for _, _, fetched_at in rows)
+        self.metrics = peer_metrics_frame({ticker: info for ticker, info, _ in rows})
+        for level in ('sector', 'industry'):
+            self.stats[level] = group_stats(self.metrics, level).sort_index()
+        if self.created_at is None or self.created_at < self.watermark:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """Persist the current stats as a new versioned snapshot"""
+        self.snapshot = {
+            'peers': len(self.metrics),
+            'overall': group_stats(self.metrics.assign(all='all'), 'all').iloc[0].unstack(0).to_dict('index'),
+            'sectors': self.stats_payload('sector'),
+            'industries': self.stats_payload('industry'),
+        }
+        self.version = self.store.put_snapshot(self.snapshot, keep=BENCHMARK_KEEP_SNAPSHOTS)
+        self.created_at = time.time()
+
+    def update_stats(self, level, touched):
+        """Re-aggregate only the touched groups of one level"""
+        fresh = group_stats(self.metrics[self.metrics[level].isin(touched)], level)
+        old = self.stats[level]
+        if old is not None:
+            old = old.drop(index=[g for g in touched if g in old.index])
+            fresh = pd.concat([old, fresh]) if not fresh.empty else old
+        self.stats[level] = fresh.sort_index()
+
+    def refresh(self):
+        """Fold newly stored fundamentals into the benchmarks; returns the current version"""
+        with self.lock:
+            rows = self.store.latest_since(self.watermark)
+            rows = [r for r in rows if self.universe is None or r[0] in self.universe]
+            if not rows:
+                return self.version
+            self.watermark = max(fetched_at for _, _, fetched_at in rows)
+            new = peer_metrics_frame({ticker: info for ticker, info, _ in rows})
+            replaced = self.metrics.loc[self.metrics.index.intersection(new.index)]
+            touched = {
+                level: set(new[level]) | set(replaced[level]) for level in ('sector', 'industry')
+            }
+            self.metrics = pd.concat([self.metrics.drop(index=replaced.index), new])
+            for level, groups in touched.items():
+                self.update_stats(level, groups)
+            self.save_snapshot()
+            return self.version
+
+    def stats_payload(self, level):
+        """{group: {metric: {'median', 'trimmed_mean', 'n'}}} for a stats frame"""
+        stats = self.stats[level]
+        return {
+            group: stats.loc[group].unstack(0).to_dict('index') for group in stats.index
+        }
+
+    def benchmarks(self, stat='median', min_peers=BENCHMARK_MIN_PEERS):
+        """INDUSTRY_BENCHMARKS-shaped multiples using live peer stats where enough peers exist.
+
+        Industries with enough peers get their own INDUSTRY_KEY_PREFIX entry on top
+        of their sector's multiples; resolve_benchmark prefers those.
+        """
+        merged = {
+            sector: dict(multiples, **GROWTH_BENCHMARKS.get(sector, GROWTH_BENCHMARKS['Default']))
+            for sector, multiples in INDUSTRY_BENCHMARKS.items()
+        }
+        if not self.snapshot:
+            return merged
+        
+        groups = dict(self.snapshot['sectors'], Default=self.snapshot['overall'])
+        for sector, metrics in groups.items():
+            target = merged.setdefault(sector, dict(merged['Default']))
+            for metric, summary in metrics.items():
+                value = summary.get(stat)
+                if summary.get('n', 0) >= min_peers and value is not None and not np.isnan(value):
+                    target[metric] = round(float(value), 1)
+        
+        sector_of = self.metrics.groupby('industry')['sector'].first()
+        for industry in self.snapshot['industries']:
+            values = self.industry_benchmark(industry, stat, min_peers) if industry != 'Unknown' else None
+            if values:
+                base = merged.get(sector_of.get(industry), merged['Default'])
+                merged[INDUSTRY_KEY_PREFIX + industry] = dict(base, **values)
+        return merged
+
+    def industry_benchmark(self, industry, stat='median', min_peers=BENCHMARK_MIN_PEERS):
+        """{metric: value} for an industry's peers, omitting metrics with too few peers"""
+        metrics = (self.snapshot or {}).get('industries', {}).get(industry, {})
+        return {
+            metric: round(float(summary[stat]), 1) for metric, summary in metrics.items()
+            if summary.get('n', 0) >= min_peers and summary.get(stat) is not None and not np.isnan(summary[stat])
+        }
+
+@st.cache_resource(show_spinner=False)
+def get_benchmark_engine():
+    """Process-wide benchmark engine over the universe's stored fundamentals"""
+    return SectorBenchmarkEngine(get_fundamentals_store(), get_universe().names)
+
+# ============================================================================
+# PEER COMPARISON
+# Peer sets are precomputed for the whole universe whenever benchmarks change.
+# ============================================================================
+PEER_COUNT = 15
+PEER_TIERS = ('industry', 'sector', 'universe_sector')   # Closest grouping first
+
+class PeerIndex:
+    """Closest peers per ticker: same industry, then sector, nearest in market cap"""
+
+    def __init__(self, universe, metrics, k=PEER_COUNT):
+        self.k = k
+        tickers = pd.Index(list(universe.names)).union(metrics.index)
+        frame = pd.DataFrame({
+            'industry': metrics['industry'], 'sector': metrics['sector'],
+            'universe_sector': pd.Series(universe.sectors)
+        }).reindex(tickers)
+        self.log_cap = np.log(metrics['market_cap'].reindex(tickers))
+        self.groups = {
+            tier: {key: members.index.to_numpy(dtype=object)
+                   for key, members in frame[tier].dropna().groupby(frame[tier].dropna())}
+            for tier in PEER_TIERS
+        }
+        ranked = {}
+        for tier in PEER_TIERS:
+            for members in self.groups[tier].values():
+                for ticker, order in zip(members, self.rank(members, self.log_cap.reindex(members))):
+                    ranked.setdefault(ticker, []).append(order)
+        self.peers = {ticker: self.merge(ticker, tiers) for ticker, tiers in ranked.items()}
+
+    def rank(self, members, target_caps):
+        """For each target log market cap, members ordered by distance (unknown caps last)"""
+        caps = self.log_cap.reindex(members).to_numpy()
+        distance = np.abs(np.asarray(target_caps, dtype=float)[:, None] - caps[None, :])
+        distance[np.isnan(distance)] = np.inf
+        order = np.argsort(distance, axis=1, kind='stable')[:, :self.k + 1]
+        return [members[row].tolist() for row in order]
+
+    def merge(self, ticker, tiers):
+        """Concatenate tier rankings without duplicates, capped at k"""
+        peers = []
+        for ranked in tiers:
+            peers.extend(t for t in ranked if t != ticker and t not in peers)
+            if len(peers) >= self.k:
+                break
+        return peers[:self.k]
+
+    def peers_for(self, ticker, info=None):
+        """Precomputed peers, or peers ranked on the fly for a ticker outside the universe"""
+        if ticker in self.peers or not info:
+            return self.peers.get(ticker, [])
+        keys = {'industry': info.get('industry'), 'sector': info.get('sector'), 'universe_sector': None}
+        cap = info.get('marketCap')
+        log_cap = np.log(cap) if cap and cap > 0 else np.nan
+        tiers = [self.rank(self.groups[tier][key], [log_cap])[0]
+                 for tier, key in keys.items() if key in self.groups[tier]]
+        return self.merge(ticker, tiers)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_peer_index(version):
+    """Peer index for a benchmark snapshot version, rebuilt only when the version changes"""
+    return PeerIndex(get_universe(), get_benchmark_engine().metrics)
+
+def load_peers(tickers, fetch_missing=False, max_workers=SCREENER_MAX_WORKERS):
+    """({ticker: info}, [missing]) for peers from stored fundamentals with cached prices.
+
+    Peers without stored fundamentals are fetched concurrently only when fetch_missing is set.
+    Expired prices are served as they are and refreshed in the background for the next render.
+    """
+    stored = {t: get_fundamentals_store().get(t) for t in tickers}
+    bands = get_band_store()
+    infos = {t: with_bands(stamp_info(*s), bands.get_bands(t)) for t, s in stored.items() if s is not None}
+    missing = [t for t in tickers if t not in infos]
+    if fetch_missing and missing:
+        for ticker, info, _ in fetch_universe({t: t for t in missing}, max_workers):
+            if info:
+                infos[ticker] = info
+        missing = [t for t in missing if t not in infos]
+    prices = get_price_cache()
+    prices.revalidate(list(infos))
+    cached = prices.peek(list(infos))
+    return {t: with_prices(infos[t], cached.get(t)) for t in tickers if t in infos}, missing
+
+def peer_frame(ticker, info, peer_infos, benchmarks=None):
+    """Relative-value table for a stock and its peers, subject first then by market cap"""
+    infos = dict(peer_infos)
+    infos[ticker] = info
+    df = info_frame(infos)
+    vals = calculate_valuations_frame(df, benchmarks)
+    avg_up, _ = summarize_valuation_frame(vals)
+    dcf = dcf_frame(df)
+    names = get_all_stocks()
+    company = df['longName'] if 'longName' in df else pd.Series(index=df.index, dtype=object)
+    frame = pd.DataFrame({
+        'Company': company.fillna(pd.Series(names)).fillna(pd.Series(df.index, index=df.index)),
+        'Price': vals['price'],
+        'Market Cap ($B)': vals['market_cap'] / 1e9,
+        'PE': vals['trailing_pe'].where(vals['trailing_pe'] > 0),
+        'EV/EBITDA': vals['current_ev_ebitda'],
+        'P/S': vals['ps_ratio'],
+        'Profit Margin %': vals['profit_margin'] * 100,
+        'Avg Upside %': avg_up,
+        'DCF Upside %': dcf['upside_dcf'],
+    })
+    order = [ticker] + frame.drop(index=ticker)['Market Cap ($B)'].sort_values(ascending=False).index.tolist()
+    return frame.loc[order].rename_axis('Ticker')
+
+def peer_premiums(frame, ticker):
+    """{multiple: % premium (+) or discount (-) of the stock to its peer median}"""
+    peers = frame.drop(index=ticker)
+    premiums = {}
+    for multiple in ('PE', 'EV/EBITDA', 'P/S'):
+        own, median = frame.at[ticker, multiple], peers[multiple].median()
+        if pd.notna(own) and pd.notna(median) and median > 0:
+            premiums[multiple] = (own / median - 1) * 100
+    return premiums
+
+# ============================================================================
+# VALUATION CACHE & BACKGROUND WARMER
+# ============================================================================
+WARM_WATCHLIST = [t.strip().upper() for t in os.environ.get('USV_WARM_TICKERS', '').split(',') if t.strip()] \
+    or list(US_STOCKS.get("🏆 Mega Cap Top 50", {}))
+WARM_TOP_N = int(os.environ.get('USV_WARM_TOP_N', 20))
+WARM_REFRESH_MARGIN = 1800  # refresh 30 minutes before the TTL runs out
+WARM_SWEEP_INTERVAL = 300
+WARM_UNIVERSE_BATCH = int(os.environ.get('USV_WARM_UNIVERSE_BATCH', 50))  # History/bands backfill per sweep
+WARM_ENABLED = os.environ.get('USV_CACHE_WARMER', '1') != '0'
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
+
+@st.cache_resource(show_spinner=False)
+def get_valuation_cache():
+    """Process-wide valuation results keyed by (ticker, fetch time, sector benchmark)"""
+    return LRUCache(maxsize=4096)
+
+def resolve_benchmark(sector, benchmarks=None, industry=None):
+    """(benchmark key, multiples) calculate_valuations uses: industry, else sector, else Default"""
+    benchmarks = benchmarks or INDUSTRY_BENCHMARKS
+    for key in (INDUSTRY_KEY_PREFIX + industry if industry else None, sector):
+        if key in benchmarks:
+            return key, benchmarks[key]
+    return 'Default', benchmarks['Default']
+
+def get_valuations(ticker, info, benchmarks=None):
+    """calculate_valuations shared across sessions for the same fundamentals and benchmark, repriced.
+
+    Cache keys include the sector's own multiples, so tuning one sector's
+    benchmark only invalidates that sector's tickers.
+    """
+    fetched_at = info.get('_fetched_at')
+    if fetched_at is None:
+        return calculate_valuations(info, benchmarks)
+    _, benchmark = resolve_benchmark(info.get('sector', 'Default'), benchmarks, info.get('industry'))
+    
+    cache = get_valuation_cache()
+    key = (ticker, fetched_at, tuple(sorted(benchmark.items())),
+           info.get('_hist_pe'), info.get('_hist_ev_ebitda'))
+    vals = cache.get(key)
+    if vals is None:
+        vals = calculate_valuations(info, benchmarks)
+        cache.put(key, vals)
+        return vals
+    # Same fundamentals: only the price-dependent fields need refreshing
+    return reprice_valuations(vals, info, benchmarks) if vals else vals
+
+def cached_info(ticker):
+    """Stored fundamentals with cached prices applied - never calls upstream"""
+    stored = get_fundamentals_store().get(ticker)
+    if stored is None:
+        return None
+    info = with_bands(stamp_info(*stored), get_band_store().get_bands(ticker))
+    return with_prices(info, get_price_cache().peek([ticker]).get(ticker))
+
+def revalue_tickers(tickers, benchmarks=None):
+    """Vectorized valuations for tickers from cached fundamentals, indexed by ticker"""
+    infos = {t: cached_info(t) for t in tickers}
+    frame = info_frame(infos)
+    if frame.empty:
+        return pd.DataFrame()
+    return calculate_valuations_frame(frame, benchmarks)
+
+class CacheWarmer:
+    """Keep popular tickers fetched and valued ahead of user requests"""
+
+    def __init__(self, watchlist=WARM_WATCHLIST, top_n=WARM_TOP_N,
+                 refresh_margin=WARM_REFRESH_MARGIN, sweep_interval=WARM_SWEEP_INTERVAL):
+        self.watchlist = list(watchlist)
+        self.top_n = top_n
+        self.refresh_margin = refresh_margin
+        self.sweep_interval = sweep_interval
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.warmed = 0
+        self.failures = 0
+        self.last_error = None
+        self.cursor = 0
+        self.thread = None
+
+    def record_request(self, ticker):
+        with self.lock:
+            self.requests[ticker] += 1
+
+    def targets(self):
+        """Watch list followed by the most requested tickers"""
+        with self.lock:
+            popular = [t for t, _ in self.requests.most_common(self.top_n)]
+        return list(dict.fromkeys(self.watchlist + popular))
+
+    def warm(self, ticker, live_benchmarks=None):
+        """Refresh a ticker that is missing or close to expiry and pre-compute its valuations.
+
+        Valuations are keyed like the page's: with the ticker's bands, against the
+        standard benchmarks and, when given, the live peer benchmarks.
+        """
+        store = get_fundamentals_store()
+        max_age = max(0, store.ttl - self.refresh_margin)
+        if store.get(ticker, max_age=max_age) is not None:
+            return False
+        info, _ = get_fetch_flight().do(ticker, fetch_and_store, ticker, max_age)
+        if info is None:
+            return False
+        info = with_bands(info, get_band_store().get_bands(ticker))
+        get_valuations(ticker, info)
+        if live_benchmarks:
+            get_valuations(ticker, info, live_benchmarks)
+        self.warmed += 1
+        return True
+
+    def universe_slice(self, size=WARM_UNIVERSE_BATCH):
+        """Next rotating slice of the universe, so every ticker's history and bands get built"""
+        universe = sorted(get_universe().names)
+        if not universe or size <= 0:
+            return []
+        start = self.cursor % len(universe)
+        self.cursor = start + size
+        return (universe + universe)[start:start + min(size, len(universe))]
+
+    def yield_to_users(self):
+        """Wait while user requests are queued on the shared limiter or Yahoo is throttling"""
+        while get_rate_limiter().stats()['queue_depth'] > 0 or get_upstream_breaker().remaining() > 0:
+            time.sleep(1)
+
+    def update_history(self, tickers, batch_size=PRICE_BATCH_SIZE):
+        store = get_history_store()
+        for i in range(0, len(tickers), batch_size):
+            self.yield_to_users()
+            store.update(tickers[i:i + batch_size], batch_size)
+
+    def record_failure(self, step, error):
+        logger.warning("Cache warmer step %s failed", step, exc_info=error)
+        with self.lock:
+            self.failures += 1
+            self.last_error = f"{step}: {type(error).__name__}"
+
+    def isolated(self, func, *args, **kwargs):
+        """Run an optional sweep step; a failure is logged and counted, and the sweep goes on"""
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(func.__name__, e)
+            return None
+
+    def stats(self):
+        """Tickers warmed and failed steps since start, with the last failure"""
+        with self.lock:
+            return {'warmed': self.warmed, 'failures': self.failures, 'last_error': self.last_error}
+
+    def sweep(self):
+        targets = self.targets()
+        engine = get_benchmark_engine()
+        live_benchmarks = engine.benchmarks() if engine.snapshot else None
+        refreshed = set()
+        for ticker in targets:
+            # Yield to user requests queued on the shared limiter
+            self.yield_to_users()
+            if self.warm(ticker, live_benchmarks):
+                refreshed.add(ticker)
+        engine.refresh()
+        # Leftover budget: prices the warm loop did not seed, then price history and
+        # valuation bands, targets first and then a rotating universe slice
+        self.isolated(get_prices, [t for t in targets if t not in refreshed])
+        series = list(dict.fromkeys(targets + self.universe_slice()))
+        self.isolated(self.update_history, series)
+        self.isolated(update_bands, series, pause=self.yield_to_users)
+
+    def run_forever(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                self.record_failure('sweep', e)
+            time.sleep(self.sweep_interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run_forever, name="cache-warmer", daemon=True)
+            self.thread.start()
+        return self
+
+@st.cache_resource(show_spinner=False)
+def get_cache_warmer():
+    """Process-wide warmer; its background thread starts once per server process"""
+    warmer = CacheWarmer()
+    return warmer.start() if WARM_ENABLED else warmer
+
+# Standalone warmer: python us_stock_valuation_pro.py --warm
+if __name__ == "__main__" and "--warm" in sys.argv:
+    print(f"Warming {len(WARM_WATCHLIST)} tickers into {FUNDAMENTALS_DB_PATH}")
+    CacheWarmer().run_forever()
+
 # ============================================================================
 # PROFESSIONAL CHART FUNCTIONS
+# Figures are memoized by a content hash of their inputs and shared across sessions.
+# Rendering a cached Figure skips construction; st.plotly_chart re-validates dicts/JSON.
 # ============================================================================
+FIGURE_CACHE_SIZE = 256
+_NO_FIGURE = object()
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Process-wide built figures keyed by (chart, content hash of inputs)"""
+    return LRUCache(maxsize=FIGURE_CACHE_SIZE)
+
+def content_hash(*args):
+    """Stable digest of JSON-serializable chart inputs"""
+    return hashlib.sha1(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()
+
+def memoize_figure(func):
+    """Build a chart once per distinct input; callers must treat the figure as read-only"""
+    @wraps(func)
+    def wrapper(*args):
+        cache = get_figure_cache()
+        key = (func.__name__, content_hash(*args))
+        fig = cache.get(key, _NO_FIGURE)
+        if fig is _NO_FIGURE:
+            fig = func(*args)
+            cache.put(key, fig)
+        return fig
+    return wrapper
+
+@memoize_figure
 def create_gauge_chart(upside_pe, upside_ev):
     """Create professional dual gauge chart for valuations"""
-    fig = make_subplots(
+    fig = plotly_subplots.make_subplots(
         rows=1, cols=2,
         specs=[[{'type': 'indicator'}, {'type': 'indicator'}]],
         horizontal_spacing=0.15
@@ -1419,6 +3416,7 @@ def create_gauge_chart(upside_pe, upside_ev):
     )
     return fig
 
+@memoize_figure
 def create_valuation_comparison_chart(vals):
     """Create professional bar chart comparing current vs fair values"""
     categories = []
@@ -1530,6 +3528,7 @@ def create_52week_range_display(vals):
     '''
     return html
 
+@memoize_figure
 def create_radar_chart(vals):
     """Create radar chart for key metrics comparison"""
     categories = ['PE Ratio', 'EV/EBITDA', 'P/B Ratio', 'Profit Margin', 'ROE']
@@ -1589,116 +3588,420 @@ def create_radar_chart(vals):
     
     return fig
 
-# ============================================================================
-# PDF REPORT GENERATION
-# ============================================================================
-def create_pdf_report(company, ticker, sector, vals):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'Title', 
-        parent=styles['Heading1'], 
-        fontSize=28, 
-        textColor=colors.HexColor('#1565c0'), 
-        alignment=TA_CENTER,
-        spaceAfter=20
+def create_peer_scatter(frame, ticker):
+    """EV/EBITDA vs profit margin for a stock and its peers, sized by market cap"""
+    data = frame.dropna(subset=['EV/EBITDA', 'Profit Margin %'])
+    if len(data) < 2:
+        return None
+    
+    is_subject = data.index == ticker
+    sizes = np.sqrt(data['Market Cap ($B)'].fillna(0).clip(lower=1))
+    fig = go.Figure(go.Scatter(
+        x=data['Profit Margin %'],
+        y=data['EV/EBITDA'],
+        mode='markers+text',
+        text=data.index,
+        textposition='top center',
+        textfont=dict(size=11, color='#e2e8f0'),
+        marker=dict(
+            size=np.clip(sizes / sizes.max() * 40, 8, 40),
+            color=np.where(is_subject, '#ffd54f', '#42a5f5'),
+            line=dict(color=np.where(is_subject, '#ff8f00', '#1976d2'), width=2),
+            opacity=0.85
+        ),
+        customdata=data[['Company', 'Market Cap ($B)']],
+        hovertemplate='<b>%{text}</b> %{customdata[0]}<br>Margin: %{x:.1f}%<br>'
+                      'EV/EBITDA: %{y:.1f}x<br>Mkt Cap: $%{customdata[1]:,.1f}B<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        height=420,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12, color='#e2e8f0'),
+        showlegend=False,
+        xaxis=dict(
+            title='Profit Margin (%)',
+            showgrid=True,
+            gridcolor='rgba(167, 139, 250, 0.2)',
+            ticksuffix='%',
+            tickfont=dict(size=12, color='#a78bfa')
+        ),
+        yaxis=dict(
+            title='EV/EBITDA',
+            showgrid=True,
+            gridcolor='rgba(167, 139, 250, 0.2)',
+            ticksuffix='x',
+            tickfont=dict(size=12, color='#a78bfa')
+        ),
+        margin=dict(l=60, r=40, t=40, b=50)
+    )
+    
+    return fig
+    
+@memoize_figure
+def create_band_chart(bands, metric, label):
+    """Monthly multiple against its rolling p10-p90 and p25-p75 bands"""
+    monthly = bands.get(f'{metric}_monthly')
+    if not monthly or not bands.get(metric):
+        return None
+    
+    months = bands['months']
+    fig = go.Figure()
+    for low, high, fill in (('p10', 'p90', 'rgba(66, 165, 245, 0.12)'), ('p25', 'p75', 'rgba(66, 165, 245, 0.25)')):
+        fig.add_trace(go.Scatter(x=months, y=monthly[high], mode='lines', line=dict(width=0),
+                                 hoverinfo='skip', showlegend=False))
+        fig.add_trace(go.Scatter(x=months, y=monthly[low], mode='lines', line=dict(width=0),
+                                 fill='tonexty', fillcolor=fill, name=f'{low}-{high}', hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=months, y=monthly['p50'], mode='lines', name='Median',
+                             line=dict(color='#a78bfa', width=2, dash='dash')))
+    fig.add_trace(go.Scatter(x=months, y=monthly['value'], mode='lines', name=label,
+                             line=dict(color='#ffd54f', width=2.5),
+                             hovertemplate='%{x}<br>' + label + ': %{y:.1f}x<extra></extra>'))
+    
+    fig.update_layout(
+        height=340,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12, color='#e2e8f0'),
+        legend=dict(orientation='h', y=1.1, x=0),
+        xaxis=dict(showgrid=False, tickfont=dict(size=11, color='#a78bfa')),
+        yaxis=dict(
+            title=label,
+            showgrid=True,
+            gridcolor='rgba(167, 139, 250, 0.2)',
+            ticksuffix='x',
+            tickfont=dict(size=12, color='#a78bfa')
+        ),
+        margin=dict(l=60, r=30, t=40, b=40)
     )
     
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=colors.HexColor('#64748b'),
-        alignment=TA_CENTER,
-        spaceAfter=30
+    return fig
+
+@memoize_figure
+def create_sensitivity_heatmap(fair_values, multiples, changes, price, label):
+    """Upside heatmap over target multiple (x) and earnings change (y), annotated with fair values"""
+    fair_values = np.asarray(fair_values)
+    upside = (fair_values - price) / price * 100
+    fig = go.Figure(go.Heatmap(
+        z=upside,
+        x=[f"{m:.1f}x" for m in multiples],
+        y=[f"{c * 100:+.0f}%" for c in changes],
+        customdata=fair_values,
+        text=[[f"${v:,.0f}" for v in row] for row in fair_values],
+        texttemplate='%{text}',
+        textfont=dict(size=10),
+        colorscale='RdYlGn',
+        zmid=0,
+        colorbar=dict(title='Upside', ticksuffix='%'),
+        hovertemplate=f'{label} %{{x}} | change %{{y}}<br>Fair value $%{{customdata:,.2f}}'
+                      '<br>Upside %{z:+.1f}%<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        height=380,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12, color='#e2e8f0'),
+        xaxis=dict(title=f'Target {label}', tickfont=dict(size=11, color='#a78bfa')),
+        yaxis=dict(title='EPS change' if label == 'PE' else 'EBITDA change',
+                   tickfont=dict(size=11, color='#a78bfa')),
+        margin=dict(l=70, r=30, t=30, b=50)
     )
     
-    story = []
-    story.append(Paragraph("US Stock Valuation Pro", title_style))
-    story.append(Paragraph("Professional Valuation Report", subtitle_style))
-    story.append(Spacer(1, 10))
+    return fig
+
+@memoize_figure
+def create_monte_carlo_chart(mc):
+    """Histogram of simulated fair values with the 90% interval, median and current price"""
+    edges = np.asarray(mc['edges'])
+    centers = (edges[:-1] + edges[1:]) / 2
+    inside = (centers >= mc['p5']) & (centers <= mc['p95'])
+    fig = go.Figure(go.Bar(
+        x=centers,
+        y=np.asarray(mc['counts']) / mc['draws'] * 100,
+        width=np.diff(edges),
+        marker=dict(color=np.where(inside, '#42a5f5', 'rgba(66, 165, 245, 0.35)')),
+        hovertemplate='$%{x:,.2f}<br>%{y:.2f}% of draws<extra></extra>'
+    ))
+    for value, color, label in ((mc['price'], '#ffd54f', 'Price'), (mc['p50'], '#66bb6a', 'Median')):
+        fig.add_vline(x=value, line=dict(color=color, width=2, dash='dash'),
+                      annotation_text=f"{label} ${value:,.2f}", annotation_font_color=color)
     
-    # Company Info
-    story.append(Paragraph(f"<b>{company}</b>", styles['Heading2']))
-    story.append(Paragraph(f"Ticker: {ticker} | Sector: {sector}", styles['Normal']))
-    story.append(Paragraph(f"Report Date: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
-    story.append(Spacer(1, 30))
+    fig.update_layout(
+        height=360,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12, color='#e2e8f0'),
+        showlegend=False,
+        bargap=0,
+        xaxis=dict(title='Fair Value per Share', tickprefix='$', showgrid=False,
+                   tickfont=dict(size=11, color='#a78bfa')),
+        yaxis=dict(title='% of Draws', showgrid=True, gridcolor='rgba(167, 139, 250, 0.2)',
+                   tickfont=dict(size=11, color='#a78bfa')),
+        margin=dict(l=60, r=30, t=40, b=50)
+    )
     
-    # Calculate averages
-    ups = [v for v in [vals['upside_pe'], vals['upside_ev']] if v is not None]
-    avg_up = np.mean(ups) if ups else 0
-    fairs = [v for v in [vals['fair_value_pe'], vals['fair_value_ev']] if v is not None]
-    avg_fair = np.mean(fairs) if fairs else vals['price']
+    return fig
+
+# ============================================================================
+# PDF REPORT GENERATION
+# Reports are built only when a download is requested and cached per data version.
+# Charts are drawn with reportlab's own graphics, so no browser renderer is needed.
+# ============================================================================
+rl_colors = LazyModule('reportlab.lib.colors')
+rl_pagesizes = LazyModule('reportlab.lib.pagesizes')
+rl_platypus = LazyModule('reportlab.platypus')
+rl_styles = LazyModule('reportlab.lib.styles')
+rl_shapes = LazyModule('reportlab.graphics.shapes')
+rl_barcharts = LazyModule('reportlab.graphics.charts.barcharts')
+
+PDF_INCH = 72   # Points per inch
+PDF_CACHE_SIZE = 64
+
+@st.cache_resource(show_spinner=False)
+def get_pdf_styles():
+    """Paragraph and table styles built once per process and shared by every report"""
+    colors = rl_colors
+    ParagraphStyle, TableStyle = rl_styles.ParagraphStyle, rl_platypus.TableStyle
+    base = rl_styles.getSampleStyleSheet()
+    header = [
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]
+    return {
+        'title': ParagraphStyle(
+            'Title', parent=base['Heading1'], fontSize=28,
+            textColor=colors.HexColor('#1565c0'), alignment=1, spaceAfter=20
+        ),
+        'subtitle': ParagraphStyle(
+            'Subtitle', parent=base['Normal'], fontSize=12,
+            textColor=colors.HexColor('#64748b'), alignment=1, spaceAfter=30
+        ),
+        'disclaimer': ParagraphStyle(
+            'Disclaimer', parent=base['Normal'], fontSize=8,
+            textColor=colors.HexColor('#94a3b8'), spaceBefore=20
+        ),
+        'heading2': base['Heading2'],
+        'heading3': base['Heading3'],
+        'normal': base['Normal'],
+        'fair_table': TableStyle(header + [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1565c0')),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#e3f2fd')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#90caf9')),
+            ('FONTSIZE', (0, 1), (-1, -1), 11),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+        ]),
+        'metrics_table': TableStyle(header + [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e293b')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('TOPPADDING', (0, 1), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
+        ]),
+        'summary_table': TableStyle(header + [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1565c0')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
+        ]),
+    }
+
+def pdf_table(rows, col_widths, style):
+    table = rl_platypus.Table(rows, colWidths=col_widths)
+    table.setStyle(style)
+    return table
+
+def pdf_valuation_chart(vals):
+    """Current price vs fair value per method as a reportlab bar chart, or None"""
+    methods = [(label, vals[key]) for label, key in
+               (('PE Multiple', 'fair_value_pe'), ('EV/EBITDA', 'fair_value_ev')) if vals[key]]
+    if not methods:
+        return None
+    colors = rl_colors
+    drawing = rl_shapes.Drawing(6 * PDF_INCH, 2.4 * PDF_INCH)
+    chart = rl_barcharts.VerticalBarChart()
+    chart.x, chart.y = 50, 30
+    chart.width, chart.height = 5.8 * PDF_INCH - 60, 2.4 * PDF_INCH - 50
+    chart.data = [[vals['price']] * len(methods), [fair for _, fair in methods]]
+    chart.categoryAxis.categoryNames = [label for label, _ in methods]
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labelTextFormat = '$%0.0f'
+    chart.bars[0].fillColor = colors.HexColor('#1976d2')
+    fair_above = np.mean([fair for _, fair in methods]) > vals['price']
+    chart.bars[1].fillColor = colors.HexColor('#66bb6a' if fair_above else '#ef5350')
+    chart.barLabelFormat = '$%0.2f'
+    chart.barLabels.nudge = 7
+    chart.barLabels.fontSize = 8
+    drawing.add(chart)
+    drawing.add(rl_shapes.String(50, 2.4 * PDF_INCH - 12, 'Current Price (blue) vs Fair Value',
+                                 fontSize=9, fillColor=colors.HexColor('#64748b')))
+    return drawing
+
+def pdf_range_chart(vals):
+    """52-week range bar with the current price marker, or None"""
+    low, high, current = vals.get('52w_low', 0), vals.get('52w_high', 0), vals.get('price', 0)
+    if not all([low, high, current]) or high <= low:
+        return None
+    colors = rl_colors
+    width = 6 * PDF_INCH
+    position = max(0, min(1, (current - low) / (high - low)))
+    drawing = rl_shapes.Drawing(width, 0.9 * PDF_INCH)
+    drawing.add(rl_shapes.Rect(0, 24, width, 12, fillColor=colors.HexColor('#e2e8f0'), strokeColor=None))
+    drawing.add(rl_shapes.Rect(0, 24, width * position, 12, fillColor=colors.HexColor('#42a5f5'), strokeColor=None))
+    drawing.add(rl_shapes.Circle(width * position, 30, 7, fillColor=colors.HexColor('#1565c0'),
+                                 strokeColor=colors.white))
+    drawing.add(rl_shapes.String(0, 6, f'52W Low ${low:,.2f}', fontSize=8))
+    drawing.add(rl_shapes.String(width, 6, f'52W High ${high:,.2f}', fontSize=8, textAnchor='end'))
+    drawing.add(rl_shapes.String(width * position, 44, f'${current:,.2f} ({position * 100:.0f}% of range)',
+                                 fontSize=8, textAnchor='middle'))
+    return drawing
+
+def report_story(company, ticker, sector, vals, styles):
+    """Flowables for one company's section of a report"""
+    Paragraph, Spacer = rl_platypus.Paragraph, rl_platypus.Spacer
+    inch = PDF_INCH
+    avg_up, avg_fair = summarize_valuation(vals)
+    story = [
+        Paragraph(f"<b>{company}</b>", styles['heading2']),
+        Paragraph(f"Ticker: {ticker} | Sector: {sector}", styles['normal']),
+        Paragraph(f"Recommendation: <b>{get_recommendation(avg_up)[1]}</b>", styles['normal']),
+        Spacer(1, 20),
+    ]
     
     # Fair Value Summary
-    fair_data = [
+    story.append(pdf_table([
         ['Metric', 'Value'],
         ['Fair Value', f"$ {avg_fair:,.2f}"],
         ['Current Price', f"$ {vals['price']:,.2f}"],
         ['Potential Upside', f"{avg_up:+.2f}%"]
+    ], [3 * inch, 2.5 * inch], styles['fair_table']))
+    story.append(Spacer(1, 20))
+    
+    # Valuation Breakdown
+    story.append(Paragraph("<b>Valuation Breakdown</b>", styles['heading3']))
+    def fmt(value, pattern):
+        return pattern.format(value) if value else 'N/A'
+    story.append(pdf_table([
+        ['Method', 'Current', 'Industry', 'Historical', 'Fair Value', 'Upside'],
+        ['PE Multiple', fmt(vals['trailing_pe'], '{:.2f}x'), f"{vals['industry_pe']:.2f}x",
+         fmt(vals['historical_pe'], '{:.2f}x'),
+         fmt(vals['fair_value_pe'], '$ {:,.2f}'), fmt(vals['upside_pe'], '{:+.2f}%')],
+        ['EV/EBITDA', fmt(vals['current_ev_ebitda'], '{:.2f}x'), f"{vals['industry_ev_ebitda']:.2f}x",
+         fmt(vals['historical_ev_ebitda'], '{:.2f}x'),
+         fmt(vals['fair_value_ev'], '$ {:,.2f}'), fmt(vals['upside_ev'], '{:+.2f}%')],
+    ], [1.2 * inch, 1 * inch, 1 * inch, 1 * inch, 1.2 * inch, 1 * inch], styles['metrics_table']))
+    story.append(Spacer(1, 15))
+    
+    for chart in (pdf_valuation_chart(vals), pdf_range_chart(vals)):
+        if chart is not None:
+            story.extend([chart, Spacer(1, 10)])
+    
+    # Complete Financial Summary
+    story.append(Paragraph("<b>Financial Summary</b>", styles['heading3']))
+    summary = financial_summary(vals)
+    half = (len(summary) + 1) // 2
+    rows = [['Metric', 'Value', 'Metric', 'Value']] + [
+        list(left) + list(right) for left, right in zip(summary[:half], summary[half:] + [('', '')])
     ]
-    fair_table = Table(fair_data, colWidths=[3*inch, 2.5*inch])
-    fair_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1565c0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#e3f2fd')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#90caf9')),
-        ('FONTSIZE', (0, 1), (-1, -1), 11),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-    story.append(fair_table)
-    story.append(Spacer(1, 25))
-    
-    # Detailed Metrics
-    story.append(Paragraph("<b>Valuation Metrics</b>", styles['Heading3']))
-    metrics_data = [
-        ['Metric', 'Current', 'Industry Benchmark'],
-        ['PE Ratio', f"{vals['trailing_pe']:.2f}x" if vals['trailing_pe'] else 'N/A', f"{vals['industry_pe']:.2f}x"],
-        ['EV/EBITDA', f"{vals['current_ev_ebitda']:.2f}x" if vals['current_ev_ebitda'] else 'N/A', f"{vals['industry_ev_ebitda']:.2f}x"],
-        ['P/B Ratio', f"{vals['pb_ratio']:.2f}x" if vals['pb_ratio'] else 'N/A', '-'],
-        ['EPS', f"$ {vals['trailing_eps']:.2f}" if vals['trailing_eps'] else 'N/A', '-'],
-        ['Market Cap', f"$ {vals['market_cap']/1000000000:,.2f}B", '-'],
+    story.append(pdf_table(rows, [1.6 * inch, 1.3 * inch, 1.6 * inch, 1.3 * inch], styles['metrics_table']))
+    return story
+
+def report_header(styles, subtitle):
+    Paragraph, Spacer = rl_platypus.Paragraph, rl_platypus.Spacer
+    return [
+        Paragraph("US Stock Valuation Pro", styles['title']),
+        Paragraph(subtitle, styles['subtitle']),
+        Paragraph(f"Report Date: {datetime.now().strftime('%B %d, %Y')}", styles['normal']),
+        Spacer(1, 20),
     ]
-    metrics_table = Table(metrics_data, colWidths=[2*inch, 2*inch, 2*inch])
-    metrics_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e293b')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
-    ]))
-    story.append(metrics_table)
-    story.append(Spacer(1, 30))
-    
-    # Disclaimer
-    disclaimer_style = ParagraphStyle(
-        'Disclaimer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#94a3b8'),
-        spaceBefore=20
-    )
-    story.append(Paragraph(
+
+def report_disclaimer(styles):
+    return rl_platypus.Paragraph(
         "<b>DISCLAIMER:</b> This report is for educational purposes only and does not constitute financial advice. "
         "Always consult a qualified financial advisor before making investment decisions. Past performance is not "
         "indicative of future results.",
-        disclaimer_style
-    ))
-    
+        styles['disclaimer']
+    )
+
+def build_pdf(story):
+    """Lay out a story into PDF bytes"""
+    buffer = BytesIO()
+    doc = rl_platypus.SimpleDocTemplate(
+        buffer, pagesize=rl_pagesizes.A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18
+    )
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+def create_pdf_report(company, ticker, sector, vals):
+    styles = get_pdf_styles()
+    story = report_header(styles, "Professional Valuation Report")
+    story += report_story(company, ticker, sector, vals, styles)
+    story.append(report_disclaimer(styles))
+    return BytesIO(build_pdf(story))
+
+@st.cache_resource(show_spinner=False)
+def get_pdf_cache():
+    """Rendered reports keyed by (ticker, data version)"""
+    return LRUCache(maxsize=PDF_CACHE_SIZE)
+
+def report_version(info, vals):
+    """Data version of a report: fundamentals and price timestamps plus the benchmark used"""
+    return (info.get('_fetched_at'), info.get('_price_at'), vals['price'],
+            vals['industry_pe'], vals['industry_ev_ebitda'])
+
+def get_pdf_report(company, ticker, sector, vals, version):
+    """PDF bytes for a stock, rendered once per (ticker, data version)"""
+    cache = get_pdf_cache()
+    key = (ticker, version)
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = create_pdf_report(company, ticker, sector, vals).getvalue()
+        cache.put(key, pdf)
+    return pdf
+
+def create_category_report(title, stocks, benchmarks=None, max_workers=SCREENER_MAX_WORKERS):
+    """Multi-company PDF for {ticker: name}: a ranked summary table, then one section per stock.
+
+    Fundamentals are loaded cache first and sections are assembled in a worker pool;
+    reportlab lays out the finished document in a single pass.
+    """
+    styles = get_pdf_styles()
+    
+    def section(ticker, info):
+        vals = get_valuations(ticker, info, benchmarks)
+        if not vals:
+            return None
+        company = info.get('longName', stocks[ticker])
+        return ticker, company, vals, report_story(company, ticker, info.get('sector', 'N/A'), vals, styles)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(section, ticker, info)
+                   for ticker, info, _ in fetch_universe(stocks, max_workers) if info]
+        sections = [s for s in (f.result() for f in futures) if s is not None]
+    sections.sort(key=lambda s: -summarize_valuation(s[2])[0])
+    
+    story = report_header(styles, f"Category Report: {title}")
+    rows = [['Ticker', 'Company', 'Price', 'Fair Value', 'Upside', 'Rating']]
+    for ticker, company, vals, _ in sections:
+        avg_up, avg_fair = summarize_valuation(vals)
+        rows.append([ticker, company[:32], f"$ {vals['price']:,.2f}", f"$ {avg_fair:,.2f}",
+                     f"{avg_up:+.1f}%", get_recommendation(avg_up)[1]])
+    inch = PDF_INCH
+    story.append(pdf_table(rows, [0.8 * inch, 2.4 * inch, 0.9 * inch, 0.9 * inch, 0.7 * inch, 1 * inch],
+                           styles['summary_table']))
+    story.append(report_disclaimer(styles))
+    for *_, company_story in sections:
+        story.append(rl_platypus.PageBreak())
+        story.extend(company_story)
+    return build_pdf(story)
 
 # ============================================================================
 # MAIN APPLICATION
@@ -1712,8 +4015,11 @@ st.markdown('''
 </div>
 ''', unsafe_allow_html=True)
 
-# Sidebar
-with st.sidebar:
+# Sidebar - a fragment, so searching and browsing rerun only the sidebar.
+# Actions that change the main page set session state and rerun the full app.
+@st.fragment
+def render_sidebar():
+    sidebar_started = time.perf_counter()
     st.markdown("### 🔐 Account")
     st.markdown(f"**User:** {st.session_state.get('authenticated_user', 'Guest').title()}")
     
@@ -1725,21 +4031,19 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 📈 Stock Selection")
     
-    # Aggregate all stocks
-    all_stocks = {}
-    for cat, stocks in US_STOCKS.items():
-        all_stocks.update(stocks)
+    # Precomputed search index (built once per server process)
+    index = get_search_index()
     
     st.markdown(f'''
     <div class="stock-count">
-        📊 {len(all_stocks):,} Stocks Available
+        📊 {len(index.stocks):,} Stocks Available
     </div>
     ''', unsafe_allow_html=True)
     
     # Category selection
     category = st.selectbox(
         "🏷️ Category",
-        ["📋 All Stocks"] + list(US_STOCKS.keys()),
+        ["📋 All Stocks"] + get_categories(),
         help="Filter stocks by category"
     )
     
@@ -1752,23 +4056,20 @@ with st.sidebar:
     
     # Filter stocks
     if search:
-        search_upper = search.upper()
-        filtered = {t: n for t, n in all_stocks.items() 
-                   if search_upper in t.upper() or search_upper in n.upper()}
+        options = index.search_options(search)
     elif category == "📋 All Stocks":
-        filtered = all_stocks
+        options = index.all_options
     else:
-        filtered = US_STOCKS.get(category, {})
+        options = index.category_options.get(category, [])
     
     # Stock selection
-    if filtered:
-        options = sorted([f"{n} ({t})" for t, n in filtered.items()])
+    if options:
         selected = st.selectbox(
             "🎯 Select Stock",
             options,
             help="Choose a stock to analyze"
         )
-        ticker = selected.split("(")[1].strip(")")
+        ticker = index.option_ticker[selected]
     else:
         ticker = None
         st.warning("⚠️ No stocks found matching your criteria")
@@ -1781,26 +4082,346 @@ with st.sidebar:
         help="Enter any US stock ticker manually"
     )
     
-    # Analyze button
+    # Analyze button - the only sidebar actions that rerun the whole page
+    st.markdown("---")
+    if st.button("🚀 ANALYZE STOCK", use_container_width=True, type="primary"):
+        st.session_state.analyze = custom.upper() if custom else ticker
+        st.session_state.screen = None
+        if st.session_state.analyze:
+            get_cache_warmer().record_request(st.session_state.analyze)
+        st.rerun()
+    
+    # Universe screener
     st.markdown("---")
-    analyze_clicked = st.button("🚀 ANALYZE STOCK", use_container_width=True, type="primary")
+    st.markdown("### 🔭 Universe Screener")
+    st.slider(
+        "⚙️ Parallel Fetches",
+        min_value=1, max_value=8, value=SCREENER_MAX_WORKERS, key="screen_workers",
+        help="Number of tickers fetched concurrently while screening"
+    )
+    if st.button(
+        "🔭 SCREEN CATEGORY", use_container_width=True,
+        help="Value every stock in the selected category"
+    ):
+        st.session_state.screen = category
+        st.session_state.screen_run = True
+        st.session_state.analyze = None
+        st.rerun()
+    live_benchmarks = st.toggle(
+        "📡 Live Sector Benchmarks",
+        help="Value against peer medians computed from cached universe fundamentals"
+    )
+    if live_benchmarks != st.session_state.get('live_benchmarks', False):
+        st.session_state.live_benchmarks = live_benchmarks
+        if live_benchmarks:
+            engine = get_benchmark_engine()
+            engine.refresh()
+            st.session_state.benchmarks = engine.benchmarks()
+        else:
+            st.session_state.benchmarks = None
+        st.rerun()
+    if live_benchmarks:
+        engine = get_benchmark_engine()
+        if engine.snapshot:
+            st.caption(f"📡 Benchmarks v{engine.version} from {engine.snapshot['peers']:,} peers")
+        else:
+            st.caption("📡 No cached fundamentals yet - using standard benchmarks")
     
     # Rate limit info
     st.markdown("---")
     st.markdown("""
     <div style='background: rgba(255,255,255,0.1); padding: 0.8rem; border-radius: 8px; font-size: 0.75rem;'>
         <strong>💡 Tips:</strong><br>
-        • Data is cached for 4 hours<br>
+        • Prices refresh every 5 min, fundamentals daily<br>
         • Wait 1-2 min between requests<br>
         • If rate limited, try again later
     </div>
     """, unsafe_allow_html=True)
+    
+    limiter_stats = get_rate_limiter().stats()
+    st.caption(
+        f"⏱️ Fetch queue: {limiter_stats['queue_depth']} waiting | "
+        f"next slot in ~{limiter_stats['expected_wait']:.1f}s"
+    )
+    if WARM_ENABLED:
+        warmer_stats = get_cache_warmer().stats()
+        failed = f" | {warmer_stats['failures']} failed steps" if warmer_stats['failures'] else ""
+        st.caption(f"🔥 Warmer: {warmer_stats['warmed']} tickers refreshed{failed}",
+                   help=f"Last failure - {warmer_stats['last_error']}" if warmer_stats['last_error'] else None)
+    if IMPORT_PROFILE:
+        with st.expander("⏱️ Import Profile"):
+            for name, seconds in sorted(get_import_timings().items(), key=lambda kv: -kv[1]):
+                st.caption(f"{name}: {seconds * 1000:,.1f} ms")
+            for label, key in (("Last full run", 'full_run_ms'), ("Last sidebar render", 'sidebar_render_ms')):
+                if key in st.session_state:
+                    st.caption(f"{label}: {st.session_state[key]:,.1f} ms")
+    
+    cooldown = get_upstream_breaker().remaining()
+    if cooldown > 0:
+        st.caption(f"🔌 Yahoo is throttling us - serving cached data for ~{cooldown:.0f}s")
+    
+    # The sidebar body alone - all that a sidebar-only rerun executes
+    st.session_state.sidebar_render_ms = (time.perf_counter() - sidebar_started) * 1000
+
+with st.sidebar:
+    render_sidebar()
+
+# Page fragments - widgets inside rerun only their own section
+@st.fragment
+def render_benchmark_tuner(rows):
+    """Sector benchmark editor for screener results; applying re-scores and reruns the page"""
+    with st.expander("🎚️ Tune Sector Benchmarks"):
+        benchmarks = st.session_state.get('benchmarks') or INDUSTRY_BENCHMARKS
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            tune_sector = st.selectbox("Sector", list(benchmarks.keys()))
+        with b2:
+            tune_pe = st.number_input("Industry PE", min_value=1.0, max_value=200.0, step=0.5,
+                                      value=float(benchmarks[tune_sector]['pe']))
+        with b3:
+            tune_ev = st.number_input("Industry EV/EBITDA", min_value=1.0, max_value=100.0, step=0.5,
+                                      value=float(benchmarks[tune_sector]['ev_ebitda']))
+        a1, a2 = st.columns(2)
+        with a1:
+            apply_clicked = st.button("✅ Apply & Re-score", use_container_width=True)
+        with a2:
+            reset_clicked = st.button("↩️ Reset Benchmarks", use_container_width=True)
+        if apply_clicked or reset_clicked:
+            if apply_clicked:
+                updated = {k: dict(v) for k, v in benchmarks.items()}
+                updated[tune_sector].update(pe=tune_pe, ev_ebitda=tune_ev)
+                changed = [tune_sector]
+            else:
+                live = st.session_state.get('live_benchmarks')
+                updated = get_benchmark_engine().benchmarks() if live else INDUSTRY_BENCHMARKS
+                changed = [k for k in updated if benchmarks.get(k) != updated[k]]
+            st.session_state.benchmarks = updated
+            start = time.perf_counter()
+            rescored = sum(rescore_screen_rows(rows, k, updated) for k in changed)
+            st.session_state.rescore_note = (
+                f"♻️ Re-scored {rescored:,} stocks in {(time.perf_counter() - start) * 1000:.1f} ms "
+                f"from cached data"
+            )
+            st.rerun()
+        if st.session_state.get('rescore_note'):
+            st.caption(st.session_state.pop('rescore_note'))
+
+@st.fragment
+def render_sensitivity_panel(t, info, vals):
+    """What-if grids for the PE and EV/EBITDA methods; every slider move reruns only this panel"""
+    st.markdown('<div class="section-header">🎛️ Sensitivity Analysis</div>', unsafe_allow_html=True)
+    
+    target_pe, target_ev = target_multiples(vals)
+    ctrl1, ctrl2, ctrl3, ctrl4 = st.columns(4)
+    # Keys carry the ticker so each stock starts from its own targets
+    center_pe = ctrl1.slider("Target PE", *multiple_slider_range(target_pe, max(100.0, target_pe * 2)),
+                             float(target_pe), step=0.5, key=f"sens_pe_{t}")
+    center_ev = ctrl2.slider("Target EV/EBITDA", *multiple_slider_range(target_ev, max(50.0, target_ev * 2)),
+                             float(target_ev), step=0.5, key=f"sens_ev_{t}")
+    spread = ctrl3.slider("Multiple range ±%", 5, 60, 30, step=5, key=f"sens_spread_{t}") / 100
+    change = ctrl4.slider("EPS/EBITDA change ±%", 5, 50, 20, step=5, key=f"sens_change_{t}") / 100
+    
+    pe_multiples = sensitivity_axis(center_pe, spread)
+    ev_multiples = sensitivity_axis(center_ev, spread)
+    changes = np.linspace(-change, change, SENSITIVITY_STEPS)
+    fair_pe, fair_ev = valuation_sensitivity(vals, info.get('sharesOutstanding'), pe_multiples, ev_multiples, changes)
+    
+    sens_col1, sens_col2 = st.columns(2)
+    for sens_col, fair, multiples, label in ((sens_col1, fair_pe, pe_multiples, 'PE'),
+                                              (sens_col2, fair_ev, ev_multiples, 'EV/EBITDA')):
+        with sens_col:
+            if fair is None or not vals['price']:
+                st.info(f"{label} sensitivity not available")
+                continue
+            st.plotly_chart(create_sensitivity_heatmap(fair.round(4).tolist(), multiples.round(4).tolist(),
+                                                       changes.round(4).tolist(), vals['price'], label),
+                            use_container_width=True)
+    st.caption("Cells show fair value per share; color is upside vs the current price. "
+               "At the default targets the center cell is the point estimate above.")
+
+@st.fragment
+def render_monte_carlo_panel(t, info, vals):
+    """Fair-value distribution for one stock; toggling the mode reruns only this panel"""
+    st.markdown("---")
+    st.markdown('<div class="section-header">🎲 Monte Carlo Valuation</div>', unsafe_allow_html=True)
+    
+    if not st.toggle("Simulate fair-value distribution", key='mc_mode',
+                     help="Samples target multiples, one-year EPS/EBITDA growth and net debt"):
+        st.caption(f"Point estimate only - turn on to value {t} over {MC_DRAWS:,} simulated scenarios")
+        return
+    started = time.perf_counter()
+    mc = monte_carlo_valuation(t, info, vals)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if mc is None:
+        st.info("Monte Carlo valuation not available - no PE or EV/EBITDA inputs")
+        return
+    
+    mc1, mc2, mc3, mc4 = st.columns(4)
+    mc1.metric("Median Fair Value", f"${mc['p50']:,.2f}", f"{mc['upside_p50']:+.1f}%")
+    mc2.metric("90% Interval", f"${mc['p5']:,.0f} - ${mc['p95']:,.0f}")
+    mc3.metric("Chance of Upside", f"{mc['prob_upside']:.0f}%")
+    mc4.metric("Distribution Signal", get_recommendation(mc['upside_p50'])[1])
+    st.plotly_chart(create_monte_carlo_chart(mc), use_container_width=True)
+    st.caption(f"{mc['draws']:,} draws in {elapsed_ms:.0f} ms | 50% interval "
+               f"${mc['p25']:,.2f} - ${mc['p75']:,.2f} | mean ${mc['mean']:,.2f}")
+
+@st.fragment
+def render_monte_carlo_screen(category, rows, benchmarks):
+    """Monte Carlo summary for every valued screener row from cached fundamentals"""
+    valued = [r['Ticker'] for r in rows if r['Avg Upside %'] is not None]
+    saved = st.session_state.get('mc_screen', {})
+    if st.button(f"🎲 Monte Carlo {len(valued):,} Stocks", disabled=not valued):
+        started = time.perf_counter()
+        frame = simulate_tickers({t: cached_info(t) for t in valued}, benchmarks)
+        saved = st.session_state.mc_screen = {
+            'category': category, 'frame': frame, 'ms': (time.perf_counter() - started) * 1000
+        }
+    if saved.get('category') != category or saved['frame'].empty:
+        return
+    
+    frame = saved['frame']
+    table = pd.DataFrame({
+        'Price': frame['price'], 'P5': frame['p5'], 'Median': frame['p50'], 'P95': frame['p95'],
+        'Median Upside %': frame['upside_p50'], 'P(Upside) %': frame['prob_upside'],
+    }).rename_axis('Ticker').sort_values('P(Upside) %', ascending=False)
+    st.dataframe(
+        table,
+        use_container_width=True,
+        column_config={
+            "Price": st.column_config.NumberColumn("💰 Price", format="$%.2f"),
+            "P5": st.column_config.NumberColumn("📉 P5", format="$%.2f"),
+            "Median": st.column_config.NumberColumn("📊 Median", format="$%.2f"),
+            "P95": st.column_config.NumberColumn("📈 P95", format="$%.2f"),
+            "Median Upside %": st.column_config.NumberColumn("🎯 Median Upside", format="%+.1f%%"),
+            "P(Upside) %": st.column_config.ProgressColumn("🎲 P(Upside)", format="%.0f%%", min_value=0, max_value=100),
+        }
+    )
+    st.caption(f"{len(frame):,} stocks x {MC_BATCH_DRAWS:,} draws in {saved['ms']:.0f} ms")
+
+@st.fragment
+def render_peer_panel(t, info, benchmarks):
+    """Peer comparison section; loading missing peers reruns only this panel"""
+    st.markdown("---")
+    st.markdown('<div class="section-header">👥 Peer Comparison</div>', unsafe_allow_html=True)
+    
+    # Read the current version only - the warmer folds new fundamentals in off the render path
+    peers = get_peer_index(get_benchmark_engine().version).peers_for(t, info)
+    if not peers:
+        st.info("No comparable peers found in the universe")
+    else:
+        peer_infos, missing = load_peers(peers, fetch_missing=st.session_state.get('peer_fetch') == t)
+        if missing:
+            miss_col1, miss_col2 = st.columns([3, 1])
+            with miss_col1:
+                st.caption(f"⏳ {len(missing)} of {len(peers)} peers not cached yet: {', '.join(missing)}")
+            with miss_col2:
+                # The click reruns only this fragment, which then fetches the missing peers
+                st.button("📥 Load Missing Peers", use_container_width=True,
+                          on_click=partial(st.session_state.__setitem__, 'peer_fetch', t))
+        
+        if peer_infos:
+            peers_df = peer_frame(t, info, peer_infos, benchmarks)
+            premiums = peer_premiums(peers_df, t)
+            if premiums:
+                st.caption(" | ".join(
+                    f"{m}: {p:+.0f}% {'premium' if p > 0 else 'discount'} to peer median"
+                    for m, p in premiums.items()
+                ))
+            
+            peer_col1, peer_col2 = st.columns([3, 2])
+            with peer_col1:
+                st.dataframe(
+                    peers_df,
+                    use_container_width=True,
+                    column_config={
+                        "Price": st.column_config.NumberColumn("💰 Price", format="$%.2f"),
+                        "Market Cap ($B)": st.column_config.NumberColumn("🏦 Mkt Cap", format="$%.1fB"),
+                        "PE": st.column_config.NumberColumn("📈 PE", format="%.1fx"),
+                        "EV/EBITDA": st.column_config.NumberColumn("💼 EV/EBITDA", format="%.1fx"),
+                        "P/S": st.column_config.NumberColumn("🧾 P/S", format="%.1fx"),
+                        "Profit Margin %": st.column_config.NumberColumn("📊 Margin", format="%.1f%%"),
+                        "Avg Upside %": st.column_config.NumberColumn("🎯 Avg Upside", format="%+.1f%%"),
+                        "DCF Upside %": st.column_config.NumberColumn("🧮 DCF Upside", format="%+.1f%%"),
+                    }
+                )
+            with peer_col2:
+                fig_peers = create_peer_scatter(peers_df, t)
+                if fig_peers:
+                    st.plotly_chart(fig_peers, use_container_width=True)
+                else:
+                    st.info("Not enough EV/EBITDA data for the peer chart")
 
 # Main content
-if analyze_clicked:
-    st.session_state.analyze = custom.upper() if custom else ticker
+get_cache_warmer()   # Starts the background warmer once per server process
+
+if st.session_state.get('screen'):
+    screen_category = st.session_state.screen
+    universe = get_screen_universe(screen_category)
+    
+    st.markdown(f'''
+    <div class="company-header">
+        <h2 class="company-name">🔭 Universe Screener</h2>
+        <div class="company-meta">
+            <span class="meta-badge">🏷️ {screen_category}</span>
+            <span class="meta-badge">📊 {len(universe):,} Stocks</span>
+        </div>
+    </div>
+    ''', unsafe_allow_html=True)
+    
+    screen_column_config = {
+        "Price": st.column_config.NumberColumn("💰 Price", format="$%.2f"),
+        "Fair Value": st.column_config.NumberColumn("📊 Fair Value", format="$%.2f"),
+        "Upside PE %": st.column_config.NumberColumn("📈 Upside PE", format="%+.2f%%"),
+        "Upside EV %": st.column_config.NumberColumn("💼 Upside EV", format="%+.2f%%"),
+        "Avg Upside %": st.column_config.NumberColumn("🎯 Avg Upside", format="%+.2f%%"),
+        "DCF Value": st.column_config.NumberColumn("🧮 DCF Value", format="$%.2f"),
+        "DCF Upside %": st.column_config.NumberColumn("🧮 DCF Upside", format="%+.2f%%"),
+    }
+    results_table = st.empty()
+    
+    if st.session_state.pop('screen_run', False):
+        # Stream rows into the table as tickers finish
+        rows = []
+        st.session_state.screen_results = {'category': screen_category, 'rows': rows}
+        progress = st.progress(0.0, text=f"Screening {len(universe):,} stocks...")
+        for row in screen_universe(universe, max_workers=st.session_state.screen_workers,
+                                   benchmarks=st.session_state.get('benchmarks')):
+            rows.append(row)
+            progress.progress(len(rows) / len(universe), text=f"Screened {len(rows):,} / {len(universe):,} stocks")
+            if len(rows) % 5 == 0 or len(rows) == len(universe):
+                results_table.dataframe(screen_results_frame(rows), use_container_width=True,
+                                        hide_index=True, column_config=screen_column_config)
+        progress.empty()
+    
+    saved = st.session_state.get('screen_results', {})
+    rows = saved.get('rows', []) if saved.get('category') == screen_category else []
+    if rows:
+        results_table.dataframe(screen_results_frame(rows), use_container_width=True,
+                                hide_index=True, column_config=screen_column_config)
+        ok = sum(1 for r in rows if r['Avg Upside %'] is not None)
+        st.caption(f"✅ {ok:,} valued | ⚠️ {len(rows) - ok:,} failed | Click a column header to sort")
+        
+        # Category PDF is rendered only when the download is clicked
+        valued = {r['Ticker']: r['Company'] for r in rows if r['Avg Upside %'] is not None}
+        st.download_button(
+            "📥 Download Category PDF",
+            data=partial(create_category_report, screen_category, valued,
+                         st.session_state.get('benchmarks'), st.session_state.screen_workers),
+            file_name=f"USStock_Screen_{datetime.now().strftime('%Y%m%d')}.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+            disabled=not valued
+        )
+        
+        # Distribution of fair values across the category, from cached data only
+        render_monte_carlo_screen(screen_category, rows, st.session_state.get('benchmarks'))
+        
+        # Tune sector multiples and re-score only the affected names from cached data
+        render_benchmark_tuner(rows)
+    else:
+        st.info("No screening results yet - click SCREEN CATEGORY to start")
 
-if 'analyze' in st.session_state and st.session_state.analyze:
+elif 'analyze' in st.session_state and st.session_state.analyze:
     t = st.session_state.analyze
     
     # Fetch data with progress and rate limit awareness
@@ -1816,7 +4437,7 @@ if 'analyze' in st.session_state and st.session_state.analyze:
                 Yahoo Finance has temporarily limited requests from this server.<br><br>
                 <strong>Solutions:</strong><br>
                 • Click the <strong>Retry</strong> button below after waiting 30-60 seconds<br>
-                • The app caches successful requests for 6 hours<br>
+                • The app keeps fundamentals for 24 hours<br>
                 • Try during off-peak hours (early morning US time)
             </div>
             ''', unsafe_allow_html=True)
@@ -1824,8 +4445,7 @@ if 'analyze' in st.session_state and st.session_state.analyze:
             col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
                 if st.button("🔄 Retry Now", use_container_width=True, type="primary"):
-                    # Clear the cache for this ticker and retry
-                    st.cache_data.clear()
+                    # Failed fetches are never stored, so a rerun retries upstream
                     st.rerun()
         else:
             st.error(f"❌ Error: {error}")
@@ -1840,7 +4460,7 @@ if 'analyze' in st.session_state and st.session_state.analyze:
             ''', unsafe_allow_html=True)
         st.stop()
     
-    vals = calculate_valuations(info)
+    vals = get_valuations(t, info, st.session_state.get('benchmarks'))
     if not vals:
         st.error("❌ Unable to calculate valuations for this stock")
         st.stop()
@@ -1850,6 +4470,18 @@ if 'analyze' in st.session_state and st.session_state.analyze:
     sector = info.get('sector', 'N/A')
     industry = info.get('industry', 'N/A')
     
+    # Data freshness from the stored fetch timestamp
+    data_age = get_data_age(info)
+    if data_age is None:
+        as_of_badge = ''
+    else:
+        as_of = datetime.fromtimestamp(info['_fetched_at']).strftime('%b %d, %H:%M')
+        refreshing = " · ♻️ refreshing" if data_age > FUNDAMENTALS_TTL else ""
+        as_of_badge = f'<span class="meta-badge">🕒 Data as of {as_of}{refreshing}</span>'
+    if info.get('_price_at'):
+        price_as_of = datetime.fromtimestamp(info['_price_at']).strftime('%H:%M')
+        as_of_badge += f'<span class="meta-badge">💲 Price as of {price_as_of}</span>'
+    
     # Company Header - FIXED VISIBILITY
     st.markdown(f'''
     <div class="company-header">
@@ -1858,15 +4490,13 @@ if 'analyze' in st.session_state and st.session_state.analyze:
             <span class="meta-badge">🏷️ {t}</span>
             <span class="meta-badge">🏢 {sector}</span>
             <span class="meta-badge">🏭 {industry}</span>
+            {as_of_badge}
         </div>
     </div>
     ''', unsafe_allow_html=True)
     
     # Calculate average values
-    ups = [v for v in [vals['upside_pe'], vals['upside_ev']] if v is not None]
-    avg_up = np.mean(ups) if ups else 0
-    fairs = [v for v in [vals['fair_value_pe'], vals['fair_value_ev']] if v is not None]
-    avg_fair = np.mean(fairs) if fairs else vals['price']
+    avg_up, avg_fair = summarize_valuation(vals)
     
     # Main metrics row
     col1, col2 = st.columns([2, 1])
@@ -1884,16 +4514,7 @@ if 'analyze' in st.session_state and st.session_state.analyze:
     
     with col2:
         # Recommendation
-        if avg_up > 25:
-            rec_class, rec_text, rec_icon = "rec-strong-buy", "STRONG BUY", "🚀"
-        elif avg_up > 15:
-            rec_class, rec_text, rec_icon = "rec-buy", "BUY", "✅"
-        elif avg_up > 0:
-            rec_class, rec_text, rec_icon = "rec-buy", "ACCUMULATE", "📥"
-        elif avg_up > -10:
-            rec_class, rec_text, rec_icon = "rec-hold", "HOLD", "⏸️"
-        else:
-            rec_class, rec_text, rec_icon = "rec-avoid", "AVOID", "⚠️"
+        rec_class, rec_text, rec_icon = get_recommendation(avg_up)
         
         st.markdown(f'''
         <div class="rec-container">
@@ -1904,13 +4525,13 @@ if 'analyze' in st.session_state and st.session_state.analyze:
         </div>
         ''', unsafe_allow_html=True)
         
-        # PDF Download
-        pdf = create_pdf_report(company, t, sector, vals)
+        # PDF Download - rendered on click, then cached per data version
         st.download_button(
             "📥 Download PDF Report",
-            data=pdf,
+            data=partial(get_pdf_report, company, t, sector, vals, report_version(info, vals)),
             file_name=f"USStock_{t}_{datetime.now().strftime('%Y%m%d')}.pdf",
             mime="application/pdf",
+            on_click="ignore",
             use_container_width=True
         )
     
@@ -2007,9 +4628,17 @@ if 'analyze' in st.session_state and st.session_state.analyze:
     
     with chart_col3:
         st.markdown('<div class="section-header">📍 52-Week Range</div>', unsafe_allow_html=True)
-        range_html = create_52week_range_display(vals)
+        # Stored daily history (kept current by the warmer) beats Yahoo's precomputed fields
+        stats = history_stats(t)
+        range_vals = vals if stats is None else dict(
+            vals, **{'52w_high': stats['fiftyTwoWeekHigh'], '52w_low': stats['fiftyTwoWeekLow']}
+        )
+        range_html = create_52week_range_display(range_vals)
         if range_html:
             st.markdown(range_html, unsafe_allow_html=True)
+            if stats:
+                st.caption(f"📈 1Y volatility {stats['volatility'] * 100:.1f}% | "
+                           f"{stats['days']} sessions to {stats['as_of']}")
         else:
             st.info("52-week data not available")
     
@@ -2022,6 +4651,9 @@ if 'analyze' in st.session_state and st.session_state.analyze:
     st.markdown("---")
     st.markdown('<div class="section-header">📋 Valuation Breakdown</div>', unsafe_allow_html=True)
     
+    # Historical multiples are 3Y medians once the warmer has computed bands, else estimates
+    bands = get_band_store().get_bands(t)
+    hist_note = '3Y median' if bands else 'est.'
     val_col1, val_col2 = st.columns(2)
     
     with val_col1:
@@ -2039,6 +4671,10 @@ if 'analyze' in st.session_state and st.session_state.analyze:
                     <span class="method-label">Industry PE</span>
                     <span class="method-value">{vals['industry_pe']:.2f}x</span>
                 </div>
+                <div class="method-row">
+                    <span class="method-label">Historical PE ({hist_note})</span>
+                    <span class="method-value">{vals['historical_pe']:.2f}x</span>
+                </div>
                 <div class="method-row">
                     <span class="method-label">EPS (TTM)</span>
                     <span class="method-value">${vals['trailing_eps']:.2f}</span>
@@ -2071,6 +4707,10 @@ if 'analyze' in st.session_state and st.session_state.analyze:
                     <span class="method-label">Industry EV/EBITDA</span>
                     <span class="method-value">{vals['industry_ev_ebitda']:.2f}x</span>
                 </div>
+                <div class="method-row">
+                    <span class="method-label">Historical EV/EBITDA ({hist_note})</span>
+                    <span class="method-value">{f"{vals['historical_ev_ebitda']:.2f}x" if vals['historical_ev_ebitda'] else 'N/A'}</span>
+                </div>
                 <div class="method-row">
                     <span class="method-label">EBITDA</span>
                     <span class="method-value">${vals['ebitda']/1000000000:,.2f}B</span>
@@ -2088,40 +4728,79 @@ if 'analyze' in st.session_state and st.session_state.analyze:
         else:
             st.info("EV/EBITDA valuation not available")
     
+    # What-if grids over target multiples and earnings, from the cached valuation
+    render_sensitivity_panel(t, info, vals)
+    
+    # Historical Valuation Bands
+    if bands:
+        st.markdown('<div class="section-header">📉 Historical Valuation Bands</div>', unsafe_allow_html=True)
+        band_cols = st.columns(2)
+        for band_col, metric, label in zip(band_cols, BAND_METRICS, ('PE', 'EV/EBITDA')):
+            with band_col:
+                fig_band = create_band_chart(bands, metric, label)
+                if fig_band is None:
+                    st.info(f"Not enough history for {label} bands")
+                    continue
+                st.plotly_chart(fig_band, use_container_width=True)
+                band = bands[metric]
+                st.caption(f"{label} {band['current']:.1f}x is above {band['rank']:.0f}% of the last "
+                           f"{band['n']} sessions (p10 {band['p10']:.1f}x, p90 {band['p90']:.1f}x) as of {bands['as_of']}")
+    
+    # Discounted Cash Flow
+    st.markdown('<div class="section-header">🧮 Discounted Cash Flow</div>', unsafe_allow_html=True)
+    dcf = dcf_valuation(info)
+    if dcf:
+        dcf_col1, dcf_col2 = st.columns(2)
+        with dcf_col1:
+            upside_color_dcf = '#66bb6a' if dcf['upside_dcf'] and dcf['upside_dcf'] > 0 else '#ef5350'
+            upside_dcf = f"{dcf['upside_dcf']:+.2f}%" if dcf['upside_dcf'] is not None else 'N/A'
+            st.markdown(f'''
+            <div class="valuation-method">
+                <div class="method-title">🧮 DCF Method</div>
+                <div class="method-row">
+                    <span class="method-label">Unlevered FCF</span>
+                    <span class="method-value">${dcf['fcf']/1000000000:,.2f}B</span>
+                </div>
+                <div class="method-row">
+                    <span class="method-label">Growth (Years 1-{DCF_STAGE1_YEARS})</span>
+                    <span class="method-value">{dcf['growth']*100:.1f}%</span>
+                </div>
+                <div class="method-row">
+                    <span class="method-label">WACC (Beta {vals['beta'] or 1:.2f})</span>
+                    <span class="method-value">{dcf['wacc']*100:.1f}%</span>
+                </div>
+                <div class="method-row">
+                    <span class="method-label">Terminal Growth</span>
+                    <span class="method-value">{dcf['terminal_growth']*100:.1f}%</span>
+                </div>
+                <div class="method-row">
+                    <span class="method-label">Fair Value (DCF)</span>
+                    <span class="method-value" style="color: {upside_color_dcf}">${dcf['fair_value_dcf']:,.2f}</span>
+                </div>
+                <div class="method-row">
+                    <span class="method-label">Upside (DCF)</span>
+                    <span class="method-value" style="color: {upside_color_dcf}">{upside_dcf}</span>
+                </div>
+            </div>
+            ''', unsafe_allow_html=True)
+        with dcf_col2:
+            sensitivity = pd.DataFrame(
+                dcf['grid'],
+                index=[f"WACC {(dcf['wacc'] + o)*100:.1f}%" for o in DCF_WACC_OFFSETS],
+                columns=[f"g {r*100:.1f}%" for r in DCF_TERMINAL_RATES]
+            )
+            st.dataframe(sensitivity, use_container_width=True,
+                         column_config={c: st.column_config.NumberColumn(c, format="$%.2f") for c in sensitivity.columns})
+            st.caption(f"Fair value per share by WACC and terminal growth | "
+                       f"{DCF_STAGE1_YEARS}y at start growth, {DCF_STAGE2_YEARS}y fade to terminal")
+    else:
+        st.info("DCF valuation not available - needs positive free cash flow")
+    
     # Financial Data Table
     st.markdown("---")
     st.markdown('<div class="section-header">📊 Complete Financial Summary</div>', unsafe_allow_html=True)
     
-    financial_data = pd.DataFrame({
-        'Metric': [
-            'Current Price', 'Market Cap', 'Enterprise Value', 
-            'PE Ratio (TTM)', 'Forward PE', 'EV/EBITDA',
-            'P/B Ratio', 'P/S Ratio', 'EPS (TTM)',
-            'EBITDA', 'Book Value', 'Net Debt',
-            '52W High', '52W Low', 'Beta',
-            'Dividend Yield', 'ROE', 'Profit Margin'
-        ],
-        'Value': [
-            f"${vals['price']:,.2f}",
-            f"${vals['market_cap']/1000000000:,.2f}B",
-            f"${vals['enterprise_value']/1000000000:,.2f}B" if vals['enterprise_value'] else 'N/A',
-            f"{vals['trailing_pe']:.2f}x" if vals['trailing_pe'] else 'N/A',
-            f"{vals['forward_pe']:.2f}x" if vals['forward_pe'] else 'N/A',
-            f"{vals['current_ev_ebitda']:.2f}x" if vals['current_ev_ebitda'] else 'N/A',
-            f"{vals['pb_ratio']:.2f}x" if vals['pb_ratio'] else 'N/A',
-            f"{vals['ps_ratio']:.2f}x" if vals['ps_ratio'] else 'N/A',
-            f"${vals['trailing_eps']:.2f}" if vals['trailing_eps'] else 'N/A',
-            f"${vals['ebitda']/1000000000:,.2f}B" if vals['ebitda'] else 'N/A',
-            f"${vals['book_value']:.2f}" if vals['book_value'] else 'N/A',
-            f"${vals['net_debt']/1000000000:,.2f}B",
-            f"${vals['52w_high']:,.2f}" if vals['52w_high'] else 'N/A',
-            f"${vals['52w_low']:,.2f}" if vals['52w_low'] else 'N/A',
-            f"{vals['beta']:.2f}" if vals['beta'] else 'N/A',
-            f"{vals['dividend_yield']*100:.2f}%" if vals['dividend_yield'] else 'N/A',
-            f"{vals['roe']*100:.2f}%" if vals['roe'] else 'N/A',
-            f"{vals['profit_margin']*100:.2f}%" if vals['profit_margin'] else 'N/A'
-        ]
-    })
+    financial_data = pd.DataFrame(financial_summary(vals), columns=['Metric', 'Value'])
     
     st.dataframe(
         financial_data,
@@ -2132,6 +4811,12 @@ if 'analyze' in st.session_state and st.session_state.analyze:
             "Value": st.column_config.TextColumn("📈 Value", width="medium")
         }
     )
+    
+    # Monte Carlo fair-value distribution around the point estimate above
+    render_monte_carlo_panel(t, info, vals)
+    
+    # Peer Comparison - cache first; uncached peers are fetched only on request
+    render_peer_panel(t, info, st.session_state.get('benchmarks'))
 
 else:
     # Welcome screen
@@ -2162,3 +4847,5 @@ st.markdown('''
     </p>
 </div>
 ''', unsafe_allow_html=True)
+
+st.session_state.full_run_ms = (time.perf_counter() - SCRIPT_STARTED) * 1000